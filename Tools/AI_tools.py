@@ -1,123 +1,181 @@
 import re
 import time
 import random
-from collections import defaultdict
-from datetime import datetime
+
+from Tools.log import get_logger
+
+log = get_logger("stream")
+
+# 括号配对与断句符号
+BRACKETS = {"(": ")", "[": "]", "{": "}", "「": "」"}
+SENTENCE_ENDS = "。！？!?…"
+# 一次正则扫描即可找到所有需要关注的字符：换行段、括号、句末标点
+_TOKEN_RE = re.compile(r"\n+|[()\[\]{}「」。！？!?…]")
+
 
 class StreamSplitter:
+    """
+    增量式流式分段器。
+
+    每个 chunk 只扫描新增的文本，维护括号栈、换行分隔位置和最近的句末位置，
+    因此长回答的分段代价是线性的。首条消息在出现第一个完整句子时立即发送，
+    之后每隔 split_interval 秒发送一段，以免 QQ 刷屏。
+    """
+
     def __init__(self):
-        # # 正则表达式
-        # self.number_re = re.compile(r'^\s*(\d+)[.)]\s+')
         self.full_content = ""
-        
-        # # 状态初始化（新增last_split_time）
-        # self.last_number = None
-        # self.pending_newlines = 0
-        # self.message_buffer = []
-        # self.newline_records = []
         self.last_split_time = time.time()  # 初始化时间戳
-        
+
         self.forward_msg_num = 500
         self.enable_forward_msg_num = False
         self.check_forward_msg = False
-        
-        # 分割依据
-        self.split_str = "\n\n\n\n"
+
+        # 分段策略
+        self.split_interval = 1.5          # 首条之后两段之间的最小间隔（秒）
+        self.first_flush_min = 8           # 首条消息的最少字数
+        self.sep_probe = 200               # 超过该长度仍未出现空行时，按已见到的最长换行分段
+        self.tail_pacing = (0.5, 2.0)      # 结束后逐段发送的随机间隔，None 表示不等待
+        self.first_flushed = False
+
+        # 分割依据，None 表示尚未确定
+        self.split_str = None
         self.chunks = 0
         self.buffer = ""
-        
+
+        # 增量扫描状态（位置均相对于 self.buffer）
+        self._scanned = 0       # 已扫描到的位置
+        self._stack = []        # 当前段的括号栈
+        self._run_start = -1    # 未闭合的换行段起点
+        self._boundaries = []   # [(start, end, 换行数, 是否括号平衡)]
+        self._max_run = 0
+        self._sentence_end = -1 # 最近一个括号平衡的句末位置
+
     def split_stream(self, response_stream, type='gemini'):
-        try:
-            buffer_threshold = 200 if type == 'openai' else 50
-            
-            for chunk in response_stream:
-                match type:
-                    case 'gemini':
-                        chunk_text = chunk.text
-                    case 'openai':
-                        chunk_text = chunk.choices[0].delta.content
-                        
-                if chunk_text is None:
-                    continue
-                        
-                self.full_content += chunk_text
-                self.buffer += chunk_text
-                self.chunks += 1
-                if type == 'openai':
-                    if len(self.buffer) < buffer_threshold:
-                        continue
-                
-                if time.time() - self.last_split_time >= 1.5:
-                    self.last_split_time = time.time()
-                    for r in self.check_and_split():
-                        if r != "":
-                            yield r, self.enable_forward_msg_num
-                        
-            for r in self.check_and_split(True):
+        for chunk in response_stream:
+            match type:
+                case 'gemini':
+                    chunk_text = chunk.text
+                case 'openai':
+                    chunk_text = chunk.choices[0].delta.content
+
+            if not chunk_text:
+                continue
+
+            self.full_content += chunk_text
+            self.buffer += chunk_text
+            self.chunks += 1
+
+            if self.first_flushed and time.time() - self.last_split_time < self.split_interval:
+                continue
+
+            for r in self.check_and_split():
+                self.last_split_time = time.time()
                 yield r, self.enable_forward_msg_num
-                
-            print(f"[{datetime.now()}] FULL_CONTENT: {repr(self.full_content)}")
-        except:
-            raise
-    
+
+        for r in self.check_and_split(True):
+            yield r, self.enable_forward_msg_num
+
+        log.debug("FULL_CONTENT: %r", self.full_content)
+
     def check_and_split(self, last_response=False):
         if not self.check_forward_msg:
             if len(self.buffer) > self.forward_msg_num:
                 self.enable_forward_msg_num = True
             self.check_forward_msg = True
-            
-        messages = []
-        if self.split_str == "\n\n\n\n":
-            for sep in (self.split_str[:i] for i in range(4, -1, -1)):
-                if sep in self.buffer:
-                    self.split_str = sep
-                    break
-                
-        if self.split_str == "":
-            self.split_str = "\n\n\n\n"
-            message = self.buffer
-            
-        else:
-            messages = self.buffer.split(self.split_str)
-            
-            if not last_response:
-                message = messages[0]
-            else:
-                for m in messages:
-                    yield m
-                    time.sleep(random.uniform(0.5, 2.0))
-                return
-            
-            if len(messages) == 1:
-                self.buffer = messages[0].replace(self.buffer, "")     
-            else:
-                self.buffer = "\n".join(
-                    msg + "\n" if self._needs_trailing_newline(msg) else msg 
-                    for msg in messages[1:-1] 
-                ) + messages[-1] 
-                    
-        print(f"[{time.time()}] BUFFER: {repr(self.buffer)}， SPLIT_STR {repr("string.none" if self.split_str == "" else self.split_str)}")
-        
-        if not self.is_balanced(message):
-            self.buffer = message + self.buffer
+
+        self._scan(last_response)
+        self._choose_separator(last_response)
+
+        if not last_response:
+            segment = self._next_segment()
+            if segment is not None:
+                yield segment
             return
 
-        if last_response or self.split_str != "\n\n\n\n":
-            yield message
-            
-    def is_balanced(self, text):
-        brackets = {"(": ")", "[": "]", "{": "}", "「": "」"}
-        stack = []
-        for char in text:
-            if char in brackets:
-                stack.append(brackets[char])
-            elif stack and char == stack[-1]:
+        first = True
+        while (segment := self._next_segment()) is not None:
+            if not first and self.tail_pacing:
+                time.sleep(random.uniform(*self.tail_pacing))
+            first = False
+            yield segment
+
+        rest = self.buffer
+        self._consume(len(rest))
+        if rest.strip():
+            if not first and self.tail_pacing:
+                time.sleep(random.uniform(*self.tail_pacing))
+            yield rest
+
+    def _scan(self, last_response=False):
+        """只扫描上次之后新增的文本"""
+        buf = self.buffer
+        stack = self._stack
+        for m in _TOKEN_RE.finditer(buf, self._scanned):
+            token = m.group()
+            if token[0] == "\n":
+                if m.end() == len(buf) and not last_response:
+                    # 换行可能在下一个 chunk 中继续，留到下次再判断长度
+                    self._run_start = m.start()
+                    self._scanned = m.start()
+                    return
+                self._close_run(m.start(), m.end())
+            elif token in BRACKETS:
+                stack.append(BRACKETS[token])
+            elif stack and token == stack[-1]:
                 stack.pop()
-        return len(stack) == 0 and not (text.endswith(("\n   -", "（", ":", "：")) or text.startswith((":", "：")))
-    
-    def _needs_trailing_newline(self, text: str) -> bool:
-        return any([
-            text.startswith((' - ', '• ', '* ')),  
-            text.endswith(('：', ":")),   
-            re.search(r'\n\s*[-\*•]', text)  
-        ])
\ No newline at end of file
+            elif not stack and token in SENTENCE_ENDS:
+                self._sentence_end = m.end()
+
+        self._run_start = -1
+        self._scanned = len(buf)
+
+    def _close_run(self, start, end):
+        run = end - start
+        self._boundaries.append((start, end, run, not self._stack))
+        if run > self._max_run:
+            self._max_run = run
+
+    def _choose_separator(self, last_response):
+        if self.split_str is not None or self._max_run == 0:
+            return
+        if self._max_run >= 2 or last_response or len(self.full_content) >= self.sep_probe:
+            self.split_str = "\n" * min(self._max_run, 4)
+
+    def _next_segment(self):
+        sep_len = len(self.split_str) if self.split_str else 0
+        if sep_len:
+            for start, end, run, balanced in self._boundaries:
+                if run < sep_len or not balanced:
+                    continue
+                segment = self.buffer[:start]
+                if not self._acceptable(segment):
+                    continue
+                self._consume(end)
+                if segment.strip():
+                    self.first_flushed = True
+                    return segment
+
+        if not self.first_flushed and self._sentence_end > 0:
+            segment = self.buffer[:self._sentence_end]
+            if len(segment.strip()) >= self.first_flush_min and self._acceptable(segment):
+                self._consume(self._sentence_end)
+                self.first_flushed = True
+                return segment.strip("\n")
+        return None
+
+    def _consume(self, end):
+        """从缓冲区中移除已发送的部分并平移所有记录的位置"""
+        self.buffer = self.buffer[end:]
+        self._scanned = max(self._scanned - end, 0)
+        if self._run_start >= 0:
+            self._run_start -= end
+        self._boundaries = [
+            (s - end, e - end, run, balanced)
+            for s, e, run, balanced in self._boundaries if s >= end
+        ]
+        self._sentence_end = self._sentence_end - end if self._sentence_end > end else -1
+        if not self._boundaries and self._scanned == 0:
+            self._stack.clear()
+
+    def _acceptable(self, text):
+        return not (text.endswith(("\n   -", "（", ":", "：")) or text.lstrip("\n").startswith((":", "：")))
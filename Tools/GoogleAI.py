@@ -4,7 +4,20 @@ from google.generativeai.types import HarmCategory, HarmBlockThreshold, Function
 import httpx, traceback
 from pydantic import BaseModel
 from Tools.AI_tools import *
+from Tools.temp_arena import get_temp_arena
 import time, datetime
+from Tools.log import get_logger
+
+log = get_logger("gemini")
+
+# 基准测试中指向本地的模拟服务器（benchmarks/mock_llm_server.py），此时改用 REST 传输
+API_ENDPOINT: str | None = None
+
+def configure(api_key: str):
+    if API_ENDPOINT:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": API_ENDPOINT})
+    else:
+        genai.configure(api_key=api_key)
 
 class Schema(BaseModel):
   messages: list[str]
@@ -27,16 +40,19 @@ class Parts:
         def upload_from_url(cls, url: str):
             print(url)
             response = httpx.get(url)
-            path = f"./temps/google_{len(response.content)}_{len(url)}"
-            with open(path, "wb") as f:
-                f.write(response.content)
-
             if "png" in url:
                 print("png in file")
-                file = genai.upload_file(path, mime_type='image/png')
+                mime_type = 'image/png'
             else:
                 print("jpg in file")
-                file = genai.upload_file(path, mime_type='image/jpeg')
+                mime_type = 'image/jpeg'
+
+            # 上传完成后本地文件即可删除
+            with get_temp_arena().scope() as scope:
+                path = scope.path()
+                with open(path, "wb") as f:
+                    f.write(response.content)
+                file = genai.upload_file(path, mime_type=mime_type)
             return cls(file)
 
         def to_raw(self) -> genai.types.file_types.File:
@@ -81,7 +97,7 @@ class Roles:
 
 class Context:
     def __init__(self, api_key: str, model: genai.GenerativeModel, tools: list = None):
-        genai.configure(api_key=api_key)
+        configure(api_key)
         self.model = model
         
         self.safety = {
@@ -126,7 +142,7 @@ class Context:
             splitter = StreamSplitter()
             
             for message, enable_forward_msg_num in splitter.split_stream(res):
-                print(f"[{datetime.datetime.now()}] RESPONSE: {repr(message)}")
+                log.debug("RESPONSE: %r", message)
                 yield message, enable_forward_msg_num 
             
             # 添加到历史记录
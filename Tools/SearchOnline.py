@@ -1,6 +1,11 @@
 import openai, time
 import traceback
 from Tools.AI_tools import *
+from Tools.log import get_logger
+
+log = get_logger("gpt")
+
+BASE_URL = "https://free.v36.cm/v1/" # 基准测试中会指向本地的模拟服务器（benchmarks/mock_llm_server.py）
 
 class network_gpt():
     def __init__(self, prompt, message, user_lists, uid, mode, bn, key) -> None:
@@ -45,7 +50,7 @@ class network_gpt():
             openai.api_key = self.key #旧的可用4不可用3.5"sk-TczjyYwyuUP7KP7t619f6658C85e43A1905b77465b2e9aDf"
 
             # all client options can be configured just like the `OpenAI` instantiation counterpart
-            openai.base_url = "https://free.v36.cm/v1/"
+            openai.base_url = BASE_URL
             openai.default_headers = {"x-foo": "true"}  
 
            # print(f"\n{user_input}\n")
@@ -59,7 +64,7 @@ class network_gpt():
 
                 splitter = StreamSplitter()
                 for message, _ in splitter.split_stream(chat_completion, 'openai'):
-                    print(f"[{time.time()}] YIELD: {repr(message)}")
+                    log.debug("YIELD: %r", message)
                     yield message, 'message'
                     
                 user_input.append({"role": "assistant", "content": splitter.full_content})
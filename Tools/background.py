@@ -0,0 +1,42 @@
+import asyncio
+import concurrent.futures
+import threading
+
+
+class BackgroundLoop:
+    """
+    常驻的后台事件循环（独立的守护线程）。
+
+    Hyper 为每个事件单独开一个线程并调用 asyncio.run()，事件处理完毕后该事件循环
+    连同其中未完成的任务都会被销毁，不同事件之间也不能互相 await 对方的 Future。
+    需要跨事件存在的东西——后台采样、缓存的预取与刷新、共享的 HTTP 客户端、
+    “同一资源只请求一次”的合并——都放在这个循环中运行。
+    """
+
+    def __init__(self, name: str = "background-loop"):
+        self.name = name
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """在后台循环中执行 coro，不等待结果（可在任意线程调用）"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run(self, coro):
+        """在后台循环中执行 coro，并在当前事件循环中等待结果"""
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+
+background = BackgroundLoop()
@@ -0,0 +1,62 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class EventDeduplicator:
+    """
+    丢弃重复投递的事件。
+
+    Listener 断线重连后可能再次推送已经处理过的事件，签到排名、点赞、群发等操作
+    不是幂等的。这里用“环形队列 + 集合”记录最近 window 秒内、最多 capacity 个
+    事件指纹，占用的内存与消息量无关；指纹只保存 64 位哈希值。
+    """
+
+    def __init__(self, capacity: int = 4096, window: float = 600):
+        self.capacity = capacity
+        self.window = window
+        self.ring: deque[tuple[float, int]] = deque()  # (记录时间, 指纹)，按时间排序
+        self.seen: set[int] = set()
+        self.checked = 0
+        self.hits = 0
+        self._lock = threading.Lock()  # 重复的事件可能同时到达两个事件线程
+
+    @staticmethod
+    def fingerprint(event) -> int | None:
+        """
+        消息事件使用 message_id；通知、请求等事件使用完整的原始数据（包括 notice_type、
+        sub_type、user_id、time），同一条消息上的不同表情回应、撤回、设精华不会被当成重复。
+        无法识别的事件返回 None（不去重）。
+        """
+        if getattr(event, "post_type", None) == "message":
+            message_id = getattr(event, "message_id", None)
+            if message_id not in (None, "None"):
+                return hash(("message", getattr(event, "self_id", None), message_id))
+        data = getattr(event, "data", None)
+        if isinstance(data, dict) and data.get("time") is not None:
+            return hash(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str))
+        return None
+
+    def _expire(self, now: float) -> None:
+        ring, seen = self.ring, self.seen
+        while ring and (len(ring) >= self.capacity or now - ring[0][0] > self.window):
+            seen.discard(ring.popleft()[1])
+
+    def is_duplicate(self, event) -> bool:
+        fingerprint = self.fingerprint(event)
+        if fingerprint is None:
+            return False
+        with self._lock:
+            self.checked += 1
+            now = time.monotonic()
+            self._expire(now)
+            if fingerprint in self.seen:
+                self.hits += 1
+                return True
+            self.ring.append((now, fingerprint))
+            self.seen.add(fingerprint)
+            return False
+
+    def metrics(self) -> dict:
+        return {"checked": self.checked, "hits": self.hits, "size": len(self.ring)}
@@ -2,6 +2,8 @@ import openai, time
 import traceback
 from Tools.AI_tools import *
 
+BASE_URL = "https://api.deepseek.com/" # 基准测试中会指向本地的模拟服务器（benchmarks/mock_llm_server.py）
+
 class dsr114():
     def __init__(self, prompt, message, user_lists, uid, mode, bn, key) -> None:
         self.prompt = prompt
@@ -38,7 +40,7 @@ class dsr114():
             print(str(self.uid) + " 的上下文：" + str(len(user_input)))
 
             openai.api_key = self.key
-            openai.base_url = "https://api.deepseek.com/"
+            openai.base_url = BASE_URL
             openai.default_headers = {"x-foo": "true"}
 
             try:
@@ -0,0 +1,298 @@
+import asyncio
+import atexit
+import base64
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+import httpx
+
+from Tools.background import background
+
+
+def avatar_url(uin, spec: int = 640) -> str:
+    return f"http://q2.qlogo.cn/headimg_dl?dst_uin={uin}&spec={spec}"
+
+
+class ImageCache:
+    """
+    远程图片（主要是 QQ 头像）的共享缓存。
+
+    图片按内容的 sha1 存放，url -> 内容哈希 的索引保存在 index.json 中。
+    内存中保留最近使用的图片（按字节数限制），磁盘上的文件按最近使用时间淘汰。
+    超过 fresh_seconds 的条目会带上 ETag / Last-Modified 重新验证，未变化时服务器
+    返回 304，不需要重新下载；同一个 url 的并发请求只会发出一次网络请求。
+    插件通过上下文中的 image_cache 参数使用。
+
+    所有读写都在后台事件循环中进行：各个事件线程之间可以合并请求、复用同一个
+    HTTP 客户端，缓存的状态也只会被一个线程修改。后台循环同时服务短链接、B 站信息、
+    点歌等任务，因此文件读写都交给 asyncio.to_thread，index.json 在修改后最多
+    flush_delay 秒合并写入一次，退出时写入尚未保存的修改。
+    """
+
+    def __init__(self, path: str = "./temps/image_cache", memory_bytes: int = 32 * 1024 * 1024,
+                 disk_bytes: int = 256 * 1024 * 1024, fresh_seconds: float = 3600, flush_delay: float = 5.0):
+        self.path = path
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.fresh_seconds = fresh_seconds
+        self.flush_delay = flush_delay
+
+        self.memory: OrderedDict[str, bytes] = OrderedDict()  # 内容哈希 -> 数据
+        self.memory_size = 0
+        self.files: OrderedDict[str, int] = OrderedDict()  # 内容哈希 -> 文件大小，按最近使用排序
+        self.disk_size = 0
+        self.index: dict[str, dict] = {}  # url -> {"hash", "type", "etag", "last_modified", "checked"}
+
+        self.hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._client: httpx.AsyncClient | None = None
+        self._dirty = False  # index 有尚未写入磁盘的修改
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_lock = asyncio.Lock()
+        self._load()
+        atexit.register(self.flush_now)
+
+    # ---------- 磁盘 ----------
+
+    @property
+    def _index_file(self) -> str:
+        return os.path.join(self.path, "index.json")
+
+    def _load(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        files = []
+        for name in os.listdir(self.path):
+            if name.startswith("index.json"):
+                continue
+            stat = os.stat(os.path.join(self.path, name))
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self.files[name] = size
+            self.disk_size += size
+
+        try:
+            with open(self._index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        self.index = {url: e for url, e in index.items() if e.get("hash") in self.files}
+
+    def _write_index(self, text: str) -> None:
+        tmp = self._index_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, self._index_file)
+
+    def _save_index(self) -> None:
+        """标记 index 已修改，flush_delay 秒后合并写入"""
+        self._dirty = True
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.flush_delay, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self) -> None:
+        self._flush_handle = None
+        async with self._flush_lock:  # 上一次写入还没完成时不会同时写同一个临时文件
+            if not self._dirty:
+                return
+            self._dirty = False
+            text = json.dumps(self.index)  # 在循环中取快照，写入交给线程
+            try:
+                await asyncio.to_thread(self._write_index, text)
+            except OSError as e:
+                self._dirty = True
+                print(f"image_cache: 保存索引失败: {e}")
+
+    def flush_now(self) -> None:
+        """退出时同步写入尚未保存的 index"""
+        if self._dirty:
+            self._dirty = False
+            try:
+                self._write_index(json.dumps(self.index))
+            except (OSError, RuntimeError, ValueError):
+                pass
+
+    @staticmethod
+    def _read_file(file: str) -> bytes:
+        with open(file, "rb") as f:
+            data = f.read()
+        try:
+            os.utime(file)  # 重启后仍能按使用时间恢复 LRU 顺序
+        except OSError:
+            pass
+        return data
+
+    @staticmethod
+    def _write_file(file: str, data: bytes) -> None:
+        with open(file, "wb") as f:
+            f.write(data)
+
+    @staticmethod
+    def _remove_files(files: list[str]) -> None:
+        for file in files:
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+
+    async def _read(self, digest: str) -> bytes | None:
+        data = self.memory.get(digest)
+        if data is not None:
+            self.memory.move_to_end(digest)
+            return data
+        if digest not in self.files:
+            return None
+        try:
+            data = await asyncio.to_thread(self._read_file, os.path.join(self.path, digest))
+        except OSError:
+            self.disk_size -= self.files.pop(digest, 0)
+            return None
+        if digest in self.files:
+            self.files.move_to_end(digest)
+        self._remember(digest, data)
+        return data
+
+    def _remember(self, digest: str, data: bytes) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        if digest in self.memory:
+            self.memory.move_to_end(digest)
+            return
+        self.memory[digest] = data
+        self.memory_size += len(data)
+        while self.memory_size > self.memory_bytes:
+            _, old = self.memory.popitem(last=False)
+            self.memory_size -= len(old)
+
+    async def _store(self, data: bytes) -> str:
+        digest = hashlib.sha1(data).hexdigest()
+        self._remember(digest, data)
+        if digest in self.files:
+            self.files.move_to_end(digest)
+            return digest
+        await asyncio.to_thread(self._write_file, os.path.join(self.path, digest), data)
+        if digest not in self.files:  # 写入期间可能有相同内容的图片先完成
+            self.files[digest] = len(data)
+            self.disk_size += len(data)
+
+        evicted = set()
+        while self.disk_size > self.disk_bytes and len(self.files) > 1:
+            old, size = self.files.popitem(last=False)
+            self.disk_size -= size
+            self.memory_size -= len(self.memory.pop(old, b""))
+            evicted.add(old)
+        if evicted:
+            self.index = {url: e for url, e in self.index.items() if e["hash"] not in evicted}
+            await asyncio.to_thread(self._remove_files, [os.path.join(self.path, old) for old in evicted])
+        return digest
+
+    # ---------- 网络 ----------
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10, follow_redirects=True)
+        return self._client
+
+    async def _fetch(self, url: str) -> tuple[bytes, str]:
+        entry = self.index.get(url)
+        cached = await self._read(entry["hash"]) if entry else None
+
+        headers = {}
+        if cached is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = await self._get_client().get(url, headers=headers)
+            if response.status_code == 304 and cached is not None:
+                self.revalidated += 1
+                entry["checked"] = time.time()
+                self._save_index()
+                return cached, entry["type"]
+            response.raise_for_status()
+        except httpx.HTTPError:
+            if cached is not None:
+                print(f"image_cache: 无法验证 {url}，使用旧的缓存")
+                return cached, entry["type"]
+            raise
+
+        data = response.content
+        self.downloads += 1
+        content_type = response.headers.get("content-type", "image/jpeg").split(";")[0]
+        self.index[url] = {
+            "hash": await self._store(data),
+            "type": content_type,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "checked": time.time(),
+        }
+        self._save_index()
+        return data, content_type
+
+    async def fetch(self, url: str) -> tuple[bytes, str]:
+        """返回 (图片数据, Content-Type)，下载失败且没有缓存时抛出 httpx.HTTPError"""
+        return await background.run(self._fetch_shared(url))
+
+    async def _fetch_shared(self, url: str) -> tuple[bytes, str]:
+        entry = self.index.get(url)
+        if entry and time.time() - entry["checked"] < self.fresh_seconds:
+            data = await self._read(entry["hash"])
+            if data is not None:
+                self.hits += 1
+                return data, entry["type"]
+
+        future = self._inflight.get(url)
+        if future is None:
+            # 同一个 url 的并发请求共享同一次下载
+            future = self._inflight[url] = asyncio.ensure_future(self._fetch(url))
+            future.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(future)
+
+    async def get(self, url: str) -> bytes:
+        return (await self.fetch(url))[0]
+
+    async def segment_file(self, url: str) -> str:
+        """OneBot 图片消息可用的 file 字段，失败时退回原 url 由 OneBot 自行下载"""
+        try:
+            data, _ = await self.fetch(url)
+        except Exception as e:
+            print(f"image_cache: 获取 {url} 失败: {e}")
+            return url
+        return "base64://" + base64.b64encode(data).decode()
+
+    async def data_uri(self, url: str) -> str:
+        """可直接嵌入 HTML 模板的 data URI，失败时退回原 url"""
+        try:
+            data, content_type = await self.fetch(url)
+        except Exception as e:
+            print(f"image_cache: 获取 {url} 失败: {e}")
+            return url
+        return f"data:{content_type};base64," + base64.b64encode(data).decode()
+
+    def metrics(self) -> dict:
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "downloads": self.downloads,
+            "memory_bytes": self.memory_size,
+            "disk_bytes": self.disk_size,
+            "urls": len(self.index),
+        }
+
+
+_image_cache: ImageCache | None = None
+
+
+def get_image_cache() -> ImageCache:
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache()
+    return _image_cache
@@ -0,0 +1,126 @@
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+
+FORMAT = "[%(asctime)s] %(levelname)s %(name)s: %(message)s"
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    返回 jianer.<name> 日志记录器。
+
+    请使用 log.debug("YIELD: %r", text) 这样的延迟格式化写法：低于当前等级的记录在
+    logging 内部的等级检查处就被丢弃，不会创建记录也不会格式化参数。
+    """
+    return logging.getLogger(f"jianer.{name}")
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    只把记录放入队列，格式化留给后台的写入线程。
+
+    标准的 QueueHandler.prepare 会在调用方线程中格式化消息，这正是要从事件循环
+    线程中移走的开销；代价是参数必须是不可变的值（字符串、数字等）。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # 异常对象引用着调用栈，在这里转成文本
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _Stdout(logging.StreamHandler):
+    """每次写入时取当前的 sys.stdout，与 print 一样遵循 redirect_stdout"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class SampleFilter(logging.Filter):
+    """同一条日志模板的 DEBUG 记录每 every 条只保留一条（第一条总是保留）"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = every
+        self.counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every <= 1:
+            return True
+        with self._lock:
+            n = self.counts.get(record.msg, 0)
+            self.counts[record.msg] = n + 1
+        return n % self.every == 0
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class LogService:
+    """
+    结构化日志：所有 jianer.* 记录器经由队列交给一个后台线程，
+    由它格式化并写入控制台与按大小轮转的日志文件（轮转后的文件用 gzip 压缩）。
+    """
+
+    def __init__(self):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.listener: logging.handlers.QueueListener | None = None
+        self.root = logging.getLogger("jianer")
+
+    def setup(self, level: str = "INFO", path: str = "logs/jianer.log", max_bytes: int = 5 * 1024 * 1024,
+              backups: int = 5, sample_every: int = 20) -> None:
+        if self.listener is not None:
+            self.set_level(level)
+            return
+        formatter = logging.Formatter(FORMAT)
+        handlers = [_Stdout()]
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                                encoding="utf-8", delay=True)
+            file_handler.namer = lambda name: name + ".gz"
+            file_handler.rotator = _gzip_rotator
+            handlers.append(file_handler)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        queue_handler = _QueueHandler(self.queue)
+        queue_handler.addFilter(SampleFilter(sample_every))
+        self.root.addHandler(queue_handler)
+        self.root.propagate = False
+        self.set_level(level)
+
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.shutdown)
+
+    def set_level(self, level: str) -> None:
+        """level 与 config.json 中的 Log_level 相同（DEBUG、INFO、WARNING……），无法识别时使用 INFO"""
+        value = logging.getLevelName(str(level).upper())
+        self.root.setLevel(value if isinstance(value, int) else logging.INFO)
+
+    def shutdown(self) -> None:
+        """写完队列中剩余的记录"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+log_service = LogService()
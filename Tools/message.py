@@ -0,0 +1,100 @@
+from Tools.links import LinkScan
+
+
+class ParsedMessage:
+    """
+    一条消息的常用信息，由 handler 为每个事件创建，插件通过 parsed 参数获取。
+
+    每一项都在第一次访问时才计算并缓存：消息只转成一次文本、消息段只遍历一次，
+    handler 和所有插件共享结果。没有 message 的事件（通知、请求等）上，文本为空字符串，
+    at 为空元组，reply 为 None。
+    """
+
+    def __init__(self, event, reminder: str = ""):
+        self.event = event
+        self.reminder = reminder
+        # 不用 functools.cached_property，原因见 LinkScan.text
+        self._text: str | None = None
+        self._stripped: str | None = None
+        self._order: str | None = None
+        self._at: tuple[str, ...] | None = None
+        self._reply = None
+        self._links: LinkScan | None = None
+        self._single_emoji: bool | None = None
+
+    @property
+    def text(self) -> str:
+        """str(event.message)，即 handler 中的 user_message"""
+        if self._text is None:
+            message = getattr(self.event, "message", None)
+            self._text = str(message) if message is not None else ""
+        return self._text
+
+    @property
+    def stripped(self) -> str:
+        if self._stripped is None:
+            self._stripped = self.text.strip()
+        return self._stripped
+
+    @property
+    def is_command(self) -> bool:
+        """消息是否以指令前缀 reminder 开头"""
+        return self.text.startswith(self.reminder)
+
+    @property
+    def order(self) -> str:
+        """去掉 reminder 后的指令内容，不是指令时为空字符串"""
+        if self._order is None:
+            self._order = self.text[len(self.reminder):].strip() if self.is_command else ""
+        return self._order
+
+    def _walk(self):
+        # 按类名判断消息段类型，不需要在这里导入 Hyper
+        at, reply = [], None
+        for i, segment in enumerate(getattr(self.event, "message", None) or ()):
+            name = type(segment).__name__
+            if name == "At":
+                at.append(str(segment.qq))
+            elif name == "Reply" and i == 0:
+                reply = segment
+        self._at, self._reply = tuple(at), reply
+
+    @property
+    def at(self) -> tuple[str, ...]:
+        """按顺序列出消息中 @ 的 QQ 号（字符串）"""
+        if self._at is None:
+            self._walk()
+        return self._at
+
+    @property
+    def at_self(self) -> bool:
+        """消息是否以 @机器人 开头"""
+        message = getattr(self.event, "message", None)
+        return (bool(message) and type(message[0]).__name__ == "At"
+                and str(message[0].qq) == str(getattr(self.event, "self_id", "")))
+
+    @property
+    def reply(self):
+        """引用的消息段（Segments.Reply，位于消息开头），没有引用时为 None"""
+        if self._at is None:
+            self._walk()
+        return self._reply
+
+    @property
+    def links(self) -> LinkScan:
+        if self._links is None:
+            self._links = LinkScan(self.event, self)
+        return self._links
+
+    @property
+    def single_emoji(self) -> bool:
+        """整条消息是否只有一个 emoji（emoji +1 功能）"""
+        if self._single_emoji is None:
+            text = self.text
+            # 绝大多数消息长度不为 1，不需要调用 emoji_count
+            if len(text) != 1:
+                self._single_emoji = False
+            else:
+                import emoji
+                self._single_emoji = emoji.emoji_count(text) == 1
+        return self._single_emoji
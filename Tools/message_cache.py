@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+# 与 get_msg 响应中的 data 相同的字段
+_FIELDS = ("message_id", "message_type", "time", "sender", "message", "raw_message", "group_id", "user_id")
+
+
+class MessageCache:
+    """
+    最近消息的环形缓存，按 message_id 索引。
+
+    handler 把收到的每条消息事件的原始数据放入缓存，get_msg 的结果也会被缓存；
+    引用最近的消息（最常见的情况）时 get() 不需要再向协议端请求。最多保留
+    capacity 条，超出时淘汰最久未使用的消息。
+    """
+
+    def __init__(self, capacity: int = 2048):
+        self.capacity = capacity
+        self.entries: OrderedDict[str, dict] = OrderedDict()  # message_id -> get_msg 响应中的 data
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # 每个事件在各自的线程中处理
+
+    def _put(self, message_id: str, data: dict) -> None:
+        with self._lock:
+            self.entries[message_id] = data
+            self.entries.move_to_end(message_id)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def remember(self, event) -> None:
+        """登记一条收到的消息事件，非消息事件直接忽略"""
+        message_id = getattr(event, "message_id", None)
+        data = getattr(event, "data", None)
+        if message_id in (None, "None") or not isinstance(data, dict) or not data.get("message"):
+            return
+        self._put(str(message_id), {key: data[key] for key in _FIELDS if key in data})
+
+    def lookup(self, message_id) -> dict | None:
+        with self._lock:
+            data = self.entries.get(str(message_id))
+            if data is not None:
+                self.entries.move_to_end(str(message_id))
+            return data
+
+    async def get(self, actions, message_id):
+        """
+        与 actions.get_msg(message_id) 相同，返回 Manager.Ret。
+        缓存中没有时才请求协议端，请求成功的结果同样会被缓存。
+        """
+        from Hyper import Manager
+        from Hyper.Utils.TypeExt import ObjectedJson
+
+        data = self.lookup(message_id)
+        if data is not None:
+            self.hits += 1
+            return Manager.Ret({"status": "ok", "retcode": 0, "data": data}, ObjectedJson)
+
+        self.misses += 1
+        ret = await actions.get_msg(message_id)
+        raw = getattr(ret.data, "raw", None)
+        if ret.status == "ok" and isinstance(raw, dict) and raw.get("message"):
+            self._put(str(message_id), raw)
+        return ret
+
+    def metrics(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
@@ -0,0 +1,95 @@
+import os
+import time
+
+
+class PermissionService:
+    """
+    统一的用户组权限服务。
+
+    Super_User.ini / Manage_User.ini 只在文件发生变化（mtime 或大小改变）
+    或通过 write() 修改后才重新读取，查询时使用 frozenset，复杂度为 O(1)。
+    通过插件上下文中的 permissions 参数提供给插件使用。
+    """
+
+    def __init__(self, root_users: list, super_file: str = "Super_User.ini",
+                 manage_file: str = "Manage_User.ini", check_interval: float = 1.0):
+        self.super_file = super_file
+        self.manage_file = manage_file
+        self.check_interval = check_interval
+
+        self.super_list: list[str] = []
+        self.manage_list: list[str] = []
+        self.set_root(root_users)
+
+        self._stamps = None
+        self._last_check = 0.0
+        self.reload()
+
+    @staticmethod
+    def _load_user_list(filename) -> list[str]:
+        if not os.path.exists(filename):
+            with open(filename, 'w'):
+                pass
+
+        with open(filename, 'r') as f:
+            return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+    def set_root(self, root_users: list) -> None:
+        self.root = frozenset(str(u) for u in root_users)
+        self.root_list = [str(u) for u in root_users]
+        self.supers = self.root | frozenset(self.super_list)
+        self.admins = self.supers | frozenset(self.manage_list)
+
+    def _stat(self):
+        stamps = []
+        for file in (self.super_file, self.manage_file):
+            try:
+                st = os.stat(file)
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def reload(self) -> None:
+        self.super_list = self._load_user_list(self.super_file)
+        self.manage_list = self._load_user_list(self.manage_file)
+        self.supers = self.root | frozenset(self.super_list)
+        self.admins = self.supers | frozenset(self.manage_list)
+        self._stamps = self._stat()
+        self._last_check = time.monotonic()
+
+    def refresh(self) -> bool:
+        """文件被外部修改时重新加载，返回是否发生了重载"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        if self._stat() == self._stamps:
+            return False
+        self.reload()
+        return True
+
+    def write(self, s: list, m: list) -> bool:
+        s = [str(item) for item in s if item]
+        m = [str(item) for item in m if item]
+        try:
+            with open(self.super_file, "w") as f:
+                f.write("\n".join(s))
+            with open(self.manage_file, "w") as f:
+                f.write("\n".join(m))
+        except OSError:
+            return False
+
+        self.reload()
+        return True
+
+    def is_root(self, uid) -> bool:
+        return str(uid) in self.root
+
+    def is_super(self, uid) -> bool:
+        """ROOT_User 或 Super_User"""
+        return str(uid) in self.supers
+
+    def is_admin(self, uid) -> bool:
+        """ROOT_User、Super_User 或 Manage_User"""
+        return str(uid) in self.admins
@@ -0,0 +1,237 @@
+import ast
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from Tools.log import get_logger
+
+log = get_logger("plugins")
+
+# api：阻塞接口的完整名称；function：调用它的协程；via：经由的同步函数（直接调用时为空元组）
+BlockingCall = namedtuple("BlockingCall", "api kind file line function via")
+
+# 完整名称 -> 类别；requests 模块的所有函数另行判断
+BLOCKING_APIS = {
+    "time.sleep": "sleep",
+    "subprocess.run": "subprocess",
+    "subprocess.call": "subprocess",
+    "subprocess.check_call": "subprocess",
+    "subprocess.check_output": "subprocess",
+    "subprocess.getoutput": "subprocess",
+    "subprocess.getstatusoutput": "subprocess",
+    "os.system": "subprocess",
+    "os.popen": "subprocess",
+    "whois.whois": "network",
+    "whois.query": "network",
+    "urllib.request.urlopen": "network",
+    "open": "file",
+}
+BLOCKING_APIS.update({f"httpx.{name}": "network"
+                      for name in ("get", "post", "put", "patch", "delete", "head", "options", "request", "stream")})
+
+# 读写小文件通常很快，只作提示，不会因此把插件放到线程中执行
+SEVERE_KINDS = frozenset({"network", "sleep", "subprocess"})
+KIND_NAMES = {"network": "同步网络请求", "sleep": "同步休眠", "subprocess": "同步子进程", "file": "文件读写"}
+
+
+def _blocking_kind(api: str) -> str | None:
+    if api.startswith("requests."):
+        name = api.rsplit(".", 1)[1]
+        # requests.Session() 等构造函数与 requests.exceptions.* 不是请求
+        return "network" if name[:1].islower() and ".exceptions." not in api else None
+    return BLOCKING_APIS.get(api)
+
+
+class _Function:
+    __slots__ = ("name", "is_async", "file", "calls", "names")
+
+    def __init__(self, name: str, is_async: bool, file: str):
+        self.name = name
+        self.is_async = is_async
+        self.file = file
+        self.calls: list[tuple[str, str, int]] = []  # (api, 类别, 行号)
+        self.names: set[str] = set()  # 直接调用的函数名（foo() 或 self.foo()）
+
+
+class _Collector(ast.NodeVisitor):
+    """收集一个文件中每个函数直接调用的阻塞接口与其他函数"""
+
+    def __init__(self, file: str, aliases: dict[str, str]):
+        self.file = file
+        self.aliases = aliases
+        self.functions: list[_Function] = []
+        self._stack: list[_Function] = []
+
+    def _visit_function(self, node, is_async: bool):
+        function = _Function(node.name, is_async, self.file)
+        self.functions.append(function)
+        self._stack.append(function)
+        for child in node.body:
+            self.visit(child)
+        self._stack.pop()
+
+    def visit_FunctionDef(self, node):
+        self._visit_function(node, False)
+
+    def visit_AsyncFunctionDef(self, node):
+        self._visit_function(node, True)
+
+    def visit_Lambda(self, node):
+        pass  # lambda 通常被交给 run_in_executor 等在线程中执行
+
+    def visit_Call(self, node):
+        if self._stack:
+            function = self._stack[-1]
+            name = self._dotted(node.func)
+            if name is not None:
+                kind = _blocking_kind(name)
+                if kind is not None:
+                    function.calls.append((name, kind, node.lineno))
+                elif isinstance(node.func, ast.Name):
+                    function.names.add(node.func.id)  # 包括从插件其他文件中导入的函数
+            if (isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name)
+                    and node.func.value.id in ("self", "cls")):
+                function.names.add(node.func.attr)
+        self.generic_visit(node)
+
+    def _dotted(self, node) -> str | None:
+        """requests.get -> "requests.get"，按导入别名还原（import requests as r、from time import sleep）"""
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        parts.append(self.aliases.get(node.id, node.id))
+        return ".".join(reversed(parts))
+
+
+def _aliases(tree: ast.AST) -> dict[str, str]:
+    aliases = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    aliases[alias.asname] = alias.name
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+    return aliases
+
+
+def _plugin_files(path: str) -> list[str]:
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        files.extend(os.path.join(root, f) for f in sorted(names) if f.endswith((".py", ".pyw")))
+    return files
+
+
+def scan_plugin(path: str) -> list[BlockingCall]:
+    """
+    静态检查插件（只解析源码，不执行插件），找出协程中直接或经由同步函数调用的阻塞接口。
+
+    path 为插件文件或目录，目录形式插件检查其中所有 .py 文件。同步函数按名称在整个插件
+    中查找，作为参数交给 asyncio.to_thread、run_in_executor 的函数和 lambda 不算调用。
+    """
+    functions: list[_Function] = []
+    for file in _plugin_files(path):
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read(), file)
+        except (OSError, UnicodeDecodeError, SyntaxError):
+            continue  # 语法错误交给正常导入流程报告
+        collector = _Collector(os.path.relpath(file, os.path.dirname(path)), _aliases(tree))
+        collector.visit(tree)
+        functions.extend(collector.functions)
+
+    sync_functions: dict[str, list[_Function]] = {}
+    for function in functions:
+        if not function.is_async:
+            sync_functions.setdefault(function.name, []).append(function)
+
+    found, seen = [], set()
+
+    def walk(function: _Function, coroutine: _Function, via: tuple[str, ...], visited: set[int]):
+        for api, kind, line in function.calls:
+            if (function.file, line, api) not in seen:
+                seen.add((function.file, line, api))
+                found.append(BlockingCall(api, kind, function.file, line, coroutine.name, via))
+        for name in function.names:
+            for callee in sync_functions.get(name, ()):
+                if id(callee) not in visited:
+                    visited.add(id(callee))
+                    walk(callee, coroutine, via + (callee.name,), visited)
+
+    for function in functions:
+        if function.is_async:
+            walk(function, function, (), {id(function)})
+    return found
+
+
+def is_severe(calls: list[BlockingCall]) -> bool:
+    """是否有会长时间阻塞的调用（网络、休眠、子进程）"""
+    return any(call.kind in SEVERE_KINDS for call in calls)
+
+
+def describe(call: BlockingCall) -> str:
+    via = f"，经由 {' -> '.join(call.via)}" if call.via else ""
+    return f"{KIND_NAMES[call.kind]} {call.api}() @ {call.file}:{call.line}（{call.function}{via}）"
+
+
+class PluginOffloader:
+    """
+    在独立线程中执行插件的 on_message。
+
+    协程在工作线程里由一个新的事件循环运行，其中的 requests.get、time.sleep 等同步调用
+    不再卡住处理事件的循环；超过 timeout 秒仍未完成时放弃等待并抛出 asyncio.TimeoutError。
+    线程无法被强行终止，超时的插件会继续占用一个工作线程直到它自己结束。
+    """
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self.running = 0
+        self.completed = 0
+        self.timeouts = 0
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()  # Hyper 在不同线程中处理各个事件
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 不使用事件循环的默认线程池：asyncio.run() 退出前会等待其中的线程结束，超时也就失去了意义
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="plugin")
+            return self._executor
+
+    async def run(self, name: str, coroutine, timeout: float):
+        # 复制上下文，链路追踪等 contextvars 在工作线程中保持可用
+        context = contextvars.copy_context()
+        future = self._get_executor().submit(context.run, asyncio.run, coroutine)
+        with self._lock:
+            self.running += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            log.warning("插件 %s 在线程中执行超过 %.0f 秒，已放弃等待", name, timeout)
+            raise
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+            log.debug("插件 %s 在线程中执行 %.1f ms", name, (time.perf_counter() - start) * 1000)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"running": self.running, "completed": self.completed, "timeouts": self.timeouts}
+
+
+plugin_offloader = PluginOffloader()
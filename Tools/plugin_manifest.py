@@ -0,0 +1,88 @@
+import ast
+
+
+def read_manifest(entry: str) -> dict | None:
+    """
+    从插件入口文件中读取 PLUGIN_MANIFEST（只解析源码，不执行插件）。
+
+    PLUGIN_MANIFEST 必须是字面量字典，例如：
+        PLUGIN_MANIFEST = {
+            "keyword": "Any",                    # 与 TRIGGHT_KEYWORD 相同
+            "help": "{reminder}whois 域名 —> 查询域名注册信息",
+            "triggers": ["whois"],               # 可选，消息中包含任意一个时才导入
+            "events": ["GroupMessageEvent"],     # 可选，只在这些事件类型到来时导入
+        }
+    没有清单或清单不合法时返回 None，插件按原方式在启动时导入。
+    """
+    try:
+        with open(entry, "r", encoding="utf-8") as f:
+            source = f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if "PLUGIN_MANIFEST" not in source:
+        return None
+
+    try:
+        tree = ast.parse(source, entry)
+    except SyntaxError:
+        return None  # 交给正常导入流程报告语法错误
+
+    for node in tree.body:
+        if (isinstance(node, ast.Assign)
+                and any(isinstance(t, ast.Name) and t.id == "PLUGIN_MANIFEST" for t in node.targets)):
+            try:
+                manifest = ast.literal_eval(node.value)
+            except ValueError:
+                print(f"插件清单 {entry} 不是字面量，忽略清单")
+                return None
+            if not isinstance(manifest, dict) or not isinstance(manifest.get("keyword"), str):
+                print(f"插件清单 {entry} 缺少字符串类型的 keyword，忽略清单")
+                return None
+            return manifest
+    return None
+
+
+def help_message(manifest: dict, reminder: str = "", bot_name: str = "") -> str | None:
+    """
+    清单中的帮助文本，替换 {reminder} 与 {bot_name} 占位。
+
+    插件导入后的 HELP_MESSAGE 也应由它生成（HELP_MESSAGE = help_message(PLUGIN_MANIFEST, ...)），
+    帮助文本只在清单中维护一份，导入前后显示的内容相同。
+    """
+    text = manifest.get("help")
+    if not isinstance(text, str):
+        return None
+    return text.replace("{reminder}", reminder).replace("{bot_name}", bot_name)
+
+
+class LazyPlugin:
+    """
+    尚未导入的插件占位。
+
+    只携带清单中的触发信息和帮助文本，第一次遇到匹配的事件时由主程序导入真正的
+    插件模块并替换掉占位，此后与普通插件完全相同。
+    """
+
+    def __init__(self, name: str, entry: str, manifest: dict, reminder: str = "", bot_name: str = ""):
+        self.__name__ = name
+        self.entry = entry
+        self.TRIGGHT_KEYWORD = manifest["keyword"]
+        if (text := help_message(manifest, reminder, bot_name)) is not None:
+            self.HELP_MESSAGE = text
+        self.triggers = tuple(manifest.get("triggers", ()))
+        self.events = frozenset(manifest.get("events", ()))
+
+    def wants(self, event) -> bool:
+        """Any 类插件：当前事件是否需要导入该插件"""
+        if self.events and type(event).__name__ not in self.events:
+            return False
+        if not self.triggers:
+            return True
+        message = getattr(event, "message", None)
+        if message is None:
+            return False
+        text = str(message)
+        return any(t in text for t in self.triggers)
+
+    def __repr__(self):
+        return f"<lazy plugin '{self.__name__}' from '{self.entry}'>"
@@ -0,0 +1,72 @@
+import os
+import time
+
+from Hyper import Configurator
+
+
+class Settings:
+    """
+    由核心持有的唯一配置快照。
+
+    config.json 只在启动时和文件发生变化后解析一次，解析成功后整体替换
+    Configurator.cm 与下列常用字段；插件通过上下文中的 settings 参数读取，
+    不需要在导入时重新解析配置，也不需要在每条消息中调用 get_cfg()。
+    """
+
+    def __init__(self, file: str = "config.json", check_interval: float = 1.0):
+        self.file = file
+        self.check_interval = check_interval
+        self._stamp = None
+        self._last_check = 0.0
+        self.reload()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.file)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def reload(self) -> None:
+        stamp = self._stat()
+        cm = Configurator.ConfigManager(Configurator.Config(file=self.file).load_from_file())
+        cfg = cm.get_cfg()
+        others = cfg.others
+
+        # 先完整构建新快照，再一次性替换，读取方不会看到新旧混合的状态
+        values = {
+            "cfg": cfg,
+            "others": others,
+            "owner": cfg.owner,
+            "reminder": others["reminder"],
+            "bot_name": others["bot_name"],
+            "bot_name_en": others["bot_name_en"],
+            "slogan": others["slogan"],
+            "confused_words": others.get("confused_words", "你没有权限(ー_ー)!!"),
+            "root_users": list(others["ROOT_User"]),
+        }
+        self.__dict__.update(values)
+        Configurator.cm = cm
+        self._stamp = stamp
+        self._last_check = time.monotonic()
+
+    def refresh(self) -> bool:
+        """config.json 被修改时重新加载，返回是否发生了重载"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        if self._stat() == self._stamp:
+            return False
+        try:
+            self.reload()
+        except Exception as e:
+            # 文件可能正在被写入，保留旧快照，下次再试
+            print(f"sys: 重新加载 {self.file} 失败: {e}")
+            self._stamp = self._stat()
+            return False
+        print(f"sys: {self.file} 已重新加载")
+        return True
+
+    def get(self, key: str, default=None):
+        return self.others.get(key, default)
@@ -31,6 +31,16 @@ class Catcher:
         # await self.page.close() 
         return path
 
+    async def render(self, html: str, size: tuple[int, int]) -> bytes:
+        """直接渲染 HTML 字符串并返回 PNG 数据，不经过临时文件"""
+        page = await self.context.new_page()
+        try:
+            await page.set_viewport_size({"width": size[0], "height": size[1]})
+            await page.set_content(html)
+            return await page.screenshot()
+        finally:
+            await page.close()
+
     async def quit(self) -> None:
         if self.context:
             await self.context.close()
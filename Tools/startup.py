@@ -0,0 +1,66 @@
+import builtins
+import sys
+import time
+
+
+class StartupReport:
+    """
+    启动耗时统计，使用 --startup-report 启动时开启。
+
+    mark() 记录各个启动阶段的耗时；开启后还会包装 __import__，记录每个
+    首次导入的模块（含其子依赖）的耗时，Listener 连接前打印汇总。
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started = self._last = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+        self.imports: list[tuple[int, str, float]] = []  # (嵌套深度, 模块名, 耗时)
+        self._depth = 0
+        self._import = None
+        if enabled:
+            self._hook()
+
+    def _hook(self):
+        original = self._import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            depth = self._depth
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self._depth = depth
+                self.imports.append((depth, name, time.perf_counter() - start))
+
+        builtins.__import__ = timed_import
+
+    def mark(self, name: str) -> None:
+        """记录从上一个阶段结束到现在的耗时"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def report(self, top: int = 15) -> str:
+        total = time.perf_counter() - self.started
+        lines = [f"启动耗时 {total * 1000:.0f} ms", "—— 阶段 ——"]
+        lines += [f"  {name:<24}{cost * 1000:>9.1f} ms" for name, cost in self.phases]
+        if self.imports:
+            lines.append("—— 顶层导入 ——")
+            lines += [f"  {name:<24}{cost * 1000:>9.1f} ms" for depth, name, cost in self.imports if depth == 0]
+            lines.append(f"—— 最慢的 {top} 个模块（含子依赖） ——")
+            slowest = sorted(self.imports, key=lambda i: i[2], reverse=True)[:top]
+            lines += [f"  {name:<24}{cost * 1000:>9.1f} ms" for depth, name, cost in slowest]
+        return "\n".join(lines)
+
+    def finish(self) -> None:
+        """打印汇总并还原 __import__"""
+        if not self.enabled:
+            return
+        if self._import is not None:
+            builtins.__import__ = self._import
+            self._import = None
+        print(self.report())
@@ -0,0 +1,159 @@
+import asyncio
+import shutil
+import threading
+import time
+from collections import deque, namedtuple
+
+from Tools.background import background
+from Tools.plugin_guard import plugin_offloader
+from Tools.workers import image_pool
+
+# image_pending：图像工作池排队的任务数；offloaded：在线程中执行的插件数；background_tasks：后台循环中的任务数
+Sample = namedtuple("Sample", "time cpu memory used_memory lag_ms events_per_s threads image_pending offloaded "
+                              "background_tasks gpu")
+
+# 可在 状态 中统计 最低/平均/最高 的指标
+METRICS = ("cpu", "memory", "lag_ms", "events_per_s", "threads", "image_pending", "offloaded", "background_tasks")
+
+
+class SystemStats:
+    """
+    后台系统状态采样器。
+
+    在后台事件循环中每隔 interval 秒采样一次 CPU、内存、事件循环延迟、事件吞吐量、
+    活动线程数以及各个队列的深度，保存最近 window 秒的数据。状态 命令直接读取最新的快照，
+    不会再阻塞 1 秒等待 cpu_percent 或调用 nvidia-smi。
+
+    Hyper 为每个事件开一个线程，活动线程数约等于正在处理的事件数；延迟是后台循环
+    被唤醒的延迟，主要反映 GIL 被长时间占用（例如在事件线程中做 CPU 密集的工作）。
+    """
+
+    def __init__(self, interval: float = 5.0, window: float = 15 * 60):
+        self.interval = interval
+        self.samples: deque[Sample] = deque(maxlen=int(window // interval) + 1)
+        self.events = 0  # handler 收到的事件总数
+        self.static = {}
+        self._task = None  # 后台循环中的采样任务（concurrent.futures.Future）
+        self._lock = threading.Lock()  # 各个事件线程同时计数
+
+    def count_event(self) -> None:
+        with self._lock:
+            self.events += 1
+
+    def start(self) -> None:
+        """在后台事件循环中启动采样任务，重复调用无副作用（可在任意线程调用）"""
+        if self._task is None:
+            with self._lock:
+                if self._task is None:
+                    self._task = background.submit(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @staticmethod
+    def _load_gputil():
+        # GPUtil 是可选依赖，并且它依赖 nvidia-smi；没有 GPU 的主机上直接跳过
+        if shutil.which("nvidia-smi") is None:
+            return None
+        try:
+            import GPUtil
+        except ImportError:
+            return None
+        return GPUtil
+
+    @staticmethod
+    def _gpu_loads(gputil) -> list[float]:
+        try:
+            return [gpu.load for gpu in gputil.getGPUs()]
+        except Exception:
+            return []
+
+    def _load_static(self) -> None:
+        import platform
+        import psutil
+
+        self.static = {
+            "version_info": platform.platform(),
+            "architecture": platform.architecture(),
+            "cpu_count": psutil.cpu_count(logical=True),
+            "total_memory": psutil.virtual_memory().total,
+        }
+
+    async def _run(self) -> None:
+        try:
+            await self._sample_forever()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"sys: 系统状态采样已停止: {e}")
+
+    async def _sample_forever(self) -> None:
+        import psutil
+
+        self._load_static()
+        gputil = self._load_gputil()
+        psutil.cpu_percent(interval=None)  # 第一次调用只用于建立基准
+
+        loop = asyncio.get_running_loop()
+        last, last_events = loop.time(), self.events
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+
+            vm = psutil.virtual_memory()
+            gpu = await asyncio.to_thread(self._gpu_loads, gputil) if gputil else []
+            events = self.events
+            self.samples.append(Sample(
+                time=time.time(),
+                cpu=psutil.cpu_percent(interval=None),
+                memory=vm.percent,
+                used_memory=vm.used,
+                lag_ms=max(now - expected, 0.0) * 1000,
+                events_per_s=(events - last_events) / (now - last),
+                threads=threading.active_count(),
+                image_pending=image_pool.pending,
+                offloaded=plugin_offloader.running,
+                background_tasks=len(asyncio.all_tasks(loop)) - 1,  # 不计采样任务自身
+                gpu=gpu,
+            ))
+            last, last_events = now, events
+
+    def latest(self) -> Sample | None:
+        return self.samples[-1] if self.samples else None
+
+    def summary(self, minutes: float) -> dict | None:
+        """最近 minutes 分钟内各指标的 (最低, 平均, 最高)，没有数据时返回 None"""
+        since = time.time() - minutes * 60
+        window = [s for s in self.samples if s.time >= since]
+        if not window:
+            return None
+        result = {}
+        for name in METRICS:
+            values = [getattr(s, name) for s in window]
+            result[name] = (min(values), sum(values) / len(values), max(values))
+        return result
+
+    def info(self) -> dict:
+        """与旧版 get_system_info() 相同格式的最新快照"""
+        if not self.static:
+            self._load_static()
+        sample = self.latest()
+        if sample is None:
+            import psutil
+
+            vm = psutil.virtual_memory()
+            sample = Sample(time.time(), psutil.cpu_percent(interval=None), vm.percent, vm.used, 0.0, 0.0, 0, 0, 0, 0, [])
+        return {
+            **self.static,
+            "cpu_usage": sample.cpu,
+            "used_memory": sample.used_memory,
+            "memory_usage_percentage": sample.memory,
+            "gpu_count": len(sample.gpu),
+            "gpu_usage": sample.gpu,
+        }
+
+
+system_stats = SystemStats()
@@ -0,0 +1,194 @@
+import base64
+import glob
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def to_segment_file(data: bytes) -> str:
+    """把内存中的媒体数据转换为 OneBot 可直接发送的 base64 文件字段，无需落盘"""
+    return "base64://" + base64.b64encode(data).decode()
+
+
+class TempScope:
+    """TempArena.scope() 返回的作用域，离开作用域时删除其中分配的全部文件"""
+
+    def __init__(self, arena: "TempArena"):
+        self.arena = arena
+        self.paths: list[str] = []
+
+    def path(self, suffix: str = "", prefix: str = "") -> str:
+        path = self.arena._allocate(suffix, prefix, pinned=True)
+        self.paths.append(path)
+        return path
+
+    def close(self) -> None:
+        for path in self.paths:
+            self.arena.release(path)
+        self.paths.clear()
+
+
+class TempArena:
+    """
+    统一管理的临时文件目录。
+
+    path() 分配不会重名的文件路径；scope() 中分配的文件在离开作用域时删除，
+    适合“写入 -> 上传/发送 -> 丢弃”的场景。不在作用域中的文件计入总容量配额，
+    超出 max_bytes 时按最近使用时间淘汰最旧的文件，作用域中的文件不会被淘汰。
+
+    各个事件线程会同时使用：锁只保护记录的修改，统计大小和删除文件都在锁外进行。
+    总大小是按记录累加的运行总数，每次分配只统计新分配且大小还未稳定的文件，
+    只有总数超过配额时才重新统计所有文件并淘汰。
+    """
+
+    def __init__(self, root: str = "./temps/arena", max_bytes: int = 512 * 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.files: OrderedDict[str, int] = OrderedDict()  # 路径 -> 上次统计的大小，按最近使用排序
+        self.pinned: set[str] = set()
+        self.total = 0  # files 中记录的大小之和
+        self.evicted = 0
+        self._unsettled: set[str] = set()  # 不在作用域中、大小可能仍在变化的文件
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+        # 上次运行遗留的文件同样计入配额
+        files = []
+        for name in os.listdir(self.root):
+            file = os.path.join(self.root, name)
+            stat = os.stat(file)
+            files.append((stat.st_mtime, file, stat.st_size))
+        for _, file, size in sorted(files):
+            self.files[file] = size
+            self.total += size
+
+    def _allocate(self, suffix: str, prefix: str, pinned: bool) -> str:
+        path = os.path.join(self.root, f"{prefix}{uuid.uuid4().hex}{suffix}")
+        with self._lock:
+            unsettled = list(self._unsettled)
+            self.files[path] = 0
+            if pinned:
+                self.pinned.add(path)
+            else:
+                self._unsettled.add(path)
+        if unsettled:
+            self._measure(unsettled)
+        if self.total > self.max_bytes:
+            self.enforce()
+        return path
+
+    def path(self, suffix: str = "", prefix: str = "") -> str:
+        """分配一个长期有效的路径（受配额约束，可能在之后被淘汰）"""
+        return self._allocate(suffix, prefix, pinned=False)
+
+    @contextmanager
+    def scope(self):
+        """with arena.scope() as scope: path = scope.path(".png")"""
+        scope = TempScope(self)
+        try:
+            yield scope
+        finally:
+            scope.close()
+
+    def touch(self, path: str) -> None:
+        """标记为最近使用"""
+        with self._lock:
+            if path in self.files:
+                self.files.move_to_end(path)
+
+    def release(self, path: str) -> None:
+        """立即删除一个由本目录分配的文件"""
+        with self._lock:
+            self.total -= self.files.pop(path, 0)
+            self.pinned.discard(path)
+            self._unsettled.discard(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _measure(self, paths) -> None:
+        """统计文件大小并更新记录；大小与上次相同且不为 0 的文件视为已写完，之后不再统计"""
+        sizes = {}
+        for path in paths:
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                sizes[path] = 0  # 尚未写入或已被外部删除
+        with self._lock:
+            for path, size in sizes.items():
+                if path not in self.files:
+                    continue  # 统计期间已被删除
+                old = self.files[path]
+                self.files[path] = size
+                self.total += size - old
+                if size and size == old:
+                    self._unsettled.discard(path)
+
+    def size(self) -> int:
+        return self.total
+
+    def enforce(self) -> None:
+        """总大小超出配额时按最近使用时间淘汰未被占用的文件"""
+        with self._lock:
+            paths = list(self.files)
+        self._measure(paths)
+
+        victims = []
+        with self._lock:
+            for path in list(self.files):
+                if self.total <= self.max_bytes:
+                    break
+                if path in self.pinned or not self.files[path]:
+                    continue  # 尚未写入的文件淘汰了也不能腾出空间，反而会让写入方留下无人管理的文件
+                self.total -= self.files.pop(path)
+                self._unsettled.discard(path)
+                victims.append(path)
+            self.evicted += len(victims)
+        for path in victims:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self.files),
+                "pinned": len(self.pinned),
+                "bytes": self.total,
+                "evicted": self.evicted,
+            }
+
+
+def clean_legacy_temps() -> int:
+    """删除旧版本遗留且不会再被读取的临时文件，返回删除的数量"""
+    patterns = (
+        "./temps/google_*",
+        "./temps/quote_*.html",
+        "./temps/quote.png",
+        "./temps/web_*.png",
+        "./responseVoice_*.wav",
+        "./temp_music/music_*.mp3",
+    )
+    removed = 0
+    for pattern in patterns:
+        for file in glob.glob(pattern):
+            try:
+                os.remove(file)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+_arena: TempArena | None = None
+
+
+def get_temp_arena() -> TempArena:
+    global _arena
+    if _arena is None:
+        _arena = TempArena()
+    return _arena
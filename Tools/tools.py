@@ -1,10 +1,6 @@
-from PIL import Image
 from typing import Tuple, Optional, Any
-import platform
-import psutil
-import GPUtil
 import io, gc, os
-import edge_tts
+# PIL、psutil、GPUtil、edge_tts 较重，在用到它们的函数中按需导入
 
 def title() -> str:
     return r'''# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -16,16 +12,13 @@ def title() -> str:
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~'''
 
 async def amain(TEXT, voiceColor, rate, volume, pitch):
+    import edge_tts
     try:
+        from Tools.temp_arena import get_temp_arena
         communicate = edge_tts.Communicate(TEXT, voiceColor, rate = rate, volume=volume, pitch=pitch)
-        
-        tts_num = 0
-        output_path_base = r"./responseVoice"
-        output_path = f"{os.path.abspath(output_path_base)}_{tts_num}.wav"
-        while os.path.exists(output_path):
-            tts_num += 1
-            output_path = f"{os.path.abspath(output_path_base)}_{tts_num}.wav"
-            
+
+        # 路径不会重名，文件计入临时目录配额，超出后自动淘汰
+        output_path = get_temp_arena().path(".wav", "responseVoice_")
         await communicate.save(output_path)
         return output_path
     except Exception as e:
@@ -40,6 +33,7 @@ def seconds_to_hms(total_seconds):
     return f"{hours}h, {minutes}m, {seconds}s"
 
 def verfiy_pixiv(file_path):
+    from PIL import Image
     try:
         img = Image.open(file_path)
         img.verify()  # 验证图像
@@ -49,59 +43,130 @@ def verfiy_pixiv(file_path):
         print(f"Error: {e}")
         return False
 
+def verify_image_data(data: bytes) -> bool:
+    """
+    完整解码内存中的图片（动图的每一帧），数据损坏或不是图片时返回 False。
+    verify() 只检查文件头，截断的 GIF 要逐帧解码才能发现。解码耗 CPU，请在 image_pool 中调用。
+    """
+    from PIL import Image, ImageSequence
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            for frame in ImageSequence.Iterator(img):
+                frame.load()
+        return True
+    except (OSError, SyntaxError, ValueError) as e:
+        print(f"Error: {e}")
+        return False
+
 def get_system_info():
-    # 系统
-    version_info = platform.platform()
-    architecture = platform.architecture()
-    cpu_count = psutil.cpu_count(logical=True)
-    cpu_usage = psutil.cpu_percent(interval=1)
-
-    # 内存
-    virtual_memory = psutil.virtual_memory()
-    total_memory = virtual_memory.total
-    used_memory = virtual_memory.used
-    memory_usage_percentage = virtual_memory.percent
-
-    # GPU信息（是否有）
-    gpus = GPUtil.getGPUs()
-    if gpus:
-        gpu_count = len(gpus)
-        gpu_usage = [gpu.load for gpu in gpus]
+    # 读取后台采样器的最新快照，不再阻塞等待 cpu_percent(interval=1)
+    from Tools.system_stats import system_stats
+    return system_stats.info()
+
+
+def _encode_jpeg(img, quality, buffer) -> int:
+    """把 img 编码到同一个 buffer 中（覆盖旧内容），返回字节数"""
+    buffer.seek(0)
+    buffer.truncate()
+    img.save(buffer, format='JPEG', quality=quality)
+    return buffer.tell()
+
+def _make_probe(img, probe_pixels=500_000):
+    """缩小到约 probe_pixels 像素的探针图，以及原图与探针图的像素比；小图返回 (None, 1)"""
+    pixels = img.width * img.height
+    if pixels <= probe_pixels:
+        return None, 1.0
+    from PIL import Image
+    scale = (probe_pixels / pixels) ** 0.5
+    # 最近邻采样保留了原图的细节密度（平滑缩放会抹掉噪点，导致低估大小），速度也最快
+    probe = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.NEAREST)
+    return probe, pixels / (probe.width * probe.height)
+
+def _probe_quality(probe, limit, lo, hi, buffer) -> int:
+    """在探针图上二分查找大小不超过 limit 的最高质量，全部超出时返回 lo"""
+    while lo < hi:
+        q = (lo + hi + 1) // 2
+        if _encode_jpeg(probe, q, buffer) <= limit:
+            lo = q
+        else:
+            hi = q - 1
+    return lo
+
+def _next_quality(points, lo, hi, target):
+    """
+    根据已测得的 (质量, 大小) 估计下一个要尝试的质量：
+    JPEG 大小的对数与质量近似线性，取离目标最近的两个点做割线插值。
+    """
+    import math
+    above = [p for p in points if p[1] > target]
+    below = [p for p in points if p[1] <= target]
+    if above and below:
+        pair = (min(above), max(below))
     else:
-        gpu_count = 0
-        gpu_usage = []
-
-    return {
-        "version_info": version_info,
-        "architecture": architecture,
-        "cpu_count": cpu_count,
-        "cpu_usage": cpu_usage,
-        "total_memory": total_memory,
-        "used_memory": used_memory,
-        "memory_usage_percentage": memory_usage_percentage,
-        "gpu_count": gpu_count,
-        "gpu_usage": gpu_usage,
-    }
-
-
-def deal_image(i):
+        pair = sorted(points, key=lambda p: abs(math.log(p[1] / target)))[:2]
+    (q1, s1), (q2, s2) = pair
+    if q1 == q2 or s1 == s2:
+        return (lo + hi + 1) // 2
+    q = q1 + (math.log(target) - math.log(s1)) * (q2 - q1) / (math.log(s2) - math.log(s1))
+    return min(max(int(q), lo + 1), hi)
+
+def deal_image(i, max_size=10 * 1024 * 1024, min_quality=10, tolerance=3, min_side=512):
+    """
+    把图片压缩为不超过 max_size 的 JPEG，尽量保留最高的质量。
+
+    第一次的质量由缩小的探针图估算，之后根据已经测得的全尺寸大小做割线插值
+    （目标略低于上限，以便更快得到满足限制的结果），质量差距小于 tolerance
+    时停止。质量降到 min_quality 仍然过大时按比例缩小分辨率（短边不小于
+    min_side）后重试。所有编码复用同一个 buffer。
+    """
+    from PIL import Image
     img = Image.open(io.BytesIO(i))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")  # JPEG 不支持透明通道和调色板
 
-    # 压缩图像
     buffer = io.BytesIO()
-    quality = 100  # 从100开始，逐渐降低质量直到小于10MB
-    max_size = 10 * 1024 * 1024  # 10MB
-
-    # 循环压缩图像，直到达到指定大小
+    target = max_size * 0.97
     while True:
-        buffer.seek(0)
-        img.save(buffer, format='JPEG', quality=quality)
-        if buffer.tell() < max_size or quality <= 10:  # 停止条件
-            break
-        quality -= 5  # 每次减少质量
-        
-    # 最终的压缩图像存储在buffer中
-    return buffer.getvalue()
+        probe, ratio = _make_probe(img)
+        best = None
+        lo, hi = min_quality - 1, 100  # lo：已知满足限制的最高质量；hi：尚未被否定的最高质量
+        if probe is None or _encode_jpeg(probe, 100, buffer) * ratio <= max_size:
+            q = 100  # 大多数图片不需要降低质量，一次编码即可
+        else:
+            q = _probe_quality(probe, target / ratio, min_quality, 99, buffer)
+
+        points = []
+        while True:
+            size = _encode_jpeg(img, q, buffer)
+            points.append((q, size))
+            if size <= max_size:
+                best, lo = buffer.getvalue(), q
+            else:
+                hi = q - 1
+            if hi - lo <= tolerance or hi < min_quality:
+                break
+
+            if len(points) == 1:
+                # 只有一个点时沿用探针的曲线形状：按实际大小校正后再估一次
+                if probe is not None:
+                    correction = size / (_encode_jpeg(probe, q, buffer) * ratio)
+                    q = _probe_quality(probe, target / (ratio * correction), lo + 1, hi, buffer)
+                else:
+                    q = (lo + hi + 1) // 2
+            else:
+                q = _next_quality(points, lo, hi, target)
+
+        if best is not None:
+            return best
+
+        # 最低质量仍然过大：缩小分辨率
+        size = _encode_jpeg(img, min_quality, buffer)
+        if size <= max_size:
+            return buffer.getvalue()
+        scale = (max_size / size) ** 0.5 * 0.95
+        if min(img.size) * scale < min_side:
+            return buffer.getvalue()  # 不能再缩小了，返回最低质量的结果
+        img = img.resize((int(img.width * scale), int(img.height * scale)), Image.LANCZOS)
 
 async def get_user_info(uid, Manager, actions) -> Tuple[bool, Optional[dict]]:
     try:
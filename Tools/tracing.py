@@ -0,0 +1,174 @@
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+_NULL = contextlib.nullcontext()
+_current: contextvars.ContextVar["_Trace | None"] = contextvars.ContextVar("jianer_trace", default=None)
+
+
+class _Trace:
+    """一个事件的追踪：编号与尚未结束的手动 span"""
+
+    __slots__ = ("id", "open")
+
+    def __init__(self, trace_id: int):
+        self.id = trace_id
+        self.open: list[_Span] = []
+
+
+class _Span:
+    __slots__ = ("tracer", "trace", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: "Tracer", trace: _Trace, name: str, cat: str, args: dict):
+        self.tracer = tracer
+        self.trace = trace
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = time.perf_counter_ns()
+
+    def end(self, **args) -> None:
+        if self.start is None:
+            return  # 已经结束
+        if args:
+            self.args.update(args)
+        self.tracer._record(self.trace.id, self.name, self.cat, self.start, time.perf_counter_ns(), self.args)
+        self.start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.end()
+
+
+class Tracer:
+    """
+    每个事件的 span 追踪，导出为 Chrome trace 格式（可用 Perfetto / chrome://tracing 打开）。
+
+    handler 被 traced_event 包装：开启时为每个事件分配一个追踪编号（同时作为导出文件
+    中的“线程”，每个事件占一行），之后在同一事件中 tracer.span(...) 记录的 span 都归属
+    这个事件。完成的 span 保存在最多 capacity 条的环形缓冲区中，由管理员命令或信号导出。
+    关闭时 span() 直接返回共享的空上下文管理器，traced_event 只多一次属性判断。
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        self.enabled = False
+        self.spans: deque[tuple] = deque(maxlen=capacity)  # (追踪编号, 名称, 分类, 开始 ns, 结束 ns, 参数)
+        self._ids = itertools.count(1)
+        self._origin = time.perf_counter_ns()
+        self._wall_origin = time.time()
+        self._lock = threading.Lock()
+
+    # ---------- 记录 ----------
+
+    def traced_event(self, handler):
+        """包装 handler(event, actions)"""
+        @functools.wraps(handler)
+        async def wrapper(event, actions):
+            if not self.enabled:
+                return await handler(event, actions)
+            self._trace_actions(actions)
+            trace = _Trace(next(self._ids))
+            token = _current.set(trace)
+            span = _Span(self, trace, type(event).__name__, "event", {
+                key: value for key in ("message_id", "user_id", "group_id")
+                if (value := getattr(event, key, None)) is not None
+            })
+            try:
+                return await handler(event, actions)
+            finally:
+                for pending in reversed(trace.open):
+                    pending.end()
+                span.end()
+                _current.reset(token)
+        return wrapper
+
+    def span(self, name: str, cat: str = "stage", **args):
+        """with tracer.span("preset"): ... 记录一段耗时；不在追踪中的事件里什么也不做"""
+        if not self.enabled or (trace := _current.get()) is None:
+            return _NULL
+        return _Span(self, trace, name, cat, args)
+
+    def start(self, name: str, cat: str = "stage", **args) -> _Span | None:
+        """开始一个手动结束的 span（span.end()），事件结束时仍未结束的会被自动结束"""
+        if not self.enabled or (trace := _current.get()) is None:
+            return None
+        span = _Span(self, trace, name, cat, args)
+        trace.open.append(span)
+        return span
+
+    def instant(self, name: str, **args) -> None:
+        """记录一个时间点（例如收到第一个 token）"""
+        if self.enabled and (trace := _current.get()) is not None:
+            now = time.perf_counter_ns()
+            self._record(trace.id, name, "mark", now, None, args)
+
+    def _record(self, trace_id, name, cat, start, end, args) -> None:
+        self.spans.append((trace_id, name, cat, start, end, args))
+
+    def _trace_actions(self, actions) -> None:
+        """actions 在所有事件之间共享，第一次开启追踪时为 send 加上 span"""
+        send = actions.send
+        if getattr(send, "__traced__", False):
+            return
+        with self._lock:
+            if getattr(actions.send, "__traced__", False):
+                return
+
+            @functools.wraps(send)
+            async def traced_send(*args, **kwargs):
+                with self.span("actions.send", "api"):
+                    return await send(*args, **kwargs)
+
+            traced_send.__traced__ = True
+            actions.send = traced_send
+
+    # ---------- 导出 ----------
+
+    def chrome_trace(self) -> dict:
+        def us(ns: int) -> float:
+            return (ns - self._origin) / 1000
+
+        events, names = [], {}
+        for trace_id, name, cat, start, end, args in list(self.spans):
+            if end is None:
+                events.append({"name": name, "cat": cat, "ph": "i", "s": "t", "ts": us(start),
+                               "pid": 1, "tid": trace_id, "args": args})
+                continue
+            events.append({"name": name, "cat": cat, "ph": "X", "ts": us(start), "dur": (end - start) / 1000,
+                           "pid": 1, "tid": trace_id, "args": args})
+            if cat == "event":
+                names[trace_id] = f"#{trace_id} {name} {args.get('message_id', '')}".rstrip()
+        for trace_id, label in names.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": trace_id, "args": {"name": label}})
+        events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "Jianer"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"wall_clock_origin": self._wall_origin}}
+
+    def export(self, path: str | None = None) -> str:
+        """写出 Chrome trace JSON，返回文件路径"""
+        if path is None:
+            path = os.path.join("logs", f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+        return path
+
+    def install_signal(self) -> None:
+        """收到 SIGUSR1 时导出（仅 POSIX，必须在主线程中调用）"""
+        import signal
+
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda *_: print(f"追踪数据已导出到 {self.export()}"))
+
+
+tracer = Tracer()
@@ -0,0 +1,176 @@
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from Tools.log import get_logger
+
+log = get_logger("tts")
+
+DEFAULT_TTS = {
+    "voiceColor": "zh-CN-XiaoyiNeural",
+    "rate": "+0%",
+    "volume": "+0%",
+    "pitch": "+0Hz",
+}
+
+
+class TTSCache:
+    """
+    按 (文本, 音色, 语速, 音量, 音调) 缓存合成结果的磁盘 LRU。
+
+    各个事件线程共用同一个缓存：entries 与 size 只在持有锁时修改，读写文件在锁外进行。
+    """
+
+    def __init__(self, path: str = "./temps/tts_cache", max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: OrderedDict[str, int] = OrderedDict()  # key -> 文件大小，按最近使用排序
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+        files = []
+        for name in os.listdir(self.path):
+            if name.endswith(".tmp"):  # 上次退出时未写完的文件
+                os.remove(os.path.join(self.path, name))
+                continue
+            stat = os.stat(os.path.join(self.path, name))
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+            self.size += size
+
+    @staticmethod
+    def key(text, voice, rate, volume, pitch) -> str:
+        raw = "\x00".join((text, voice, rate, volume, pitch))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest() + ".mp3"
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        file = os.path.join(self.path, key)
+        try:
+            with open(file, "rb") as f:
+                data = f.read()
+        except OSError:
+            # 文件可能刚被另一个线程淘汰
+            with self._lock:
+                self.size -= self.entries.pop(key, 0)
+            return None
+        try:
+            os.utime(file)  # 重启后仍能按使用时间恢复 LRU 顺序
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if not data or len(data) > self.max_bytes:
+            return
+        file = os.path.join(self.path, key)
+        temp = f"{file}.{threading.get_ident()}.tmp"
+        with open(temp, "wb") as f:
+            f.write(data)
+        os.replace(temp, file)  # 同时读取该文件的线程不会读到写了一半的内容
+
+        evicted = []
+        with self._lock:
+            self.size -= self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            self.size += len(data)
+            while self.size > self.max_bytes and self.entries:
+                old, size = self.entries.popitem(last=False)
+                self.size -= size
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(os.path.join(self.path, old))
+            except OSError:
+                pass
+
+
+_cache: TTSCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> TTSCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTSCache()
+    return _cache
+
+
+async def synthesize(text, voiceColor, rate, volume, pitch) -> bytes:
+    """合成一段文本并直接返回内存中的音频（mp3），命中缓存时不访问网络"""
+    cache = get_cache()
+    key = cache.key(text, voiceColor, rate, volume, pitch)
+    if (data := cache.get(key)) is not None:
+        return data
+
+    import edge_tts  # 第一次合成时才导入
+
+    communicate = edge_tts.Communicate(text, voiceColor, rate=rate, volume=volume, pitch=pitch)
+    audio = bytearray()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio += chunk["data"]
+
+    data = bytes(audio)
+    cache.put(key, data)
+    return data
+
+
+class TTSPipeline:
+    """
+    与文本生成并行的语音合成流水线。
+
+    每当 StreamSplitter 产出一段文本就立即开始合成该段，回答结束时按顺序
+    拼接各段的 mp3 帧，因此语音几乎紧跟在最后一条文字消息之后发出。
+    """
+
+    def __init__(self, settings: dict | None = None):
+        settings = settings or {}
+        self.voice = (
+            settings.get("voiceColor", DEFAULT_TTS["voiceColor"]),
+            settings.get("rate", DEFAULT_TTS["rate"]),
+            settings.get("volume", DEFAULT_TTS["volume"]),
+            settings.get("pitch", DEFAULT_TTS["pitch"]),
+        )
+        self.tasks: list[asyncio.Task] = []
+        self.started = time.time()
+
+    @property
+    def fed(self) -> bool:
+        return bool(self.tasks)
+
+    def feed(self, text: str) -> None:
+        text = text.strip()
+        if text:
+            self.tasks.append(asyncio.create_task(synthesize(text, *self.voice)))
+
+    async def finish(self) -> bytes | None:
+        results = await asyncio.gather(*self.tasks, return_exceptions=True)
+        audio = b""
+        for r in results:
+            if isinstance(r, Exception):
+                log.debug("分段合成失败 %r", r)
+                continue
+            audio += r
+        log.debug("%d 段，回答开始后 %.2fs 完成", len(self.tasks), time.time() - self.started)
+        return audio or None
+
+    def cancel(self) -> None:
+        for t in self.tasks:
+            t.cancel()
+
+    @staticmethod
+    def to_segment_file(audio: bytes) -> str:
+        """转换为 OneBot 可直接发送的 base64 文件字段，无需落盘"""
+        return "base64://" + base64.b64encode(audio).decode()
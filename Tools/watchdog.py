@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque, namedtuple
+
+from Tools.background import background
+from Tools.log import get_logger
+
+log = get_logger("watchdog")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_DIR = os.path.join(ROOT, "plugins")
+
+# culprit：造成阻塞的插件或模块；where：阻塞时正在执行的最内层调用
+Stall = namedtuple("Stall", "time label culprit where duration_ms stack")
+
+
+class _Watched:
+    """一个被监视的事件循环"""
+
+    __slots__ = ("label", "thread_id", "beat", "stall_started", "stack", "culprit", "where")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.thread_id = threading.get_ident()
+        self.beat = time.monotonic()
+        self.stall_started = None  # 检测到阻塞的时间
+        self.stack = self.culprit = self.where = None
+
+
+class LoopWatchdog:
+    """
+    事件循环阻塞监视器。
+
+    Hyper 为每个事件开一个线程运行 asyncio.run()，协程中的 requests.get、time.sleep、
+    subprocess.run、Pillow 渲染等同步调用会卡住这个事件的循环（同一事件中并行的
+    发送、TTS 等都会停下），插件在后台循环中这样做则会卡住所有共享的后台任务。
+
+    每个被监视的循环中有一个每隔 interval 秒更新一次心跳的任务；采样线程发现某个
+    循环超过 threshold 秒没有心跳时，用 sys._current_frames() 取出该线程当前的调用栈，
+    从最内层向外找到第一个位于 plugins/ 或本仓库中的帧，作为造成阻塞的插件或模块，
+    写入日志并保留最近 history 条记录供 状态 命令显示。
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.5, history: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: deque[Stall] = deque(maxlen=history)
+        self.max_lag_ms = 0.0  # 心跳间隔超出 interval 的最大值
+        self.total = 0
+        self._watched: dict[int, _Watched] = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._background_watched = False
+
+    # ---------- 监视 ----------
+
+    def watched(self, handler):
+        """包装 handler(event, actions)：处理事件期间监视该事件的循环"""
+        @functools.wraps(handler)
+        async def wrapper(event, actions):
+            label = f"{type(event).__name__} {getattr(event, 'message_id', '') or ''}".rstrip()
+            state = self._register(label)
+            beat = asyncio.create_task(self._beat(state))
+            try:
+                return await handler(event, actions)
+            finally:
+                beat.cancel()
+                self._unregister(state)
+        return wrapper
+
+    def watch_background(self) -> None:
+        """监视共享的后台事件循环，重复调用无副作用"""
+        if self._background_watched:
+            return
+        with self._lock:
+            if self._background_watched:
+                return
+            self._background_watched = True
+
+        async def run():
+            await self._beat(self._register(background.name))
+
+        background.submit(run())
+
+    def _register(self, label: str) -> _Watched:
+        state = _Watched(label)
+        with self._lock:
+            self._watched[id(state)] = state
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_forever, name="loop-watchdog", daemon=True)
+                self._sampler.start()
+        return state
+
+    def _unregister(self, state: _Watched) -> None:
+        with self._lock:
+            self._watched.pop(id(state), None)
+            stall = self._end_stall(state, time.monotonic())
+        self._log_recovered(stall)
+
+    async def _beat(self, state: _Watched) -> None:
+        interval = self.interval
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            with self._lock:  # 与采样线程对 beat、stall_started 的检查互斥
+                lag = (now - state.beat - interval) * 1000
+                if lag > self.max_lag_ms:
+                    self.max_lag_ms = lag
+                stall = self._end_stall(state, now)
+                state.beat = now
+            self._log_recovered(stall)
+
+    # ---------- 采样 ----------
+
+    def _sample_forever(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            with self._lock:
+                stalled = [(s, s.beat) for s in self._watched.values()
+                           if s.stall_started is None and now - s.beat > self.interval + self.threshold]
+            if not stalled:
+                continue
+            frames = sys._current_frames()
+            for state, beat in stalled:
+                frame = frames.get(state.thread_id)
+                if frame is None:
+                    continue
+                stack = traceback.extract_stack(frame)
+                culprit, where = self.attribute(stack)
+                text = "".join(traceback.format_list(stack[-12:]))
+                with self._lock:
+                    # 取调用栈期间心跳可能已经恢复，此时不算阻塞
+                    if state.beat != beat or state.stall_started is not None:
+                        continue
+                    state.culprit, state.where, state.stack = culprit, where, text
+                    state.stall_started = beat
+                log.warning("事件循环被阻塞（%s）超过 %.0f ms：%s，位于 %s\n%s",
+                            state.label, (now - beat) * 1000, culprit, where, text)
+            del frames
+
+    @staticmethod
+    def attribute(stack: traceback.StackSummary) -> tuple[str, str]:
+        """从最内层向外找到第一个插件帧或本仓库中的帧，返回 (插件或模块, 最内层调用)"""
+        innermost = stack[-1]
+        where = f"{os.path.basename(innermost.filename)}:{innermost.lineno} {innermost.name}"
+        for frame in reversed(stack):
+            path = os.path.abspath(frame.filename)
+            if path.startswith(PLUGIN_DIR + os.sep):
+                plugin = os.path.relpath(path, PLUGIN_DIR).split(os.sep)[0]
+                return f"插件 {plugin.removesuffix('.py')} ({frame.name}:{frame.lineno})", where
+            if (path.startswith(ROOT + os.sep) and "site-packages" not in path
+                    and os.sep + "benchmarks" + os.sep not in path and os.path.basename(path) != "watchdog.py"):
+                return f"{os.path.relpath(path, ROOT)} ({frame.name}:{frame.lineno})", where
+        return where, where
+
+    def _end_stall(self, state: _Watched, now: float) -> Stall | None:
+        """结束 state 上正在记录的阻塞，调用方需持有 self._lock"""
+        started, state.stall_started = state.stall_started, None
+        if started is None:
+            return None
+        duration = (now - started) * 1000
+        self.max_lag_ms = max(self.max_lag_ms, duration)
+        self.total += 1
+        stall = Stall(time.time(), state.label, state.culprit, state.where, duration, state.stack)
+        self.stalls.append(stall)
+        return stall
+
+    @staticmethod
+    def _log_recovered(stall: Stall | None) -> None:
+        if stall is not None:
+            log.warning("事件循环阻塞结束（%s）：共 %.0f ms，%s", stall.label, stall.duration_ms, stall.culprit)
+
+    # ---------- 汇总 ----------
+
+    def report(self, limit: int = 3) -> str:
+        """状态 命令中显示的摘要"""
+        text = f"循环阻塞：{self.total} 次（阈值 {self.threshold * 1000:.0f} ms），最大心跳延迟 {self.max_lag_ms:.0f} ms"
+        with self._lock:
+            stalls = list(self.stalls)[-limit:][::-1]
+        for stall in stalls:
+            text += (f"\n  {time.strftime('%H:%M:%S', time.localtime(stall.time))} {stall.duration_ms:.0f} ms "
+                     f"{stall.culprit}")
+        return text
+
+
+loop_watchdog = LoopWatchdog()
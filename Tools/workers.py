@@ -0,0 +1,127 @@
+import asyncio
+import atexit
+import importlib.machinery
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+
+
+class WorkerPoolBusy(RuntimeError):
+    """排队的任务已达上限"""
+
+
+class WorkerPool:
+    """
+    CPU 密集型任务（Pillow 编解码、绘图等）的工作池。
+
+    任务在独立进程中执行，不再占用事件循环，也不受 GIL 影响。进程由 forkserver
+    （Windows 上为 spawn）创建，只预加载 preload 中的模块，不会重新执行 main.py。
+
+    提交的函数和参数必须可以被 pickle，即函数需定义在可按模块名导入的模块顶层。
+    """
+
+    def __init__(self, name: str, max_workers: int | None = None, max_pending: int = 16,
+                 preload: tuple[str, ...] = ()):
+        self.name = name
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.preload = list(preload)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()  # Hyper 在不同线程中处理各个事件
+
+        # 统计
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.pending = 0
+        self.busy_seconds = 0.0
+
+        atexit.register(self.shutdown)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # 调用方需持有 self._lock
+        if self._executor is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(self.preload)
+            else:
+                ctx = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=ctx)
+        return self._executor
+
+    @staticmethod
+    @contextmanager
+    def _without_main():
+        """
+        main.py 没有 if __name__ == "__main__" 保护，子进程初始化时若重新执行它
+        会再启动一个机器人。给 __main__ 一个名为 "__main__" 的 spec，
+        multiprocessing 就会跳过这一步（子进程在 submit 时创建）。
+        """
+        main = sys.modules.get("__main__")
+        patch = main is not None and getattr(main, "__spec__", None) is None
+        if patch:
+            main.__spec__ = importlib.machinery.ModuleSpec("__main__", None)
+        try:
+            yield
+        finally:
+            if patch:
+                main.__spec__ = None
+
+    async def run(self, func, *args):
+        """在工作池中执行 func(*args) 并等待结果，排队已满时抛出 WorkerPoolBusy"""
+        with self._lock:
+            # 检查与占位是一步，多个事件线程同时提交时也不会超过 max_pending
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise WorkerPoolBusy(f"{self.name} 工作池繁忙（{self.pending} 个任务排队中）")
+            self.pending += 1
+            self.submitted += 1
+
+        start = time.perf_counter()
+        failed = True
+        try:
+            with self._lock, self._without_main():
+                # 加锁：各事件线程同时提交时只创建一个进程池，__main__.__spec__ 的临时修改也不会互相覆盖
+                future = self._get_executor().submit(func, *args)
+            result = await asyncio.wrap_future(future)
+            failed = False
+        except BrokenExecutor:
+            # 工作进程意外退出，丢弃整个池，下次提交时重新创建
+            self.shutdown()
+            raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.busy_seconds += time.perf_counter() - start
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+        return result
+
+    def metrics(self) -> dict:
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "pending": self.pending,
+                "avg_ms": self.busy_seconds / done * 1000 if done else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Pillow 相关任务共用的工作池
+image_pool = WorkerPool("image", preload=("PIL.Image", "PIL.ImageDraw", "PIL.ImageFont", "Tools.tools", "Tools.quote_render"))
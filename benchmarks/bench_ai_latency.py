@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+AI 回复端到端延迟：handler → SearchOnline / deepseek / GoogleAI.Context → 模拟大模型服务器
+
+用法：
+    python benchmarks/bench_ai_latency.py [--backends gpt ds gemini] [--answers 20] [--concurrency 1]
+                                          [--tokens-per-s 30] [--ttft-ms 400] [--jitter 0.3]
+                                          [--fail-rate 0] [--fail-mode mixed] [--tts] [--json out.json]
+
+在 FakeOneBot 上导入 main.py，把各 AI 后端的地址指向 benchmarks/mock_llm_server.py，然后以
+群消息的形式提问，完整经过 handler 中的 handle_message_stream / finalize_messages。
+默认关闭 TTS（EdgeTTS 需要访问外部网络），加上 --tts 时语音合成也计入总耗时。
+
+每个回答统计（从收到事件开始计时）：
+    request —— 向模型发出请求的时间（此前是获取昵称、预设、插件匹配等）
+    TTFT    —— 模型服务器输出第一个 token 的时间
+    首条消息 —— 第一条 QQ 消息发出的时间
+    总耗时   —— handler 返回的时间
+    消息数   —— 发出的 QQ 消息条数（含合并转发与语音），以及相邻两条消息的间隔
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import json
+import os
+import sys
+import time
+
+from bench_handler_load import Recorder
+from fake_onebot import FakeOneBot, load_bot, text
+from mock_llm_server import FAIL_MODES, MockLLMServer
+
+MODES = {"gpt": "Net", "ds": "Ds", "gemini": "Pixmap"}
+QUESTION = "请讲讲怎样让 Python 程序跑得更快一些"
+
+
+def ask(bot, actions, data: dict) -> tuple[float, float]:
+    """与 Hyper 相同，在当前线程中 asyncio.run(handler)，返回开始与结束时间"""
+    from Hyper import Events
+
+    start = time.perf_counter()
+    asyncio.run(bot.handler(Events.em.new(data), actions))
+    return start, time.perf_counter()
+
+
+def run_backend(bot, actions, backend: FakeOneBot, server: MockLLMServer, name: str, answers: int,
+                concurrency: int, first_id: int) -> dict:
+    bot.EnableNetwork = MODES[name]
+    questions = []
+    for k in range(first_id, first_id + answers):
+        # 每个回答使用单独的群与用户，发出的消息和上下文互不干扰；[qN] 用于在服务器端找到对应的请求
+        group_id, user_id, tag = 200000 + k, 30000 + k, f"[q{k}]"
+        questions.append((group_id, tag, backend.group_message([text(f"{bot.reminder}{QUESTION} {tag}")], group_id, user_id)))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        timings = list(pool.map(lambda q: ask(bot, actions, q[2]), questions))
+
+    recorder = Recorder()
+    per_answer = []
+    for (group_id, tag, _), (start, end) in zip(questions, timings):
+        sends = [(t, action, params) for t, action, params in backend.sent if params.get("group_id") == group_id]
+        request = next((r for r in server.requests if tag in r["prompt"]), None)
+        answer = {
+            "total_ms": (end - start) * 1000,
+            "messages": sum(1 for _, action, _ in sends if action == "send_msg"),
+            "forwards": sum(1 for _, action, _ in sends if action.endswith("forward_msg")),
+            "failure": request and request["failure"],
+            "error_reply": any("发生错误" in json.dumps(params, ensure_ascii=False) for _, _, params in sends),
+        }
+        recorder.add("total", end - start)
+        if request is not None:
+            answer["request_ms"] = (request["started"] - start) * 1000
+            recorder.add("request", request["started"] - start)
+            if request["first_token"] is not None:
+                answer["ttft_ms"] = (request["first_token"] - start) * 1000
+                recorder.add("ttft", request["first_token"] - start)
+        if sends:
+            answer["first_message_ms"] = (sends[0][0] - start) * 1000
+            recorder.add("first_message", sends[0][0] - start)
+            for (a, _, _), (b, _, _) in zip(sends, sends[1:]):
+                recorder.add("gap", b - a)
+        per_answer.append(answer)
+
+    n = len(per_answer)
+    return {
+        "backend": name, "answers": n,
+        "stages": recorder.summary(),
+        "messages_per_answer": sum(a["messages"] for a in per_answer) / n,
+        "max_messages": max(a["messages"] for a in per_answer),
+        "forwarded": sum(1 for a in per_answer if a["forwards"]),
+        "failures": sum(1 for a in per_answer if a["failure"]),
+        "error_replies": sum(1 for a in per_answer if a["error_reply"]),
+        "per_answer": per_answer,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", choices=tuple(MODES), default=list(MODES))
+    parser.add_argument("--answers", type=int, default=20, help="每个后端的提问次数")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时进行的提问数")
+    parser.add_argument("--tokens-per-s", type=float, default=30)
+    parser.add_argument("--ttft-ms", type=float, default=400)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--answer-chars", type=int, default=300)
+    parser.add_argument("--fail-rate", type=float, default=0)
+    parser.add_argument("--fail-mode", choices=FAIL_MODES + ("mixed",), default="mixed")
+    parser.add_argument("--stall-s", type=float, default=5)
+    parser.add_argument("--tts", action="store_true", help="启用 EdgeTTS（需要外部网络）")
+    parser.add_argument("--in-place", action="store_true", help="直接在仓库目录中运行，而不是临时副本")
+    parser.add_argument("--verbose", action="store_true", help="不重定向 bot 的输出")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None  # load_bot 会切换工作目录
+
+    server = MockLLMServer(tokens_per_s=args.tokens_per_s, ttft_ms=args.ttft_ms, jitter=args.jitter,
+                           answer_chars=args.answer_chars, fail_rate=args.fail_rate, fail_mode=args.fail_mode,
+                           stall_s=args.stall_s, seed=114514).start()
+    backend = FakeOneBot()
+    with open(os.devnull, "w", encoding="utf-8") as devnull, \
+            contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+        bot = load_bot(copy=not args.in_place)
+
+    import Tools.SearchOnline
+    import Tools.deepseek
+    Tools.SearchOnline.BASE_URL = f"{server.url}/v1/"
+    Tools.deepseek.BASE_URL = f"{server.url}/"
+    if "gemini" in args.backends:
+        import Tools.GoogleAI
+        Tools.GoogleAI.API_ENDPOINT = server.url
+    bot.gptsovitsoff = not args.tts
+
+    print(f"工作目录：{bot.workdir}，模拟服务器：{server.url}")
+    print(f"模型输出 {args.tokens_per_s} token/s，TTFT {args.ttft_ms} ms，抖动 ±{args.jitter:.0%}，"
+          f"回答约 {args.answer_chars} 字，失败率 {args.fail_rate:.0%}（{args.fail_mode}），并发 {args.concurrency}")
+    actions = backend.actions()
+    log_path = os.path.join(bot.workdir, "bench.log")
+    results = []
+    with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+        for i, name in enumerate(args.backends):
+            results.append(run_backend(bot, actions, backend, server, name, args.answers, args.concurrency,
+                                       first_id=i * args.answers))
+    server.stop()
+
+    print(f"{'后端':<8}{'阶段':<16}{'p50':>10}{'p95':>10}{'p99':>10}{'最大':>10}  (ms)")
+    for result in results:
+        for stage in ("request", "ttft", "first_message", "total", "gap"):
+            if (s := result["stages"].get(stage)) is not None:
+                print(f"{result['backend']:<10}{stage:<18}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}"
+                      f"{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+        print(f"{'':<10}每个回答 {result['messages_per_answer']:.1f} 条消息（最多 {result['max_messages']}），"
+              f"合并转发 {result['forwarded']} 次，注入失败 {result['failures']} 次，回复错误提示 {result['error_replies']} 次")
+    print(f"bot 的输出见 {log_path}")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+deal_image 压缩基准
+
+用法：
+    python benchmarks/bench_deal_image.py [--corpus 图片目录] [--max-mb 10]
+
+不指定 corpus 时生成几张 Pixiv 尺寸的合成图片（渐变 + 噪点，噪点越多越难压缩）。
+对每张图片分别运行旧算法（质量从 100 每次减 5）和当前的 deal_image，输出：
+    encodes —— 全分辨率 JPEG 编码次数（括号内为缩小探针图的编码次数）
+    time    —— 墙钟时间
+    size    —— 输出大小
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PIL import Image
+from Tools.tools import deal_image
+
+
+def legacy_deal_image(i, max_size=10 * 1024 * 1024):
+    """优化前的实现（保留用于对比，已修正 buffer 未截断的问题）"""
+    img = Image.open(io.BytesIO(i))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffer = io.BytesIO()
+    quality = 100
+    while True:
+        buffer.seek(0)
+        buffer.truncate()
+        img.save(buffer, format='JPEG', quality=quality)
+        if buffer.tell() < max_size or quality <= 10:
+            break
+        quality -= 5
+    return buffer.getvalue()
+
+
+def synthetic_corpus(seed=114514):
+    rng = random.Random(seed)
+    sizes = [(2480, 3508, 0.05), (3000, 4000, 0.2), (4093, 5787, 0.4), (6000, 8000, 0.8), (1200, 1600, 0.1)]
+    corpus = []
+    for w, h, noise in sizes:
+        img = Image.linear_gradient("L").resize((w, h)).convert("RGB")
+        grain = Image.effect_noise((w, h), 255 * noise).convert("RGB")
+        img = Image.blend(img, grain, noise)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", compress_level=1)
+        corpus.append((f"synthetic {w}x{h} noise={noise}", buf.getvalue()))
+    return corpus
+
+
+def load_corpus(path):
+    corpus = []
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), "rb") as f:
+            corpus.append((name, f.read()))
+    return corpus
+
+
+class EncodeCounter:
+    def __init__(self, probe_pixels=500_000):
+        self.count = 0
+        self.probes = 0
+        self.probe_pixels = probe_pixels
+        self._save = Image.Image.save
+
+    def __enter__(self):
+        counter = self
+
+        def save(img, fp, format=None, **params):
+            if (format or "").upper() == "JPEG":
+                if img.width * img.height <= counter.probe_pixels:
+                    counter.probes += 1
+                else:
+                    counter.count += 1
+            return counter._save(img, fp, format, **params)
+
+        Image.Image.save = save
+        return self
+
+    def __exit__(self, *exc):
+        Image.Image.save = self._save
+
+
+def measure(func, data, max_size):
+    with EncodeCounter() as counter:
+        start = time.perf_counter()
+        out = func(data, max_size)
+        cost = time.perf_counter() - start
+    return counter.count, counter.probes, cost, len(out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="图片目录")
+    parser.add_argument("--max-mb", type=float, default=10.0)
+    args = parser.parse_args()
+
+    max_size = int(args.max_mb * 1024 * 1024)
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+
+    totals = {"legacy": [0, 0, 0.0], "deal_image": [0, 0, 0.0]}
+    print(f"{'image':<36}{'algorithm':<12}{'encodes':>12}{'time':>10}{'size':>10}")
+    for name, data in corpus:
+        for label, func in (("legacy", legacy_deal_image), ("deal_image", deal_image)):
+            encodes, probes, cost, size = measure(func, data, max_size)
+            totals[label][0] += encodes
+            totals[label][1] += probes
+            totals[label][2] += cost
+            print(f"{name[:35]:<36}{label:<12}{encodes:>6} ({probes:>2}){cost:>9.2f}s{size / 1048576:>8.2f}MB")
+
+    print()
+    for label, (encodes, probes, cost) in totals.items():
+        print(f"{label:<12} {encodes / len(corpus):.1f} encodes/image (+{probes / len(corpus):.1f} probe)   {cost / len(corpus):.2f} s/image")
+
+
+if __name__ == "__main__":
+    main()
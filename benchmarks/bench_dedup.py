@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+EventDeduplicator 微基准
+
+用法：
+    python benchmarks/bench_dedup.py [--count 100000] [--repeat 5]
+
+先检查几种容易误判的事件（重复投递的消息、同一条消息上的两次不同表情回应、
+同一条消息的撤回与设精华等），再输出每个事件的平均去重耗时。
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Tools.dedup import EventDeduplicator
+
+
+class Event:
+    """只保留去重用到的属性，与 Hyper.Events 中的同名属性一致"""
+
+    def __init__(self, data: dict):
+        self.data = data.copy()
+        self.post_type = data.get("post_type")
+        self.self_id = data.get("self_id")
+        if "message_id" in data:
+            # Hyper 的消息事件把 message_id 转成字符串，通知事件保留原值
+            self.message_id = str(data["message_id"]) if self.post_type == "message" else data["message_id"]
+
+
+def message(message_id: int, text: str = "你好", when: int = 1700000000) -> dict:
+    return {"post_type": "message", "message_type": "group", "sub_type": "normal", "time": when,
+            "self_id": 10000, "message_id": message_id, "group_id": 1, "user_id": 2,
+            "message": [{"type": "text", "data": {"text": text}}]}
+
+
+def reaction(message_id: int, user_id: int, code: str, when: int = 1700000000) -> dict:
+    return {"post_type": "notice", "notice_type": "group_msg_emoji_like", "time": when, "self_id": 10000,
+            "group_id": 1, "user_id": user_id, "message_id": message_id, "likes": [{"emoji_id": code, "count": 1}]}
+
+
+def notice(notice_type: str, message_id: int, sub_type: str = "", when: int = 1700000000) -> dict:
+    return {"post_type": "notice", "notice_type": notice_type, "sub_type": sub_type, "time": when,
+            "self_id": 10000, "group_id": 1, "user_id": 2, "operator_id": 3, "message_id": message_id}
+
+
+# (说明, 依次投递的事件, 期望的 is_duplicate 结果)
+CASES = [
+    ("同一条消息重复投递", [message(42), message(42)], [False, True]),
+    ("两条不同的消息", [message(42), message(43)], [False, False]),
+    ("同一条消息上的两次不同表情回应", [reaction(42, 2, "76"), reaction(42, 3, "66")], [False, False]),
+    ("同一次表情回应重复投递", [reaction(42, 2, "76"), reaction(42, 2, "76")], [False, True]),
+    ("同一条消息被撤回、被设精华", [notice("group_recall", 42), notice("essence", 42, "add")], [False, False]),
+    ("设精华后又取消精华", [notice("essence", 42, "add"), notice("essence", 42, "delete")], [False, False]),
+    ("消息与它之后的表情回应", [message(42), reaction(42, 2, "76")], [False, False]),
+]
+
+
+def check() -> int:
+    failed = 0
+    for name, datas, expected in CASES:
+        dedup = EventDeduplicator()
+        got = [dedup.is_duplicate(Event(data)) for data in datas]
+        if got != expected:
+            failed += 1
+            print(f"✗ {name}：期望 {expected}，实际 {got}")
+        else:
+            print(f"✓ {name}")
+    return failed
+
+
+def bench(events, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        dedup = EventDeduplicator()
+        start = time.perf_counter()
+        for event in events:
+            dedup.is_duplicate(event)
+        best = min(best, time.perf_counter() - start)
+    return best / len(events) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100000, help="每种事件的条数")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = check()
+    messages = [Event(message(i)) for i in range(args.count)]
+    notices = [Event(reaction(i % 100, i, "76")) for i in range(args.count)]
+    print(f"{'消息事件':<10}{bench(messages, args.repeat):>8.2f} µs")
+    print(f"{'通知事件':<10}{bench(notices, args.repeat):>8.2f} µs")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+handler 离线压测：在 FakeOneBot 上按目标速率投递群消息事件
+
+用法：
+    python benchmarks/bench_handler_load.py [--rate 50] [--count 2000] [--corpus events.jsonl]
+                                            [--mode hyper|loop] [--api-ms 0] [--tracemalloc] [--json out.json]
+
+corpus 每行是一个协议端推送的原始事件 JSON（例如从日志中截取）；不指定时使用内置的
+合成群聊（闲聊、表情、@机器人、帮助/关于/插件视角等命令，不含会访问外部网络的链接
+解析和 AI 对话）。回放时 message_id 与 time 会被重新分配，加上 --keep-ids 保留原值
+（用于测试重复事件的丢弃）。
+
+--mode hyper 与 Hyper 的调度方式相同：每个事件一个线程，线程内 asyncio.run(handler)；
+--mode loop 在同一个事件循环中并发处理，用于对比调度本身的开销。
+
+输出：
+    吞吐      —— 完成的事件数 / 第一个事件投递到最后一个事件完成的时间
+    分阶段延迟 —— dispatch（投递到开始处理）、parse（构造 Event）、user_info、
+                 plugins_any / plugins_keyword（两轮插件匹配）、handler（整个 handler）
+                 以及每个插件 on_message 的 p50 / p95 / p99 / 最大值
+    内存分配   —— 各代 GC 次数、净增的内存块；加上 --tracemalloc 时输出分配次数最多的代码行
+    协议端请求 —— 各 API 的调用次数
+bot 的输出写入工作目录下的 bench.log，结束时统计其中的异常数。
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import gc
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from fake_onebot import FakeOneBot, at, load_bot, reply, text
+
+CHAT = [
+    "哈哈哈哈", "早上好", "有人吗", "今天吃什么", "草", "确实", "666", "晚安～", "？",
+    "这个问题我昨天也遇到了，重启一下就好了", "好耶！(*≧︶≦)",
+    "我觉得还是得先看看文档，官方写得挺清楚的，实在不行再去群里问问大佬",
+    "有没有人一起打游戏，差一个人", "你们看那个新番了吗，第三集太好哭了",
+]
+EMOJI = ["😂", "👍", "🤔", "🙄"]
+
+
+def synthetic_events(backend: FakeOneBot, count: int, reminder: str, users: int, seed: int = 114514):
+    rng = random.Random(seed)
+    commands = [f"{reminder}帮助", f"{reminder}关于", f"{reminder}插件视角", f"{reminder}角色扮演", "ping"]
+    user_ids = [20000 + i for i in range(users)]
+    recent: list[int] = []
+    events = []
+    for _ in range(count):
+        group_id, user_id = rng.choice(backend.groups), rng.choice(user_ids)
+        r = rng.random()
+        if r < 0.80:
+            message = [text("".join(rng.choice(CHAT) for _ in range(rng.choice((1, 1, 1, 2, 3)))))]
+        elif r < 0.85:
+            message = [text(rng.choice(EMOJI))]
+        elif r < 0.90 and recent:
+            message = [reply(rng.choice(recent)), text(rng.choice(CHAT))]
+        elif r < 0.93:
+            message = [at(backend.self_id), text(" ")]
+        else:
+            message = [text(rng.choice(commands))]
+        data = backend.group_message(message, group_id, user_id)
+        recent = (recent + [data["message_id"]])[-50:]
+        events.append(data)
+    return events
+
+
+def load_events(backend: FakeOneBot, path: str, count: int, keep_ids: bool):
+    with open(path, "r", encoding="utf-8") as f:
+        raw = [json.loads(line) for line in f if line.strip()]
+    events = []
+    for data in itertools.islice(itertools.cycle(raw), count):
+        data = dict(data)
+        if not keep_ids and data.get("message_id") is not None:
+            data["message_id"] = backend.next_message_id()
+            data["time"] = int(time.time())
+        backend.remember(data)
+        events.append(data)
+    return events
+
+
+class Recorder:
+    """各阶段耗时（秒）；list.append 是原子的，不同事件线程可以同时记录"""
+
+    def __init__(self):
+        self.stages: dict[str, list[float]] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages.setdefault(stage, []).append(seconds)
+
+    def instrument(self, owner, attr: str, stage: str) -> None:
+        """把 owner.attr 这个协程函数替换为计时版本（保留签名，插件参数注入仍然有效）"""
+        func = getattr(owner, attr)
+        if getattr(func, "__bench_stage__", None):
+            return
+
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        timed.__bench_stage__ = stage
+        setattr(owner, attr, timed)
+
+    def summary(self) -> dict:
+        result = {}
+        for stage, values in self.stages.items():
+            values = sorted(values)
+            n = len(values)
+            result[stage] = {
+                "count": n,
+                "mean_ms": sum(values) / n * 1000,
+                **{f"p{p}_ms": values[min(n - 1, int(n * p / 100))] * 1000 for p in (50, 95, 99)},
+                "max_ms": values[-1] * 1000,
+            }
+        return result
+
+
+def instrument_bot(bot, recorder: Recorder) -> None:
+    async def execute_plugins(isAny, **main_context):
+        start = time.perf_counter()
+        try:
+            return await plain_execute(isAny, **main_context)
+        finally:
+            recorder.add("plugins_any" if isAny else "plugins_keyword", time.perf_counter() - start)
+
+    def instrument_plugin(module):
+        if module is not None and hasattr(module, "on_message"):
+            recorder.instrument(module, "on_message", f"plugin:{module.__name__.rsplit('_', 1)[0]}")
+        return module
+
+    def activate_plugin(lazy):
+        return instrument_plugin(plain_activate(lazy))
+
+    plain_execute, plain_activate = bot.execute_plugins, bot.activate_plugin
+    bot.execute_plugins, bot.activate_plugin = execute_plugins, activate_plugin
+    recorder.instrument(bot, "get_user_info", "user_info")
+    for module in bot.plugins:
+        if not isinstance(module, bot.LazyPlugin):
+            instrument_plugin(module)
+
+
+async def handle(bot, actions, data: dict, due: float, recorder: Recorder) -> None:
+    from Hyper import Events
+
+    start = time.perf_counter()
+    recorder.add("dispatch", start - due)
+    event = Events.em.new(data)
+    parsed = time.perf_counter()
+    recorder.add("parse", parsed - start)
+    await bot.handler(event, actions)
+    recorder.add("handler", time.perf_counter() - parsed)
+
+
+def run_hyper(bot, actions, events, rate, concurrency, recorder):
+    """与 Hyper 相同：每个事件一个线程，线程内 asyncio.run()"""
+    slots = threading.BoundedSemaphore(concurrency)
+    threads = []
+
+    def worker(data, due):
+        try:
+            asyncio.run(handle(bot, actions, data, due, recorder))
+        finally:
+            slots.release()
+
+    start = time.perf_counter()
+    for i, data in enumerate(events):
+        due = start + i / rate if rate else time.perf_counter()
+        if (delay := due - time.perf_counter()) > 0:
+            time.sleep(delay)
+        slots.acquire()
+        thread = threading.Thread(target=worker, args=(data, due), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return start
+
+
+def run_loop(bot, actions, events, rate, concurrency, recorder):
+    """所有事件在同一个事件循环中处理"""
+
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        tasks = []
+
+        async def one(data, due):
+            async with slots:
+                await handle(bot, actions, data, due, recorder)
+
+        start = time.perf_counter()
+        for i, data in enumerate(events):
+            due = start + i / rate if rate else time.perf_counter()
+            if (delay := due - time.perf_counter()) > 0:
+                await asyncio.sleep(delay)
+            tasks.append(loop.create_task(one(data, due)))
+        await asyncio.gather(*tasks)
+        return start
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=50, help="目标速率（事件/秒），0 表示尽可能快")
+    parser.add_argument("--count", type=int, default=2000, help="计入统计的事件数")
+    parser.add_argument("--warmup", type=int, default=50, help="预热事件数（按需导入插件等），不计入统计")
+    parser.add_argument("--corpus", help="每行一个原始事件 JSON 的回放语料")
+    parser.add_argument("--keep-ids", action="store_true", help="回放时保留原始 message_id 与 time")
+    parser.add_argument("--mode", choices=("hyper", "loop"), default="hyper")
+    parser.add_argument("--concurrency", type=int, default=64, help="同时处理的事件数上限")
+    parser.add_argument("--users", type=int, default=200, help="合成语料中的发言人数")
+    parser.add_argument("--api-ms", type=float, default=0, help="协议端每个请求的模拟往返时间")
+    parser.add_argument("--tracemalloc", action="store_true", help="统计分配位置（会显著拖慢处理速度）")
+    parser.add_argument("--in-place", action="store_true", help="直接在仓库目录中运行，而不是临时副本")
+    parser.add_argument("--verbose", action="store_true", help="不重定向 bot 的输出")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+    # load_bot 会切换工作目录
+    json_path = os.path.abspath(args.json) if args.json else None
+    corpus = os.path.abspath(args.corpus) if args.corpus else None
+
+    backend = FakeOneBot(api_ms=args.api_ms)
+    with open(os.devnull, "w", encoding="utf-8") as devnull, \
+            contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+        bot = load_bot(copy=not args.in_place)
+
+    log_path = os.path.join(bot.workdir, "bench.log")
+    print(f"工作目录：{bot.workdir}")
+    actions = backend.actions()
+    total = args.warmup + args.count
+    if corpus:
+        events = load_events(backend, corpus, total, args.keep_ids)
+    else:
+        events = synthetic_events(backend, total, bot.reminder, args.users)
+
+    recorder = Recorder()
+    instrument_bot(bot, recorder)
+    run = run_hyper if args.mode == "hyper" else run_loop
+
+    with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+        run(bot, actions, events[:args.warmup], 0, 1, Recorder())
+        recorder.stages.clear()
+        backend.calls.clear()
+
+        gc.collect()
+        if args.tracemalloc:
+            tracemalloc.start(1)
+        gc_before = [s["collections"] for s in gc.get_stats()]
+        blocks_before = sys.getallocatedblocks()
+        start = run(bot, actions, events[args.warmup:], args.rate, args.concurrency, recorder)
+        elapsed = time.perf_counter() - start
+        blocks_after = sys.getallocatedblocks()
+        gc_after = [s["collections"] for s in gc.get_stats()]
+        snapshot = tracemalloc.take_snapshot() if args.tracemalloc else None
+        traced = tracemalloc.get_traced_memory() if args.tracemalloc else None
+        tracemalloc.stop()
+
+    # 各个事件线程同时向重定向的 stdout 写入，偶尔会把一个多字节字符截断
+    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        errors = f.read().count("Traceback (most recent call last)")
+
+    completed = len(recorder.stages.get("handler", ()))
+    result = {
+        "mode": args.mode, "rate": args.rate, "api_ms": args.api_ms,
+        "events": completed, "elapsed_s": elapsed, "events_per_s": completed / elapsed if elapsed else 0,
+        "errors": errors,
+        "stages": recorder.summary(),
+        "gc_collections": [a - b for a, b in zip(gc_after, gc_before)],
+        "blocks_per_event": (blocks_after - blocks_before) / completed if completed else 0,
+        "api_calls": dict(backend.calls.most_common()),
+    }
+    if snapshot is not None:
+        top = sorted(snapshot.statistics("lineno"), key=lambda s: s.count, reverse=True)[:10]
+        result["tracemalloc"] = {
+            "current_bytes": traced[0], "peak_bytes": traced[1],
+            "top": [{"where": str(s.traceback), "count": s.count, "bytes": s.size} for s in top],
+        }
+
+    print(f"模式 {args.mode}，目标速率 {args.rate or '不限'}，完成 {completed} 个事件，"
+          f"用时 {elapsed:.2f} s，吞吐 {result['events_per_s']:.1f} 事件/秒，异常 {errors} 个（见 {log_path}）")
+    print(f"{'阶段':<34}{'次数':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'最大':>10}  (ms)")
+    stages = result["stages"]
+    order = ["dispatch", "parse", "user_info", "plugins_any", "plugins_keyword", "handler"]
+    for stage in order + sorted(s for s in stages if s not in order):
+        if (s := stages.get(stage)) is not None:
+            print(f"{stage:<36}{s['count']:>8}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+    print(f"GC 次数（各代）：{result['gc_collections']}，每个事件净增内存块：{result['blocks_per_event']:.1f}")
+    print("协议端请求：" + "，".join(f"{k} {v}" for k, v in result["api_calls"].items()))
+    if snapshot is not None:
+        print(f"tracemalloc：当前 {traced[0] / 1048576:.1f} MB，峰值 {traced[1] / 1048576:.1f} MB，存活分配最多的位置：")
+        for item in result["tracemalloc"]["top"]:
+            print(f"    {item['count']:>8} 个 {item['bytes'] / 1024:>8.1f} KB  {item['where']}")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+"""
+热点辅助函数微基准：每条消息或每个 chunk 都会调用的纯 Python 函数
+
+用法：
+    python benchmarks/bench_hot_helpers.py [-k 关键字] [--max-time 1.0] [--min-rounds 5]
+                                           [--json out.json] [--compare base.json]
+
+覆盖的函数：
+    message    —— ParsedMessage：handler 为每个事件创建，取 text / order / single_emoji（emoji +1）
+    splitter   —— StreamSplitter.check_and_split
+    links      —— LinkScan（每条消息的统一链接识别）/ main.replace_scheme_with_http
+    plugins    —— main.execute_plugins 的关键字匹配循环（关键字插件与 Any 插件两种）
+    blacklist  —— main.load_blacklist
+    runcommand —— RunCommand 插件逐条编译并匹配 DANGEROUS_PATTERNS
+
+main.py 中的函数从源码中按名字取出单独执行（不导入 main.py，也就不需要连接协议端），
+测到的始终是当前分支上的实现。语料是固定种子生成的：中文群聊、长的流式回答、
+链接较多的消息和 Shell 命令，不同分支之间的结果可以直接比较。
+
+计时方式与 pytest-benchmark 相同：先校准每轮的调用次数，使一轮不短于 --round-ms，
+再重复若干轮（至少 --min-rounds 轮，总时长约 --max-time 秒），计时期间关闭 GC。
+缺少可选依赖（例如 emoji）的基准会被跳过，不影响其他基准。
+输出每次调用（处理整份语料一次）的 min / median / mean / stddev 和每条语料的平均耗时。
+
+--json 保存结果（格式仿照 pytest-benchmark 的 JSON），--compare 与之前保存的结果逐项
+比较 median，变慢超过 --threshold 的项目会被标出。
+"""
+import argparse
+import ast
+import asyncio
+import contextlib
+import datetime
+import gc
+import inspect
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from types import SimpleNamespace
+from urllib.parse import urlparse, urlunparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Tools.AI_tools import StreamSplitter
+from Tools.links import LinkScan
+from Tools.message import ParsedMessage
+from Tools.plugin_manifest import LazyPlugin
+from Tools.plugin_guard import PluginOffloader, is_severe
+from Tools.tracing import Tracer
+
+SEED = 114514
+
+# ---------- 语料 ----------
+
+CHAT = [
+    "哈哈哈哈", "早上好", "有人吗", "今天吃什么", "草", "确实", "666", "晚安～", "？", "+1",
+    "这个问题我昨天也遇到了，重启一下就好了", "[图片]", "好耶！(*≧︶≦)",
+    "我觉得还是得先看看文档，官方写得挺清楚的，实在不行再去群里问问大佬",
+    "有没有人一起打游戏，差一个人", "你们看那个新番了吗，第三集太好哭了",
+    "😂", "👍", "🎉🎉", "笑死😂", "今天天气怎么样", "名言", "帮助", "ping 127.0.0.1",
+]
+LINKS = [
+    "https://www.bilibili.com/video/BV1GJ411x7h7",
+    "https://b23.tv/aBcD123",
+    "http://www.bilibili.com/video/av170001?p=2&t=30",
+    "https://v.douyin.com/iRNBho6u/",
+    "https://v.kuaishou.com/abcDEF",
+    "https://i0.hdslb.com/bfs/archive/4b0d2e3f5a.jpg@672w_378h_1c",
+    "https://q1.qlogo.cn/g?b=qq&nk=10000&s=640",
+    "https://example.com:8443/path/to/page;params?query=1#fragment",
+]
+PARAGRAPHS = [
+    "好的呀！这个问题其实很有意思。",
+    "首先，我们需要了解一下背景：Python（一种解释型语言）的 GIL 会限制多线程的并行度。",
+    "常见的做法有：\n1. 使用多进程\n2. 使用异步 IO\n3. 把计算放到 C 扩展里",
+    "举个例子 {\n  \"name\": \"简儿\",\n  \"mode\": \"Net\"\n} 这样的配置就可以直接读取啦。",
+    "「如果你还有别的问题，随时问我哦」(●'◡'●)",
+    " - 第一点：先测量\n - 第二点：再优化",
+    "参考资料：",
+    "总之，先测量再优化，才是最靠谱的办法！",
+]
+COMMANDS = [
+    "ls -la", "ping -c 4 127.0.0.1", "echo hello", "cat /var/log/syslog | tail -n 20",
+    "python -V", "git status", "df -h", "free -m", "uptime", "whoami", "ps aux | grep python",
+    "curl -I https://example.com", "nslookup example.com", "ipconfig /all", "dir C:\\Users",
+    "rm -rf /", "format c:", "shutdown -h now", "chmod -R 777 /etc",
+]
+
+
+def chat_lines(count=2000):
+    rng = random.Random(SEED)
+    return ["".join(rng.choice(CHAT) for _ in range(rng.choice((1, 1, 1, 2, 3, 8)))) for _ in range(count)]
+
+
+def link_messages(count=500):
+    rng = random.Random(SEED)
+    return [rng.choice(CHAT) + " " + " ".join(rng.choice(LINKS) for _ in range(rng.randint(1, 3)))
+            for _ in range(count)]
+
+
+def streamed_answers(count=20):
+    """长回答切成 2～12 字的 chunk，与 bench_stream_splitter.py 相同"""
+    rng = random.Random(SEED)
+    answers = []
+    for _ in range(count):
+        text = "\n\n".join(rng.choice(PARAGRAPHS) for _ in range(rng.randint(20, 60)))
+        chunks, i = [], 0
+        while i < len(text):
+            step = rng.randint(2, 12)
+            chunks.append(text[i:i + step])
+            i += step
+        answers.append(chunks)
+    return answers
+
+
+def shell_commands(count=500):
+    rng = random.Random(SEED)
+    # 绝大多数是正常命令，需要完整地匹配所有规则
+    return [rng.choice(COMMANDS[:-4] if rng.random() < 0.95 else COMMANDS[-4:]) for _ in range(count)]
+
+
+# ---------- 被测代码 ----------
+
+def main_functions(names, namespace: dict) -> dict:
+    """从 main.py 源码中取出指定的函数，在 namespace 中执行后返回"""
+    with open(os.path.join(ROOT, "main.py"), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), "main.py")
+    body = [node for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name in names]
+    missing = set(names) - {node.name for node in body}
+    if missing:
+        raise LookupError(f"main.py 中没有 {', '.join(sorted(missing))}")
+    exec(compile(ast.Module(body=body, type_ignores=[]), os.path.join(ROOT, "main.py"), "exec"), namespace)
+    return namespace
+
+
+def plugin_keywords() -> list[str]:
+    """所有插件的 TRIGGHT_KEYWORD（只解析源码）"""
+    keywords = []
+    for name in sorted(os.listdir(os.path.join(ROOT, "plugins"))):
+        entry = os.path.join(ROOT, "plugins", name)
+        entry = os.path.join(entry, "setup.py") if os.path.isdir(entry) else entry
+        if not entry.endswith(".py") or not os.path.isfile(entry):
+            continue
+        with open(entry, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), entry)
+        for node in tree.body:
+            if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant)
+                    and any(isinstance(t, ast.Name) and t.id == "TRIGGHT_KEYWORD" for t in node.targets)):
+                keywords.append(node.value.value)
+    return keywords
+
+
+def reminder() -> str:
+    with open(os.path.join(ROOT, "config.json"), "r", encoding="utf-8") as f:
+        return json.load(f)["Others"]["reminder"]
+
+
+def run_sync(coro):
+    """不经过事件循环直接驱动协程：被测的协程中没有真正挂起的 await"""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("协程发生了挂起")
+
+
+# ---------- 基准 ----------
+
+BENCHMARKS = []
+
+
+class SkipBenchmark(Exception):
+    """准备语料时抛出，跳过该基准（例如缺少可选依赖）"""
+
+
+def benchmark(group: str, name: str):
+    """
+    注册一个基准。被装饰的函数是生成器：准备好语料后 yield (被测函数, 语料条数)，
+    之后的代码用于清理。
+    """
+    def wrapper(factory):
+        BENCHMARKS.append((group, name, contextlib.contextmanager(factory)))
+        return factory
+    return wrapper
+
+
+def _events(lines):
+    # ParsedMessage 与 LinkScan 只对 message 调用 str()，纯文本消息直接用字符串代替
+    return [SimpleNamespace(message=line, self_id=10000) for line in lines]
+
+
+@benchmark("message", "ParsedMessage[chat]")
+def bench_parsed_message():
+    # 与 handler 相同：每个事件新建一个 ParsedMessage，再取指令与 emoji +1 用到的属性
+    try:
+        import emoji  # noqa: F401  single_emoji 在单字符消息上才导入
+    except ImportError:
+        raise SkipBenchmark("未安装 emoji")
+    prefix, events = reminder(), _events(chat_lines())
+
+    def run():
+        for event in events:
+            parsed = ParsedMessage(event, prefix)
+            parsed.order
+            parsed.single_emoji
+
+    yield run, len(events)
+
+
+@benchmark("splitter", "check_and_split[answers]")
+def bench_check_and_split():
+    answers = streamed_answers()
+
+    def run():
+        # 与 split_stream 相同的调用顺序，split_interval 为 0，不打印完整内容
+        for chunks in answers:
+            splitter = StreamSplitter()
+            splitter.tail_pacing = None
+            for chunk in chunks:
+                splitter.full_content += chunk
+                splitter.buffer += chunk
+                splitter.chunks += 1
+                for _ in splitter.check_and_split():
+                    pass
+            for _ in splitter.check_and_split(True):
+                pass
+
+    yield run, sum(len(chunks) for chunks in answers)
+
+
+@benchmark("links", "LinkScan[chat]")
+def bench_link_scan_chat():
+    # 绝大多数消息不含链接，只经过预筛选
+    events = _events(chat_lines())
+    yield lambda: [bool(LinkScan(event)) for event in events], len(events)
+
+
+@benchmark("links", "LinkScan[links]")
+def bench_link_scan_links():
+    events = _events(link_messages())
+    yield lambda: [LinkScan(event).candidates for event in events], len(events)
+
+
+@benchmark("links", "replace_scheme_with_http[links]")
+def bench_replace_scheme():
+    replace_scheme_with_http = main_functions(
+        ["replace_scheme_with_http"], {"urlparse": urlparse, "urlunparse": urlunparse})["replace_scheme_with_http"]
+    urls = [url for message in link_messages() for url in re.findall(r"https?://\S+", message)]
+    yield lambda: [replace_scheme_with_http(url) for url in urls], len(urls)
+
+
+def _plugins(keywords):
+    async def on_message(event, actions, order, Manager=None):
+        return None
+
+    return [SimpleNamespace(__name__=f"plugin{i}", TRIGGHT_KEYWORD=keyword, on_message=on_message)
+            for i, keyword in enumerate(keywords)]
+
+
+def _execute_plugins():
+    """
+    main.execute_plugins 及其用到的全局名称。链路追踪保持关闭，settings 为空（不把插件放到线程中执行），
+    与默认配置下的运行时相同
+    """
+    return main_functions(["execute_plugins", "runs_in_thread"], {
+        "plugins": _plugins(plugin_keywords()), "reminder": reminder(), "LazyPlugin": LazyPlugin,
+        "activate_plugin": None, "inspect": inspect, "traceback": traceback, "asyncio": asyncio,
+        "tracer": Tracer(), "settings": {}, "plugin_warnings": {}, "is_severe": is_severe,
+        "plugin_offloader": PluginOffloader(),
+    })
+
+
+@benchmark("plugins", "execute_plugins[keyword]")
+def bench_execute_plugins_keyword():
+    namespace = _execute_plugins()
+    execute_plugins, prefix = namespace["execute_plugins"], namespace["reminder"]
+    # 大部分消息不是指令；是指令时也多半匹配不到插件
+    rng = random.Random(SEED)
+    orders = [f"{prefix}{line}" if rng.random() < 0.2 else line for line in chat_lines()]
+    yield (lambda: [run_sync(execute_plugins(False, event=None, actions=None, order=order)) for order in orders],
+           len(orders))
+
+
+@benchmark("plugins", "execute_plugins[any]")
+def bench_execute_plugins_any():
+    namespace = _execute_plugins()
+    execute_plugins = namespace["execute_plugins"]
+    lines = chat_lines()
+    yield (lambda: [run_sync(execute_plugins(True, event=None, actions=None, order=line)) for line in lines],
+           len(lines))
+
+
+@benchmark("blacklist", "load_blacklist[500]")
+def bench_load_blacklist():
+    load_blacklist = main_functions(["load_blacklist"], {})["load_blacklist"]
+    rng = random.Random(SEED)
+    workdir = tempfile.mkdtemp(prefix="jianer_bench_")
+    with open(os.path.join(workdir, "blacklist.sr"), "w", encoding="utf-8") as f:
+        f.write("\n".join(str(rng.randint(10000, 4000000000)) for _ in range(500)))
+    cwd = os.getcwd()
+    os.chdir(workdir)  # load_blacklist 读取工作目录下的 blacklist.sr
+    try:
+        yield load_blacklist, 1
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@benchmark("runcommand", "DANGEROUS_PATTERNS[commands]")
+def bench_dangerous_patterns():
+    from plugins.RunCommand.DANGEROUS_PATTERNS import DANGEROUS_PATTERNS
+
+    def is_dangerous(command_lower):
+        # 与 plugins/RunCommand/setup.py 中的检查相同
+        for pattern in DANGEROUS_PATTERNS:
+            try:
+                re.compile(pattern)
+                if re.search(pattern, command_lower):
+                    return True
+            except re.error:
+                pass
+        return False
+
+    commands = [c.lower() for c in shell_commands()]
+    yield lambda: [is_dangerous(c) for c in commands], len(commands)
+
+
+# ---------- 计时 ----------
+
+def measure(fn, round_s: float, max_time: float, min_rounds: int) -> dict:
+    timer = time.perf_counter
+
+    # 校准：每轮调用 loops 次，一轮不短于 round_s
+    loops = 1
+    while True:
+        start = timer()
+        for _ in range(loops):
+            fn()
+        elapsed = timer() - start
+        if elapsed >= round_s:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(round_s / elapsed) + 1))
+
+    rounds = max(min_rounds, int(max_time / elapsed))
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        data = []
+        for _ in range(rounds):
+            start = timer()
+            for _ in range(loops):
+                fn()
+            data.append((timer() - start) / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    quartiles = statistics.quantiles(data, n=4) if len(data) > 1 else [data[0]] * 3
+    mean = statistics.fmean(data)
+    return {
+        "min": min(data), "max": max(data), "mean": mean,
+        "stddev": statistics.stdev(data) if len(data) > 1 else 0.0,
+        "median": statistics.median(data), "iqr": quartiles[2] - quartiles[0],
+        "q1": quartiles[0], "q3": quartiles[2],
+        "rounds": rounds, "iterations": loops, "ops": 1 / mean if mean else 0.0,
+        "total": sum(data) * loops, "data": data,
+    }
+
+
+def machine_info() -> dict:
+    return {
+        "node": platform.node(), "processor": platform.processor(), "machine": platform.machine(),
+        "python_implementation": platform.python_implementation(), "python_version": platform.python_version(),
+        "system": platform.system(), "release": platform.release(), "cpu_count": os.cpu_count(),
+    }
+
+
+def commit_info() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    return {"id": git("rev-parse", "HEAD"), "branch": git("rev-parse", "--abbrev-ref", "HEAD"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def fmt_us(seconds: float) -> str:
+    return f"{seconds * 1e6:,.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-k", dest="keyword", help="只运行名字（group/name）中包含该字符串的基准")
+    parser.add_argument("--max-time", type=float, default=1.0, help="每个基准的大致计时时长（秒）")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--round-ms", type=float, default=10.0, help="校准后每轮的最短时长")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--compare", help="与之前 --json 保存的结果比较")
+    parser.add_argument("--threshold", type=float, default=0.10, help="median 变慢超过该比例时标出")
+    args = parser.parse_args()
+
+    baseline, base_commit = {}, {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        baseline = {b["fullname"]: b for b in saved["benchmarks"]}
+        base_commit = saved.get("commit_info") or {}
+
+    results = []
+    print(f"{'基准':<46}{'min':>12}{'median':>12}{'mean':>12}{'stddev':>10}{'每条':>10}  (µs){'rounds':>9}")
+    for group, name, factory in BENCHMARKS:
+        fullname = f"{group}/{name}"
+        if args.keyword and args.keyword not in fullname:
+            continue
+        try:
+            with factory() as (fn, items):
+                stats = measure(fn, args.round_ms / 1000, args.max_time, args.min_rounds)
+        except SkipBenchmark as e:
+            print(f"{fullname:<46}跳过：{e}")
+            continue
+        results.append({"group": group, "name": name, "fullname": fullname, "params": None,
+                        "stats": stats, "extra_info": {"items": items, "per_item": stats["median"] / items}})
+        line = (f"{fullname:<46}{fmt_us(stats['min']):>12}{fmt_us(stats['median']):>12}{fmt_us(stats['mean']):>12}"
+                f"{fmt_us(stats['stddev']):>10}{fmt_us(stats['median'] / items):>10}{stats['rounds']:>15}")
+        if (base := baseline.get(fullname)) is not None:
+            ratio = stats["median"] / base["stats"]["median"]
+            mark = "  ← 变慢" if ratio > 1 + args.threshold else ("  ← 变快" if ratio < 1 - args.threshold else "")
+            line += f"  {ratio:.2f}x{mark}"
+        print(line)
+
+    if args.compare:
+        print(f"倍数为本次 median / {args.compare} 中的 median"
+              f"（{base_commit.get('branch', '?')} {base_commit.get('id', '')[:12]}）")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"machine_info": machine_info(), "commit_info": commit_info(),
+                       "datetime": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                       "version": "bench_hot_helpers", "benchmarks": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
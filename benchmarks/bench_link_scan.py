@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+链接识别微基准：三个解析插件各自扫描 vs handler 统一扫描一次
+
+用法：
+    python benchmarks/bench_link_scan.py [--corpus messages.jsonl] [--count 20000]
+
+corpus 每行是一个 JSON 字符串（一条消息的文本），以 {"json": ...} 开头的行视为
+Json 卡片；不指定时使用内置的合成群聊语料（约 97% 的消息不含链接）。输出每条
+消息的平均识别耗时，以及两种方式识别出的链接是否一致。
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Tools.links import LinkScan
+
+
+class Text:
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+class Json:
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return "[卡片]"
+
+
+class Message(list):
+    def __str__(self):
+        return "".join(str(i) for i in self)
+
+
+class Event:
+    def __init__(self, message):
+        self.message = message
+
+
+CHAT = [
+    "哈哈哈哈", "早上好", "有人吗", "今天吃什么", "草", "确实", "666", "晚安～", "？",
+    "这个问题我昨天也遇到了，重启一下就好了", "[图片]", "好耶！(*≧︶≦)",
+    "我觉得还是得先看看文档，官方写得挺清楚的，实在不行再去群里问问大佬",
+    "有没有人一起打游戏，差一个人", "你们看那个新番了吗，第三集太好哭了",
+]
+LINKS = [
+    "https://www.bilibili.com/video/BV1GJ411x7h7 快来看",
+    "【视频】 https://b23.tv/aBcD123 分享自哔哩哔哩",
+    "https://www.bilibili.com/video/av170001",
+    "7.89 复制打开抖音 https://v.douyin.com/iRNBho6u/ 看看这个",
+    "https://v.kuaishou.com/abcDEF 快手分享",
+]
+CARDS = [
+    '{"app":"com.tencent.miniapp_01","meta":{"detail_1":{"title":"哔哩哔哩","qqdocurl":"https:\\/\\/b23.tv\\/xYz9Ab1?share_medium=android"}}}',
+    '{"app":"com.tencent.structmsg","meta":{"news":{"title":"天气预报","jumpUrl":"https:\\/\\/weather.example.com\\/"}}}',
+]
+
+
+def synthetic_corpus(count, seed=114514):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        r = rng.random()
+        if r < 0.02:
+            corpus.append(Message([Text(rng.choice(CHAT) + " " + rng.choice(LINKS))]))
+        elif r < 0.03:
+            corpus.append(Message([Json(rng.choice(CARDS))]))
+        else:
+            text = "".join(rng.choice(CHAT) for _ in range(rng.choice((1, 1, 1, 2, 3, 8))))
+            corpus.append(Message([Text(text)]))
+    return corpus
+
+
+def load_corpus(path):
+    corpus = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                text = json.loads(line)
+                corpus.append(Message([Json(text) if text.startswith('{"') else Text(text)]))
+    return corpus
+
+
+# ---------- 旧版：三个插件各自扫描 ----------
+
+_DOUYIN_PATTERN = re.compile(r'(https?://v\.douyin\.com/[^\s]+)')
+_KUAISHOU_PATTERN = re.compile(r'(https?://v\.kuaishou\.com/[^\s]+|https?://www\.kuaishou\.com/[^\s]+)')
+
+
+def legacy_bili(event):
+    msg = str(event.message).strip()
+    if len(event.message) > 0 and isinstance(event.message[0], Json):
+        try:
+            json_msg = str(json.loads(event.message[0].data))
+            bv_match = re.search(r'www.bilibili.com/video/(BV\w+)', json_msg) or re.search(r'b23.tv/(BV\w+)', json_msg) or re.search(r'b23.tv/(\w+)', json_msg)
+            av_match = re.search(r'www.bilibili.com/video/av(\w+)', json_msg) or re.search(r'b23.tv/av(\w+)', json_msg)
+            if bv_match or av_match:
+                msg = json_msg
+            else:
+                return None
+        except Exception:
+            return None
+    bv_match = re.search(r'www.bilibili.com/video/(BV\w+)', msg) or re.search(r'b23.tv/(BV\w+)', msg) or re.search(r'b23.tv/(\w+)', msg)
+    av_match = re.search(r'www.bilibili.com/video/av(\w+)', msg) or re.search(r'b23.tv/av(\w+)', msg)
+    if bv_match:
+        return bv_match.group(1)
+    if av_match:
+        return "av" + av_match.group(1)
+    return None
+
+
+def legacy_douyin(event):
+    mat = _DOUYIN_PATTERN.search(str(event.message).strip())
+    return mat.group(1) if mat else None
+
+
+def legacy_kuaishou(event):
+    mat = _KUAISHOU_PATTERN.search(str(event.message).strip())
+    return mat.group(1) if mat else None
+
+
+def legacy(event):
+    return legacy_bili(event), legacy_douyin(event), legacy_kuaishou(event)
+
+
+# ---------- 新版：handler 统一扫描一次 ----------
+
+def unified(event):
+    links = LinkScan(event)
+    found = []
+    for kinds in (("bv", "av", "b23"), ("douyin",), ("kuaishou",)):
+        # 与插件中的写法相同：每个插件读取 links.text 并取对应类型的第一个候选
+        links.text
+        candidates = links.of(*kinds)
+        if not candidates:
+            found.append(None)
+            continue
+        kind, value = candidates[0]
+        found.append("av" + value if kind == "av" else value)
+    return tuple(found)
+
+
+def bench(func, events, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for event in events:
+            func(event)
+        best = min(best, time.perf_counter() - start)
+    return best / len(events) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="每行一个 JSON 字符串的消息语料")
+    parser.add_argument("--count", type=int, default=20000, help="合成语料的消息条数")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.count)
+    events = [Event(m) for m in corpus]
+    with_links = [e for e in events if any(unified(e))]
+
+    mismatched = 0
+    for event in events:
+        old, new = legacy(event), unified(event)
+        # 旧版对 douyin 链接会连同尾部的非空白字符一起截取，只比较是否识别到了链接
+        if [bool(i) for i in old] != [bool(i) for i in new]:
+            mismatched += 1
+
+    print(f"消息 {len(events)} 条，其中含链接 {len(with_links)} 条，识别结果不一致 {mismatched} 条")
+    print(f"{'':<10}{'全部消息':>12}{'含链接的消息':>14}")
+    for name, func in (("旧版", legacy), ("统一扫描", unified)):
+        print(f"{name:<10}{bench(func, events, args.repeat):>10.2f} µs"
+              f"{bench(func, with_links, args.repeat) if with_links else 0:>12.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
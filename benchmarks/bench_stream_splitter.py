@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+StreamSplitter 微基准
+
+用法：
+    python benchmarks/bench_stream_splitter.py [--corpus streams.jsonl] [--chunk-ms 40]
+
+corpus 每行是一个 JSON 数组，按顺序保存一次回答收到的所有 chunk 文本；
+不指定时使用内置的合成回答。旧版与当前的分段器各跑一遍，输出：
+    TTFS   —— 首段产出前收到的 chunk 数换算出的时间（按 --chunk-ms 估算）
+    CPU/KB —— 分段器处理每 KB 文本消耗的 CPU 时间
+
+旧版是重写前 StreamSplitter 的副本（LegacyStreamSplitter），只去掉了分段间隔与
+最后一段前的随机等待，两者都在每个 chunk 后立即尝试分段。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Tools.AI_tools import StreamSplitter
+
+PARAGRAPHS = [
+    "好的呀！这个问题其实很有意思。",
+    "首先，我们需要了解一下背景：Python（一种解释型语言）的 GIL 会限制多线程的并行度。",
+    "常见的做法有：\n1. 使用多进程\n2. 使用异步 IO\n3. 把计算放到 C 扩展里",
+    "举个例子 {\n  \"name\": \"简儿\",\n  \"mode\": \"Net\"\n} 这样的配置就可以直接读取啦。",
+    "「如果你还有别的问题，随时问我哦」(●'◡'●)",
+    "总之，先测量再优化，才是最靠谱的办法！",
+]
+
+
+def synthetic_streams(count=20, seed=114514):
+    rng = random.Random(seed)
+    streams = []
+    for _ in range(count):
+        text = "\n\n".join(rng.choice(PARAGRAPHS) for _ in range(rng.randint(4, 40)))
+        chunks, i = [], 0
+        while i < len(text):
+            step = rng.randint(2, 12)
+            chunks.append(text[i:i + step])
+            i += step
+        streams.append(chunks)
+    return streams
+
+
+class LegacyStreamSplitter:
+    """重写前的 StreamSplitter（每次收到 chunk 都重新切分整个缓冲区），仅用于对比"""
+
+    def __init__(self):
+        self.full_content = ""
+        self.forward_msg_num = 500
+        self.enable_forward_msg_num = False
+        self.check_forward_msg = False
+        self.split_str = "\n\n\n\n"
+        self.chunks = 0
+        self.buffer = ""
+
+    def split_stream(self, response_stream):
+        for chunk in response_stream:
+            if chunk.text is None:
+                continue
+            self.full_content += chunk.text
+            self.buffer += chunk.text
+            self.chunks += 1
+            for r in self.check_and_split():
+                if r != "":
+                    yield r, self.enable_forward_msg_num
+        for r in self.check_and_split(True):
+            yield r, self.enable_forward_msg_num
+        print(f"FULL_CONTENT: {repr(self.full_content)}")
+
+    def check_and_split(self, last_response=False):
+        if not self.check_forward_msg:
+            if len(self.buffer) > self.forward_msg_num:
+                self.enable_forward_msg_num = True
+            self.check_forward_msg = True
+
+        if self.split_str == "\n\n\n\n":
+            for sep in (self.split_str[:i] for i in range(4, -1, -1)):
+                if sep in self.buffer:
+                    self.split_str = sep
+                    break
+
+        if self.split_str == "":
+            self.split_str = "\n\n\n\n"
+            message = self.buffer
+        else:
+            messages = self.buffer.split(self.split_str)
+            if last_response:
+                yield from messages
+                return
+            message = messages[0]
+            if len(messages) == 1:
+                self.buffer = messages[0].replace(self.buffer, "")
+            else:
+                self.buffer = "\n".join(
+                    msg + "\n" if self._needs_trailing_newline(msg) else msg
+                    for msg in messages[1:-1]
+                ) + messages[-1]
+
+        print(f"BUFFER: {repr(self.buffer)}， SPLIT_STR {repr('string.none' if self.split_str == '' else self.split_str)}")
+
+        if not self.is_balanced(message):
+            self.buffer = message + self.buffer
+            return
+
+        if last_response or self.split_str != "\n\n\n\n":
+            yield message
+
+    def is_balanced(self, text):
+        brackets = {"(": ")", "[": "]", "{": "}", "「": "」"}
+        stack = []
+        for char in text:
+            if char in brackets:
+                stack.append(brackets[char])
+            elif stack and char == stack[-1]:
+                stack.pop()
+        return len(stack) == 0 and not (text.endswith(("\n   -", "（", ":", "：")) or text.startswith((":", "：")))
+
+    def _needs_trailing_newline(self, text: str) -> bool:
+        return any([
+            text.startswith((' - ', '• ', '* ')),
+            text.endswith(('：', ":")),
+            re.search(r'\n\s*[-\*•]', text)
+        ])
+
+
+def load_streams(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def new_splitter():
+    splitter = StreamSplitter()
+    splitter.tail_pacing = None
+    splitter.split_interval = 0
+    return splitter
+
+
+def run_one(factory, chunks):
+    splitter = factory()
+
+    received = 0
+    first_at = None
+
+    def feed():
+        nonlocal received
+        for c in chunks:
+            received += 1
+            yield SimpleNamespace(text=c)
+
+    segments = 0
+    start = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in splitter.split_stream(feed()):
+            segments += 1
+            if first_at is None:
+                first_at = received
+    cpu = time.process_time() - start
+    size = len("".join(chunks).encode("utf-8"))
+    return first_at or received, cpu, size, segments
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="录制的流 (jsonl)")
+    parser.add_argument("--chunk-ms", type=float, default=40.0, help="两个 chunk 之间的平均间隔")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    streams = load_streams(args.corpus) if args.corpus else synthetic_streams()
+    print(f"streams: {len(streams)} x {args.repeat}")
+
+    for name, factory in (("旧版", LegacyStreamSplitter), ("当前", new_splitter)):
+        ttfs, cpu_total, bytes_total, seg_total = [], 0.0, 0, 0
+        for _ in range(args.repeat):
+            for chunks in streams:
+                first_at, cpu, size, segments = run_one(factory, chunks)
+                ttfs.append(first_at * args.chunk_ms)
+                cpu_total += cpu
+                bytes_total += size
+                seg_total += segments
+
+        ttfs.sort()
+        runs = len(ttfs)
+        print(f"[{name}]")
+        print(f"TTFS     p50 {ttfs[runs // 2]:.0f} ms   p95 {ttfs[int(runs * 0.95) - 1]:.0f} ms   max {ttfs[-1]:.0f} ms")
+        print(f"CPU/KB   {cpu_total / (bytes_total / 1024) * 1e6:.1f} µs")
+        print(f"segments {seg_total / runs:.1f} per answer")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+离线的 OneBot 后端：不需要 QQ 账号即可导入 main.py 并驱动其中的 handler
+
+FakeOneBot 替换的是 Listener.Actions 背后的连接而不是 Actions 本身：插件和 handler
+发出的每个请求（send_msg、get_stranger_info、custom.get_group_list……）都会被记录，
+并立即（或在 api_ms 毫秒后，模拟协议端的往返时间）把预设的响应放入 Hyper 的
+reports。这样 Hyper 自己的 Message.get()、Ret.fetch() 等开销也计入测量结果。
+
+依赖与正式运行相同（Hyper 等需已安装），供 benchmarks/ 下的压测脚本导入。
+"""
+import importlib.util
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 这些请求会产生一条新消息，响应中带 message_id，且可以再通过 get_msg 取回
+SEND_ACTIONS = {"send_msg", "send_group_msg", "send_private_msg", "send_forward_msg", "send_group_forward_msg"}
+
+
+def load_bot(copy: bool = True):
+    """
+    导入 main.py（不连接 Listener），返回 main 模块。
+
+    copy 为 True 时在临时目录中的副本里运行，压测过程中写入的签到数据、预设、
+    临时文件等不会改动仓库中的文件。
+    """
+    workdir = ROOT
+    if copy:
+        workdir = tempfile.mkdtemp(prefix="jianer_bench_")
+        shutil.copytree(ROOT, workdir, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns(".git", "__pycache__", "temps", "benchmarks"))
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+
+    from Tools.settings import Settings
+    Settings("config.json")  # 导入 Listener 之前需要先有 Configurator.cm，与 main.py 的顺序相同
+    from Hyper import Listener
+    Listener.run = lambda: None  # main.py 最后一行会调用 Listener.run() 连接协议端
+
+    argv = sys.argv
+    sys.argv = [os.path.join(workdir, "main.py")]  # main.py 会切换到 argv[0] 所在的目录
+    try:
+        spec = importlib.util.spec_from_file_location("main", os.path.join(workdir, "main.py"))
+        bot = importlib.util.module_from_spec(spec)
+        sys.modules["main"] = bot
+        spec.loader.exec_module(bot)
+    finally:
+        sys.argv = argv
+
+    # Listener.reg 不返回被注册的函数，main.handler 是 None，从适配器中取回
+    bot.handler = sys.modules[Listener.reg.__module__].handler
+    # 第一个事件会启动定时群发线程：它不是守护线程，而且会在设定的时间向所有群发消息
+    bot.in_timing = True
+    bot.workdir = workdir
+    return bot
+
+
+class FakeOneBot:
+    """记录所有请求并返回预设响应的协议端"""
+
+    def __init__(self, self_id: int = 10000, groups=(100001, 100002, 100003), api_ms: float = 0):
+        self.self_id = self_id
+        self.groups = list(groups)
+        self.api_ms = api_ms
+        self.calls: Counter[str] = Counter()
+        self.sent: list[tuple[float, str, dict]] = []  # (perf_counter 时间, action, params)
+        self.messages: dict[int, dict] = {}  # message_id -> get_msg 的响应数据
+        self._ids = itertools.count(1_000_000)
+        self._lock = threading.Lock()
+
+    # ---------- 连接 ----------
+
+    def actions(self):
+        """返回连接到本后端的 Listener.Actions"""
+        from Hyper import Listener, Network
+        from Hyper.Manager import reports
+
+        backend = self
+
+        class Connection(Network.WebsocketConnection):
+            # Packet.send_to 按 isinstance 选择发送方式，这里沿用 websocket 的 JSON 格式
+            def __init__(self):
+                pass
+
+            def send(self, message: str) -> None:
+                payload = json.loads(message)
+                response = backend.request(payload["action"], payload.get("params") or {})
+                response["echo"] = echo = payload["echo"]
+                # 真实连接中 echo 重复时 Ret.fetch 会直接拿到旧的响应，这里覆盖掉，让 api_ms 对每个请求都生效
+                reports.contents.pop(echo, None)
+                if backend.api_ms > 0:
+                    threading.Timer(backend.api_ms / 1000, reports.put, (echo, response)).start()
+                else:
+                    reports.put(echo, response)
+
+            def recv(self) -> dict:
+                raise ConnectionResetError
+
+            def close(self) -> None:
+                pass
+
+        return Listener.Actions(Connection())
+
+    def request(self, action: str, params: dict) -> dict:
+        with self._lock:
+            self.calls[action] += 1
+            if action in SEND_ACTIONS:
+                self.sent.append((time.perf_counter(), action, params))
+        api = getattr(self, f"api_{action}", None)
+        data = api(params) if api is not None else None
+        return {"status": "ok", "retcode": 0, "data": data}
+
+    # ---------- 预设响应 ----------
+
+    def _sent_message(self, params: dict) -> dict:
+        message_id = next(self._ids)
+        message = params.get("message") or params.get("messages") or []
+        self.messages[message_id] = {
+            "message_id": message_id, "message_type": "group" if params.get("group_id") else "private",
+            "sender": {"user_id": self.self_id, "nickname": "bench"}, "time": int(time.time()),
+            "message": message if isinstance(message, list) else [{"type": "text", "data": {"text": str(message)}}],
+        }
+        return {"message_id": message_id}
+
+    api_send_msg = api_send_group_msg = api_send_private_msg = _sent_message
+    api_send_forward_msg = api_send_group_forward_msg = _sent_message
+
+    def api_get_msg(self, params: dict) -> dict:
+        message_id = int(params.get("message_id") or 0)
+        return self.messages.get(message_id) or {
+            "message_id": message_id, "message_type": "group", "time": int(time.time()),
+            "sender": {"user_id": 20000, "nickname": "群友20000"},
+            "message": [{"type": "text", "data": {"text": "这是一条很久以前的消息"}}],
+        }
+
+    def api_get_stranger_info(self, params: dict) -> dict:
+        user_id = int(params.get("user_id") or 0)
+        return {"user_id": user_id, "nickname": f"群友{user_id}", "sex": "unknown", "age": 18, "level": 1}
+
+    def api_get_group_member_info(self, params: dict) -> dict:
+        user_id = int(params.get("user_id") or 0)
+        return {"group_id": params.get("group_id"), "user_id": user_id, "nickname": f"群友{user_id}",
+                "card": "", "role": "member", "title": "", "join_time": 0, "last_sent_time": int(time.time())}
+
+    def api_get_group_list(self, params: dict) -> list:
+        return [{"group_id": g, "group_name": f"测试群{g}", "member_count": 100, "max_member_count": 500}
+                for g in self.groups]
+
+    def api_get_group_info(self, params: dict) -> dict:
+        group_id = int(params.get("group_id") or 0)
+        return {"group_id": group_id, "group_name": f"测试群{group_id}", "member_count": 100, "max_member_count": 500}
+
+    def api_get_login_info(self, params: dict) -> dict:
+        return {"user_id": self.self_id, "nickname": "bench"}
+
+    def api_get_version_info(self, params: dict) -> dict:
+        return {"app_name": "FakeOneBot", "app_version": "0.0.0", "protocol_version": "v11"}
+
+    def api_get_status(self, params: dict) -> dict:
+        return {"online": True, "good": True}
+
+    # ---------- 事件 ----------
+
+    def group_message(self, message: list, group_id: int, user_id: int, message_id: int | None = None) -> dict:
+        """构造一条原始的群消息事件（与协议端推送的 JSON 相同），并登记到 get_msg 中"""
+        message_id = next(self._ids) if message_id is None else message_id
+        data = {
+            "post_type": "message", "message_type": "group", "sub_type": "normal",
+            "time": int(time.time()), "self_id": self.self_id, "message_id": message_id,
+            "group_id": group_id, "user_id": user_id, "message": message, "font": 0,
+            "raw_message": "".join(s["data"].get("text", "") for s in message if s["type"] == "text"),
+            "sender": {"user_id": user_id, "nickname": f"群友{user_id}", "card": "", "role": "member"},
+        }
+        self.remember(data)
+        return data
+
+    def remember(self, data: dict) -> None:
+        """登记收到的消息，之后引用它时 get_msg 能取回原文"""
+        if data.get("post_type") == "message" and data.get("message_id") is not None:
+            self.messages[int(data["message_id"])] = {
+                key: data.get(key) for key in ("message_id", "message_type", "time", "sender", "message")
+            }
+
+    def next_message_id(self) -> int:
+        return next(self._ids)
+
+
+def text(content: str) -> dict:
+    return {"type": "text", "data": {"text": content}}
+
+
+def at(qq) -> dict:
+    return {"type": "at", "data": {"qq": str(qq)}}
+
+
+def reply(message_id) -> dict:
+    return {"type": "reply", "data": {"id": str(message_id)}}
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+本地的模拟大模型服务器（OpenAI 兼容 + Gemini 兼容的流式接口），只使用标准库
+
+用法：
+    python benchmarks/mock_llm_server.py [--port 8990] [--tokens-per-s 30] [--ttft-ms 400]
+                                         [--jitter 0.3] [--fail-rate 0] [--fail-mode mixed]
+
+支持的接口：
+    POST .../chat/completions                          OpenAI / DeepSeek，stream 为 true 时返回 SSE
+    POST .../models/<model>:streamGenerateContent      Gemini，?alt=sse 时返回 SSE，否则返回流式 JSON 数组
+    POST .../models/<model>:generateContent            Gemini 非流式
+回答按 token（1～4 个字符）以 tokens_per_s 的速率输出，每个 token 的间隔带 ±jitter 的随机抖动，
+第一个 token 在 ttft_ms 之后到达。fail_rate 的请求会失败：
+    http500 —— 返回 500；ratelimit —— 返回 429；disconnect —— 输出一半后断开连接；
+    stall —— 输出一半后停顿 stall_s 秒再继续；mixed —— 以上随机一种
+每个请求的 TTFT、耗时、token 数记录在 MockLLMServer.requests 中，供基准脚本统计。
+"""
+import argparse
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PARAGRAPHS = [
+    "好的呀！这个问题其实很有意思。",
+    "首先，我们需要了解一下背景：Python（一种解释型语言）的 GIL 会限制多线程的并行度。",
+    "常见的做法有：\n1. 使用多进程\n2. 使用异步 IO\n3. 把计算放到 C 扩展里",
+    "举个例子 {\n  \"name\": \"简儿\",\n  \"mode\": \"Net\"\n} 这样的配置就可以直接读取啦。",
+    "「如果你还有别的问题，随时问我哦」(●'◡'●)",
+    "总之，先测量再优化，才是最靠谱的办法！",
+]
+FAIL_MODES = ("http500", "ratelimit", "disconnect", "stall")
+
+
+class MockLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, tokens_per_s: float = 30, ttft_ms: float = 400,
+                 jitter: float = 0.3, answer_chars: int = 300, fail_rate: float = 0, fail_mode: str = "mixed",
+                 stall_s: float = 5, seed: int | None = None):
+        self.tokens_per_s = tokens_per_s
+        self.ttft_ms = ttft_ms
+        self.jitter = jitter
+        self.answer_chars = answer_chars
+        self.fail_rate = fail_rate
+        self.fail_mode = fail_mode
+        self.stall_s = stall_s
+        self.rng = random.Random(seed)
+        self.requests: list[dict] = []  # 每个请求一条记录，见 Handler._record
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _handler_class(self))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def answer(self) -> list[str]:
+        """生成一个回答并切成 token"""
+        with self._lock:
+            text = ""
+            while len(text) < self.answer_chars:
+                text += self.rng.choice(PARAGRAPHS) + "\n\n"
+            tokens, i = [], 0
+            while i < len(text):
+                n = self.rng.randint(1, 4)
+                tokens.append(text[i:i + n])
+                i += n
+            return tokens
+
+    def failure(self) -> str | None:
+        with self._lock:
+            if self.fail_rate <= 0 or self.rng.random() >= self.fail_rate:
+                return None
+            return self.rng.choice(FAIL_MODES) if self.fail_mode == "mixed" else self.fail_mode
+
+    def delay(self, first: bool) -> float:
+        base = self.ttft_ms / 1000 if first else 1 / self.tokens_per_s
+        with self._lock:
+            return max(0.0, base * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+
+
+def _handler_class(server: MockLLMServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # 每个 token 都是一次小的写入，不关闭 Nagle 算法时会与客户端的延迟确认叠加出数十毫秒的等待
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                payload = {}
+            path = self.path.split("?", 1)[0]
+            record = {"path": path, "prompt": _prompt(payload), "started": time.perf_counter(),
+                      "first_token": None, "finished": None, "tokens": 0, "failure": server.failure()}
+            with server._lock:
+                server.requests.append(record)
+
+            if record["failure"] in ("http500", "ratelimit"):
+                status = 500 if record["failure"] == "http500" else 429
+                return self._json(status, {"error": {"code": status, "message": f"mock {record['failure']}",
+                                                     "type": "server_error" if status == 500 else "rate_limit_exceeded"}})
+            if path.endswith("/chat/completions"):
+                return self._openai(payload, record)
+            if (match := re.search(r"/models/([^/:]+):(streamGenerateContent|generateContent)$", path)):
+                return self._gemini(match.group(1), match.group(2) == "streamGenerateContent",
+                                    "alt=sse" in self.path, record)
+            self._json(404, {"error": {"code": 404, "message": f"unknown path {path}"}})
+
+        # ---------- 输出 ----------
+
+        def _json(self, status: int, obj) -> None:
+            data = json.dumps(obj, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _start_stream(self, content_type: str) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def _chunk(self, data: str) -> None:
+            raw = data.encode()
+            self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+            self.wfile.flush()
+
+        def _tokens(self, record: dict):
+            """按设定的速率产出 token；disconnect 时在一半处断开，stall 时在一半处停顿"""
+            tokens = server.answer()
+            half = len(tokens) // 2
+            for i, token in enumerate(tokens):
+                if i == half and record["failure"] == "disconnect":
+                    self.close_connection = True
+                    record["finished"] = time.perf_counter()
+                    raise ConnectionAbortedError
+                if i == half and record["failure"] == "stall":
+                    time.sleep(server.stall_s)
+                time.sleep(server.delay(first=i == 0))
+                if record["first_token"] is None:
+                    record["first_token"] = time.perf_counter()
+                record["tokens"] += 1
+                yield token
+
+        def _finish(self, record: dict) -> None:
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+            record["finished"] = time.perf_counter()
+
+        # ---------- OpenAI ----------
+
+        def _openai(self, payload: dict, record: dict) -> None:
+            model = payload.get("model", "mock")
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            created = int(time.time())
+
+            def chunk(delta: dict, finish_reason=None) -> dict:
+                return {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+            if not payload.get("stream"):
+                text = "".join(self._tokens(record))
+                record["finished"] = time.perf_counter()
+                return self._json(200, {
+                    "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": record["tokens"], "total_tokens": record["tokens"]},
+                })
+
+            self._start_stream("text/event-stream")
+            try:
+                self._chunk(f"data: {json.dumps(chunk({'role': 'assistant', 'content': ''}), ensure_ascii=False)}\n\n")
+                for token in self._tokens(record):
+                    self._chunk(f"data: {json.dumps(chunk({'content': token}), ensure_ascii=False)}\n\n")
+                self._chunk(f"data: {json.dumps(chunk({}, 'stop'))}\n\ndata: [DONE]\n\n")
+                self._finish(record)
+            except (ConnectionError, BrokenPipeError):
+                self.close_connection = True
+
+        # ---------- Gemini ----------
+
+        def _gemini(self, model: str, stream: bool, sse: bool, record: dict) -> None:
+            def response(text: str, finish: bool) -> dict:
+                candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+                if finish:
+                    candidate["finishReason"] = "STOP"
+                return {"candidates": [candidate], "modelVersion": model,
+                        "usageMetadata": {"candidatesTokenCount": record["tokens"]} if finish else {}}
+
+            if not stream:
+                text = "".join(self._tokens(record))
+                record["finished"] = time.perf_counter()
+                return self._json(200, response(text, True))
+
+            # 每个响应合并若干个 token，与真实服务大致相同的粒度
+            self._start_stream("text/event-stream" if sse else "application/json")
+            try:
+                pending, first = "", True
+                if not sse:
+                    self._chunk("[")
+                for token in self._tokens(record):
+                    pending += token
+                    if len(pending) >= 8:
+                        self._gemini_chunk(response(pending, False), sse, first)
+                        pending, first = "", False
+                self._gemini_chunk(response(pending, True), sse, first)
+                if not sse:
+                    self._chunk("]")
+                self._finish(record)
+            except (ConnectionError, BrokenPipeError):
+                self.close_connection = True
+
+        def _gemini_chunk(self, obj: dict, sse: bool, first: bool) -> None:
+            data = json.dumps(obj, ensure_ascii=False)
+            self._chunk(f"data: {data}\r\n\r\n" if sse else (data if first else ",\r\n" + data))
+
+    return Handler
+
+
+def _prompt(payload: dict) -> str:
+    """请求中最后一条用户消息的文本，基准脚本用它把请求对应到提问"""
+    if payload.get("messages"):
+        content = payload["messages"][-1].get("content")
+        return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+    for content in reversed(payload.get("contents") or []):
+        if content.get("role", "user") == "user":
+            return "".join(part.get("text", "") for part in content.get("parts") or [])
+    return ""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8990)
+    parser.add_argument("--tokens-per-s", type=float, default=30)
+    parser.add_argument("--ttft-ms", type=float, default=400)
+    parser.add_argument("--jitter", type=float, default=0.3, help="每个 token 间隔的相对抖动")
+    parser.add_argument("--answer-chars", type=int, default=300)
+    parser.add_argument("--fail-rate", type=float, default=0)
+    parser.add_argument("--fail-mode", choices=FAIL_MODES + ("mixed",), default="mixed")
+    parser.add_argument("--stall-s", type=float, default=5)
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.tokens_per_s, args.ttft_ms, args.jitter,
+                           args.answer_chars, args.fail_rate, args.fail_mode, args.stall_s)
+    print(f"模拟大模型服务器：{server.url}（OpenAI base_url 为 {server.url}/v1/，Gemini api_endpoint 为 {server.url}）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
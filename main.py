@@ -4,13 +4,32 @@
 # Made by 思锐工作室
 # link: https://github.com/SRInternet-Studio/Jianer_QQ_bot/
 
+# 启动耗时统计，使用 python main.py --startup-report 启动时打印
+import sys
+from Tools.startup import StartupReport
+startup = StartupReport("--startup-report" in sys.argv)
+
 # import Tools functions
 from Tools.tools import * 
 print(title() + "\nWelcome to Jianer QQ Bot, Starting Kernal now...", end="\r") 
 
-from Tools.GoogleAI import genai, Context, Parts, Roles, Schema
-from Tools.SearchOnline import network_gpt as SearchOnline
-from Tools.deepseek import dsr114 as deepseek
+# AI 后端（google.generativeai / openai）在第一次使用时才导入，见 load_gemini() 等
+from Tools.tts import TTSPipeline
+from Tools.system_stats import system_stats
+from Tools.workers import image_pool
+from Tools.image_cache import get_image_cache, avatar_url
+from Tools.temp_arena import get_temp_arena, clean_legacy_temps
+from Tools.links import LinkScan
+from Tools.message import ParsedMessage
+from Tools.dedup import EventDeduplicator
+from Tools.log import get_logger, log_service
+from Tools.tracing import tracer
+from Tools.watchdog import loop_watchdog
+from Tools.background import background
+from Tools.message_cache import MessageCache
+from Tools.permissions import PermissionService
+from Tools.plugin_manifest import LazyPlugin, read_manifest
+from Tools.plugin_guard import scan_plugin, is_severe, describe, plugin_offloader
 import prerequisites.prerequisite as presets_tool
 
 # import requirements
@@ -18,38 +37,51 @@ import faulthandler
 faulthandler.enable()
 from urllib.parse import urlparse, urlunparse
 
-import sys, os, asyncio, traceback, threading
+import sys, os, asyncio, traceback, threading, logging
+import concurrent.futures
 import importlib.util   
 import inspect
 import random
-import uuid, re
-import emoji
+import uuid, re, gc, hashlib
 import time, datetime
 import random
+startup.mark("Tools")
 
 # import framework
 os.chdir(os.path.dirname(os.path.abspath(sys.argv[0])))
-from Hyper import Configurator
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
+from Tools.settings import Settings
+settings = Settings("config.json") # 唯一的配置快照，插件通过 settings 参数获取
 from Hyper import Listener, Events, Logger, Manager, Segments
 from Hyper.Utils import Logic
 from Hyper.Events import *
 
-config = Configurator.cm.get_cfg()
-reminder: str = config.others["reminder"]
-bot_name = config.others["bot_name"] #星·简
-bot_name_en = config.others["bot_name_en"] #Shining girl
-bot_owner = config.owner[0]
-ONE_SLOGAN: str = config.others["slogan"]
-CONFUSED_WORD: str = config.others.get("confused_words", 
-    "你没有权限(ー_ー)!!")
-
-ROOT_User: list = config.others["ROOT_User"]
-Super_User: list = []
-Manage_User: list = []
+config = settings.cfg
+reminder: str = settings.reminder
+bot_name = settings.bot_name #星·简
+bot_name_en = settings.bot_name_en #Shining girl
+bot_owner = settings.owner[0]
+ONE_SLOGAN: str = settings.slogan
+CONFUSED_WORD: str = settings.confused_words
+
+ROOT_User: list = settings.root_users
+permissions = PermissionService(ROOT_User) # 用户组权限，插件通过 permissions 参数获取
+image_cache = get_image_cache() # 头像等远程图片缓存，插件通过 image_cache 参数获取
+temp_arena = get_temp_arena() # 统一管理的临时文件，插件通过 temp_arena 参数获取
+event_dedup = EventDeduplicator() # 断线重连后重复投递的事件在 handler 入口处丢弃
+message_cache = MessageCache() # 最近收到的消息，引用时不必再 get_msg，插件通过 message_cache 参数获取
+if (removed := clean_legacy_temps()):
+    print(f"已清理 {removed} 个旧版本遗留的临时文件")
+Super_User: list = list(permissions.super_list)
+Manage_User: list = list(permissions.manage_list)
+startup.mark("框架与配置")
 
 logger = Logger.Logger()
 logger.set_level(config.log_level)
+log_service.setup(config.log_level) # 日志经队列交给后台线程写入控制台和 logs/jianer.log（轮转后 gzip 压缩）
+log = get_logger("main")
+dedup_log = get_logger("dedup")
+tracer.enabled = "--trace" in sys.argv # 每个事件的 span 追踪，也可以用 链路追踪 开启 命令打开
+tracer.install_signal() # kill -USR1 导出追踪数据
 version_name = "3.0 - Next Preview Ultra"
 
 stop_working = False
@@ -95,12 +127,35 @@ generation_config = {
 }
 
 sys_prompt = ""
-model = genai.GenerativeModel()
+genai = Context = Parts = Roles = Schema = None # Gemini 后端，见 load_gemini()
+model = None
 cmc = ContextManager() # Gemini 的上下文管理器
 tools = []
 
 key = config.others["gemini_key"]
-genai.configure(api_key=key)
+gemini_lock = threading.Lock() # 多个事件线程可能同时第一次使用 Gemini
+
+def load_gemini():
+    """第一次使用 Gemini 时才导入 google.generativeai 并完成配置"""
+    global genai, Context, Parts, Roles, Schema, model
+    if genai is not None:
+        return
+    with gemini_lock:
+        if genai is not None:
+            return
+        from Tools import GoogleAI
+        GoogleAI.configure(key)
+        model = GoogleAI.genai.GenerativeModel()
+        Context, Parts, Roles, Schema = GoogleAI.Context, GoogleAI.Parts, GoogleAI.Roles, GoogleAI.Schema
+        genai = GoogleAI.genai # 最后赋值：其他线程看到 genai 时配置和 model 都已就绪
+
+def SearchOnline(*args, **kwargs):
+    from Tools.SearchOnline import network_gpt # 按需导入 openai
+    return network_gpt(*args, **kwargs)
+
+def deepseek(*args, **kwargs):
+    from Tools.deepseek import dsr114 # 按需导入 openai
+    return dsr114(*args, **kwargs)
 
 gptsovitsoff = False
 print(" " * 114, end="\r") # Staring Completed
@@ -123,6 +178,91 @@ PRESET_DIR = presets_tool.PRESET_DIR
 NORMAL_PRESET = presets_tool.NORMAL_PRESET
 
 # 插件加载器 NEXT 3
+plugin_records: dict[str, dict] = {} # 文件名 -> {"module", "name", "hash", "path"}
+activate_lock = threading.Lock() # Hyper 在不同线程中处理事件，同一个插件只能被按需导入一次
+plugin_reload_report: list[tuple[str, float]] = [] # 最近一次加载中实际（重新）导入的插件及耗时
+TEARDOWN_TIMEOUT = 10 # 等待插件 async teardown() 完成的最长秒数
+plugin_warnings: dict[str, list] = {} # 模块名 -> 插件协程中调用的阻塞接口（BlockingCall），显示在 插件视角 中
+
+def plugin_hash(path: str) -> str:
+    """插件内容的哈希，目录形式插件包含目录下所有 .py 文件"""
+    h = hashlib.sha1()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for f in sorted(files):
+                if f.endswith((".py", ".pyw")):
+                    file_path = os.path.join(root, f)
+                    h.update(os.path.relpath(file_path, path).encode())
+                    with open(file_path, "rb") as fp:
+                        h.update(fp.read())
+    else:
+        with open(path, "rb") as fp:
+            h.update(fp.read())
+    return h.hexdigest()
+
+async def _await(awaitable):
+    return await awaitable
+
+def unload_plugin(record: dict):
+    """调用插件的 teardown() 并从 sys.modules 中移除插件及其子模块"""
+    module = record["module"]
+    teardown = getattr(module, "teardown", None)
+    if callable(teardown):
+        try:
+            r = teardown()
+            if inspect.isawaitable(r):
+                # 重载插件 在事件自己的循环中执行，该循环在 handler 返回后就会取消未完成的任务，
+                # 因此交给后台循环并等待 teardown 真正完成
+                if not asyncio.iscoroutine(r):
+                    r = _await(r)
+                future = background.submit(r)
+                try:
+                    future.result(TEARDOWN_TIMEOUT)
+                except concurrent.futures.TimeoutError:
+                    future.cancel()
+                    log.warning("插件 %s 的 teardown 超过 %d 秒未完成，已放弃等待", record["name"], TEARDOWN_TIMEOUT)
+        except Exception:
+            print(f"插件 {record['name']} teardown 出错: \n{traceback.format_exc()}")
+
+    path = os.path.abspath(record["path"])
+    for name, mod in list(sys.modules.items()):
+        file = getattr(mod, "__file__", None)
+        if name == record["name"] or (file and (os.path.abspath(file) == path or os.path.abspath(file).startswith(path + os.sep))):
+            del sys.modules[name]
+
+def import_plugin(module_name: str, unique_module_name: str, entry: str):
+    """执行插件模块，失败时记录原因并返回 None"""
+    try:
+        spec = importlib.util.spec_from_file_location(unique_module_name, entry)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[unique_module_name] = module  # 添加到 sys.modules
+        spec.loader.exec_module(module)
+    except FileNotFoundError as e:
+        failed_plugins.append(f"{module_name} (文件未找到: {e})")
+        print(f"加载插件 {unique_module_name} 失败，原因是: {e}")
+        sys.modules.pop(unique_module_name, None)
+        return None
+    except ImportError as e:
+        failed_plugins.append(f"{module_name} (导入错误: {e})")
+        print(f"加载插件 {unique_module_name} 失败，原因是: {e}")
+        sys.modules.pop(unique_module_name, None)
+        return None
+    except Exception as e:
+        failed_plugins.append(f"{module_name} (其他错误: {str(traceback.format_exc())})")
+        print(f"加载插件 {unique_module_name} 失败: \n{traceback.format_exc()}\n")
+        sys.modules.pop(unique_module_name, None)  # Cleanup
+        return None
+    return module
+
+def check_plugin(module) -> str | None:
+    """返回不符合插件规范的原因，符合时返回 None"""
+    if not (hasattr(module, 'TRIGGHT_KEYWORD') and (isinstance(module, LazyPlugin) or hasattr(module, 'on_message'))):
+        return "缺少 TRIGGHT_KEYWORD：触发标识符 或 on_message：触发函数后端"
+    if not isinstance(module.TRIGGHT_KEYWORD, str):
+        return "TRIGGHT_KEYWORD 必须是字符串"
+    return None
+
 def load_plugins():
     global loaded_plugins, disabled_plugins, failed_plugins, plugins_help, reminder, bot_name, PLUGIN_FOLDER
     plugins = []
@@ -131,13 +271,14 @@ def load_plugins():
     loaded_plugins.clear()
     disabled_plugins.clear()
     failed_plugins.clear()
+    plugin_reload_report.clear()
+    plugin_warnings.clear()
 
+    found = {}
     for filename in os.listdir(PLUGIN_FOLDER):
         module_name = filename  # Folder name as module name
-        print(f"check file or directory: {filename}")
 
         if filename == "__pycache__":
-            print("Directory __pycache__ not load.")
             continue
 
         # 检查是否禁用
@@ -145,125 +286,146 @@ def load_plugins():
             disabled_plugins.append(module_name)
             continue
 
-        # 处理目录形式插件
         plugin_path = os.path.join(PLUGIN_FOLDER, filename)  # Full plugin path
         if os.path.isdir(plugin_path):
-            setup_file = os.path.join(plugin_path, "setup.py")
-            if os.path.exists(setup_file):
-                try:
-                    # Load setup.py
-                    unique_module_name = f"{module_name}_{uuid.uuid4().hex}"  # Generate unique module name
-                    spec = importlib.util.spec_from_file_location(unique_module_name, setup_file)
-                    module = importlib.util.module_from_spec(spec)
-                    sys.modules[unique_module_name] = module
-                    spec.loader.exec_module(module)
-                    print(f"Loaded setup.py from folder plugin: {module_name}")
-
-                    # Verify plugin
-                    if hasattr(module, 'TRIGGHT_KEYWORD') and hasattr(module, 'on_message'):
-                        if isinstance(module.TRIGGHT_KEYWORD, str):
-                            plugins.append(module)  # Add module
-                            loaded_plugins.append(unique_module_name) 
-                            if hasattr(module, 'HELP_MESSAGE'):
-                                if isinstance(module.HELP_MESSAGE, str):
-                                    plugins_help += f"\n       {module.HELP_MESSAGE}"
-
-                            print(f"已加载插件: {unique_module_name} (关键词: {module.TRIGGHT_KEYWORD})")
-                        else:
-                            failed_plugins.append(f"{module_name} (TRIGGHT_KEYWORD 必须是字符串)")
-                    else:
-                        failed_plugins.append(f"{module_name} (缺少 TRIGGHT_KEYWORD：触发标识符 或 on_message：触发函数后端)")
-
-                except FileNotFoundError as e:
-                    failed_plugins.append(f"{module_name} (文件未找到: {e})")
-                    print(f"加载插件 {unique_module_name} 失败，是因为: {e}")
-                    if unique_module_name in sys.modules:
-                        del sys.modules[unique_module_name]
-                except ImportError as e:
-                    failed_plugins.append(f"{module_name} (导入错误: {e})")
-                    print(f"加载插件 {unique_module_name} 失败，是因为: {e}")
-                    if unique_module_name in sys.modules:
-                        del sys.modules[unique_module_name]
-                except Exception as e:
-                    failed_plugins.append(f"{module_name} (其他错误: {str(e)})")
-                    print(f"加载插件 {unique_module_name} 失败: \n{traceback.format_exc()}\n")
-                    if unique_module_name in sys.modules:
-                        del sys.modules[unique_module_name]  # Cleanup
-
-            else:
-                print(f"目录 {filename} 中缺少 setup.py 文件")
+            # 处理目录形式插件
+            entry = os.path.join(plugin_path, "setup.py")
+            if not os.path.exists(entry):
+                log.warning("目录 %s 中缺少 setup.py 文件", filename)
                 failed_plugins.append(f"{filename} (入口错误: 缺少 setup.py 文件)")
-
-        # 处理文件形式插件
+                continue
         elif filename.endswith(".py") or filename.endswith(".pyw"):
+            # 处理文件形式插件
             module_name = filename[:-3] if filename.endswith(".py") else filename[:-4]
+            entry = plugin_path
+        else:
+            log.debug("跳过非插件文件或目录: %s", filename)
+            continue
 
-            # 检查是否禁用
-            if filename.startswith("d_"):
-                disabled_plugins.append(str(module_name)[3:])
-                continue
-
-            # 生成唯一的模块名
-            unique_module_name = f"{module_name}_{uuid.uuid4().hex}"
-
-            try:
-                # 检查模块是否已经加载
-                if unique_module_name in sys.modules:
-                    print(f"模块 {unique_module_name} 已经加载，跳过")
+        found[filename] = (module_name, plugin_path, entry)
+
+    # 卸载已删除、已禁用或内容发生变化的插件
+    for filename, record in list(plugin_records.items()):
+        if filename not in found or plugin_hash(found[filename][1]) != record["hash"]:
+            unload_plugin(record)
+            del plugin_records[filename]
+    gc.collect()
+
+    for filename, (module_name, plugin_path, entry) in found.items():
+        record = plugin_records.get(filename)
+        cost = None
+        if record is None:
+            digest = plugin_hash(plugin_path)
+            unique_module_name = f"{module_name}_{digest[:12]}"  # 由内容决定的模块名
+            manifest = read_manifest(entry)
+            if manifest is not None:
+                # 带清单的插件只登记占位，第一次遇到匹配的事件时才导入
+                module = LazyPlugin(unique_module_name, entry, manifest, reminder, bot_name)
+            else:
+                start = time.perf_counter()
+                module = import_plugin(module_name, unique_module_name, entry)
+                if module is None:
                     continue
+                cost = time.perf_counter() - start
+
+            blocking = scan_plugin(plugin_path) # 只解析源码，按需导入的插件同样检查
+            for call in blocking:
+                log.log(logging.WARNING if call.kind != "file" else logging.DEBUG,
+                        "插件 %s 在协程中使用了%s", module_name, describe(call))
+            record = {"module": module, "name": unique_module_name, "hash": digest,
+                      "path": plugin_path, "entry": entry, "title": module_name, "blocking": blocking}
+
+        module = record["module"]
+        # 验证模块是否符合插件规范
+        error = check_plugin(module)
+        if error is None:
+            plugin_records[filename] = record
+            if cost is not None:
+                plugin_reload_report.append((module_name, cost))
+            plugins.append(module)  # 重要：把整个模块全tm加入到列表
+            loaded_plugins.append(record["name"])
+            if record["blocking"]:
+                plugin_warnings[record["name"]] = record["blocking"]
+            if isinstance(getattr(module, 'HELP_MESSAGE', None), str):
+                plugins_help += f"\n       {module.HELP_MESSAGE}"
+            continue
 
-                # 创建模块规范
-                spec = importlib.util.spec_from_file_location(unique_module_name, os.path.join(PLUGIN_FOLDER, filename))
-                module = importlib.util.module_from_spec(spec)
-                sys.modules[unique_module_name] = module  # 添加到 sys.modules
-                spec.loader.exec_module(module)
-
-                # 验证模块是否符合插件规范
-                if hasattr(module, 'TRIGGHT_KEYWORD') and hasattr(module, 'on_message'):
-                    if isinstance(module.TRIGGHT_KEYWORD, str):
-                        plugins.append(module)  # 重要：把整个模块全tm加入到列表
-                        loaded_plugins.append(unique_module_name)
-                        if hasattr(module, 'HELP_MESSAGE'):
-                                if isinstance(module.HELP_MESSAGE, str):
-                                    plugins_help += f"\n       {module.HELP_MESSAGE}"
-
-                        print(f"已加载插件: {unique_module_name} (关键词: {module.TRIGGHT_KEYWORD})")
-                    else:
-                        failed_plugins.append(f"{module_name} (TRIGGHT_KEYWORD 必须是字符串)")
-                else:
-                    failed_plugins.append(f"{module_name} (缺少 TRIGGHT_KEYWORD：触发标识符 或 on_message：触发函数后端)")
-
-            except FileNotFoundError as e:
-                failed_plugins.append(f"{module_name} (文件未找到: {e})")
-                print(f"加载插件 {unique_module_name} 失败，原因是: {e}")
-                if unique_module_name in sys.modules:
-                    del sys.modules[unique_module_name]
-            except ImportError as e:
-                failed_plugins.append(f"{module_name} (导入错误: {e})")
-                print(f"加载插件 {unique_module_name} 失败，原因是: {e}")
-                if unique_module_name in sys.modules:
-                    del sys.modules[unique_module_name]
-            except Exception as e:
-                failed_plugins.append(f"{module_name} (其他错误: {str(traceback.format_exc())})")
-                print(f"加载插件 {unique_module_name} 失败: \n{traceback.format_exc()}\n")
-                if unique_module_name in sys.modules:
-                    del sys.modules[unique_module_name]  # Cleanup
-
-        else:
-            print(f"跳过非插件文件或目录: {filename}")
+        failed_plugins.append(f"{module_name} ({error})")
+        if plugin_records.get(filename) is not record:
+            unload_plugin(record)
 
-    print(f"成功加载 {len(loaded_plugins)} 个插件")
+    if log.isEnabledFor(logging.DEBUG):
+        for name, cost in plugin_reload_report:
+            log.debug("已加载插件: %s (%.1f ms)", name, cost * 1000)
+    log.info("成功加载 %d 个插件，其中 %d 个重新导入，%d 个等待按需导入",
+             len(loaded_plugins), len(plugin_reload_report), len(pending_plugins()))
     return plugins
 
+def activate_plugin(lazy: LazyPlugin):
+    """第一次匹配到事件时导入带清单的插件，并替换 plugins 中的占位"""
+    with activate_lock:
+        return _activate_plugin(lazy)
+
+def _activate_plugin(lazy: LazyPlugin):
+    for filename, record in plugin_records.items():
+        if record["module"] is lazy:
+            break
+        if record["entry"] == lazy.entry and not isinstance(record["module"], LazyPlugin):
+            return record["module"] # 另一个事件线程刚刚导入了它
+    else:
+        return None
+
+    start = time.perf_counter()
+    module = import_plugin(record["title"], record["name"], lazy.entry)
+    error = None if module is None else check_plugin(module)
+    if module is None or error is not None:
+        if error is not None:
+            failed_plugins.append(f"{record['title']} ({error})")
+            unload_plugin({**record, "module": module})
+        del plugin_records[filename]
+        if lazy in plugins:
+            plugins.remove(lazy)
+        if record["name"] in loaded_plugins:
+            loaded_plugins.remove(record["name"])
+        return None
+
+    record["module"] = module
+    if lazy in plugins:
+        plugins[plugins.index(lazy)] = module
+    print(f"已按需加载插件: {record['title']} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    return module
+
+def pending_plugins() -> set[str]:
+    """带清单但尚未被触发导入的插件"""
+    return {r["name"] for r in plugin_records.values() if isinstance(r["module"], LazyPlugin)}
+
+def runs_in_thread(plugin_module) -> bool:
+    """
+    插件的 on_message 是否放到工作线程中执行。
+    插件可以用 RUN_IN_THREAD = True / False 自行指定；未指定时，若开启了 offload_blocking_plugins
+    且加载时发现协程中有同步网络请求、休眠或子进程调用，则在线程中执行。
+    """
+    explicit = getattr(plugin_module, "RUN_IN_THREAD", None)
+    if explicit is not None:
+        return bool(explicit)
+    return bool(settings.get("offload_blocking_plugins", False)) and is_severe(plugin_warnings.get(plugin_module.__name__, ()))
+
 plugins = load_plugins() #在任何操作执行之前加载插件
+startup.mark("插件")
 
 # 插件运行器 NEXT 3
 async def execute_plugins(isAny: bool, **main_context) -> bool: # 接受 main.py 的上下文，也就是所有的关键字
     has_plugin = False
     user_message = main_context["order"] if "order" in main_context else ""
 
-    for plugin_module in plugins:
+    for plugin_module in list(plugins):
         if (not isAny and f"{reminder}{plugin_module.TRIGGHT_KEYWORD}" in f"{reminder}{user_message}") or (isAny and plugin_module.TRIGGHT_KEYWORD == "Any"): 
+            if isinstance(plugin_module, LazyPlugin):
+                if isAny and not plugin_module.wants(main_context.get("event")):
+                    continue
+                plugin_module = activate_plugin(plugin_module)
+                if plugin_module is None:
+                    continue
             try:
                 # 动态构建参数
                 on_message_params = inspect.signature(plugin_module.on_message).parameters
@@ -279,13 +441,21 @@ async def execute_plugins(isAny: bool, **main_context) -> bool: # 接受 main.py
 如果您是开发者，请在 main.py 中提供此值。如果您是用户，请忽略此消息并通知管理员及时地修复。
 详见 https://github.com/SRInternet-Studio/Jianer_QQ_bot/wiki''')
 
-                response = await plugin_module.on_message(**kwargs)  # 传递 event 和动态参数
+                with tracer.span(plugin_module.__name__, "plugin"):
+                    if runs_in_thread(plugin_module): # 同步调用不再卡住处理事件的循环
+                        response = await plugin_offloader.run(plugin_module.__name__, plugin_module.on_message(**kwargs),
+                                                              settings.get("plugin_timeout", 60))
+                    else:
+                        response = await plugin_module.on_message(**kwargs)  # 传递 event 和动态参数
 
                 if response is not None:
                     if response == True:
                         has_plugin = True
                         break
 
+            except asyncio.TimeoutError:
+                if not isAny:
+                    has_plugin = True # 已由 plugin_offloader 记录
             except Exception as e:
                 print(f"\n插件 {plugin_module.__name__} 执行出错，是因为: \n{traceback.format_exc()}")
                 if not isAny:
@@ -307,10 +477,6 @@ def load_blacklist():
     except FileNotFoundError:
         return set() 
              
-def has_emoji(s: str) -> bool: # emoji +1 功能
-    # 判断找到的 emoji 数量是否为 1 并且字符串的长度大于等于 1
-    return emoji.emoji_count(s) == 1 and len(s) == 1
-
 def timing_message(actions: Listener.Actions):
     while True:
         if not os.path.isfile("timing_message.ini"):
@@ -323,9 +489,9 @@ def timing_message(actions: Listener.Actions):
         send_time = send_time[0].split("⊕")
 
         now = datetime.datetime.now()
-        print(f"Current: {now.hour:02}:{now.minute:02}, target: {send_time}")
+        log.debug("Current: %02d:%02d, target: %s", now.hour, now.minute, send_time[0])
         if f"{now.hour:02}:{now.minute:02}" == send_time[0]:
-            print("send timing messages")
+            log.info("send timing messages")
             asyncio.run(send_msg_all_groups(send_time[1], actions))
 
         time.sleep(60 - now.second)
@@ -347,16 +513,9 @@ async def send_msg_all_groups(text, actions: Listener.Actions):
 def Read_Settings():
     global Super_User, Manage_User
     
-    def load_user_list(filename):
-        if not os.path.exists(filename):
-            with open(filename, 'w'):
-                pass
-            
-        with open(filename, 'r') as f:
-            return list({line.strip() for line in f if line.strip()})
-    
-    Super_User = load_user_list("Super_User.ini")
-    Manage_User = load_user_list("Manage_User.ini")
+    permissions.reload()
+    Super_User = list(permissions.super_list)
+    Manage_User = list(permissions.manage_list)
     print(f'''————————————————
 sys: User_Group loaded.
 Super_User: {Super_User}
@@ -364,47 +523,48 @@ Manage_User: {Manage_User}
 ————————————————''')
 
 def Write_Settings(s: list, m: list) -> bool:
-    s = [item for item in s if item]
-    m = [item for item in m if item]
     global Super_User, Manage_User
-    su = ""
-    for item in range(len(s)):
-        su += s[item]
-        if item != len(s) - 1:
-            su += "\n"
-    ma = ""
-    for item in range(len(m)):
-        ma += m[item]
-        if item != len(m) - 1:
-            ma += "\n"
-
-    try:
-        with open("Super_User.ini", "w") as f:
-            f.write(su)
-            f.close()
-        with open("Manage_User.ini", "w") as f:
-            f.write(ma)
-            f.close()
-
-        Super_User = s
-        Manage_User = m
-
-        return True
-    except:
+    if not permissions.write(s, m):
         return False
 
+    Super_User = list(permissions.super_list)
+    Manage_User = list(permissions.manage_list)
+    return True
+
 @Listener.reg
 @Logic.ErrorHandler().handle_async
+@tracer.traced_event
+@loop_watchdog.watched # 协程中的同步调用卡住事件循环时记录调用栈
 async def handler(event: Events.Event, actions: Listener.Actions) -> None:
     global in_timing, bot_name, bot_name_en, reminder, config, ONE_SLOGAN, CONFUSED_WORD, stop_working, Wait_for_add_in
     global Super_User, Manage_User, ROOT_User
-    ADMINS = Super_User + ROOT_User + Manage_User
-    SUPERS = Super_User + ROOT_User
+    with tracer.span("dedup"):
+        duplicate = event_dedup.is_duplicate(event)
+    if duplicate: # 在任何插件执行之前丢弃重复投递的事件
+        dedup_log.debug("丢弃重复投递的事件 %s %s", type(event).__name__, getattr(event, "message_id", ""))
+        return
+    if settings.refresh(): # config.json 被修改后热重载
+        config = settings.cfg
+        reminder, bot_name, bot_name_en = settings.reminder, settings.bot_name, settings.bot_name_en
+        ONE_SLOGAN, CONFUSED_WORD = settings.slogan, settings.confused_words
+        ROOT_User = settings.root_users
+        permissions.set_root(ROOT_User)
+    if permissions.refresh(): # 仅在 ini 文件被外部修改时重新读取
+        Super_User = list(permissions.super_list)
+        Manage_User = list(permissions.manage_list)
+    ADMINS = permissions.admins
+    SUPERS = permissions.supers
+    system_stats.start() # 后台采样，供 状态 命令使用
+    loop_watchdog.watch_background()
+    system_stats.count_event()
     event.time_str = f"{datetime.datetime.now().hour:02}:{datetime.datetime.now().minute:02}:{datetime.datetime.now().second:02}"
     
+    parsed = ParsedMessage(event, reminder) # 消息文本、指令、@、引用等，第一次使用时才计算，所有插件共享结果
+    message_cache.remember(event)
+
     if stop_working:
-        if ((user_id := getattr(event, "user_id", None)) and (message := getattr(event, "message", None)) 
-            and str(message).startswith(reminder) and str(user_id) in ADMINS):
+        if ((user_id := getattr(event, "user_id", None)) and getattr(event, "message", None)
+            and parsed.is_command and str(user_id) in ADMINS):
             stop_working = False
             if hasattr(event, "group_id"):
                 await actions.send(
@@ -421,6 +581,8 @@ async def handler(event: Events.Event, actions: Listener.Actions) -> None:
         thread = threading.Thread(target=timing_message, args=(actions,))
         thread.start()
         
+    links = parsed.links # 消息中的链接，第一次使用时才扫描，所有插件共享结果
+
     # 执行永久加载插件
     local_vars = globals().copy()
     local_vars.update(locals().copy())
@@ -459,7 +621,7 @@ Welcome! {bot_name} was restarted successfully. Now you can send {reminder}帮
     - 随时抛出各种脑洞问题  
     - 分享有趣的生活片段  
 有什么想问的在问题前面加上{reminder}就可以啦！@我还可以查看更多帮助哦୧꒰•̀ᴗ•́꒱୨'''
-        await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Image(f"http://q2.qlogo.cn/headimg_dl?dst_uin={user}&spec=640"), Segments.Text("欢迎"), Segments.At(user), Segments.Text(welcome)))
+        await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Image(await image_cache.segment_file(avatar_url(user))), Segments.Text("欢迎"), Segments.At(user), Segments.Text(welcome)))
         if event.group_id == 310444809:
             await actions.send(group_id=event.group_id,message=Manager.Message(Segments.Text("6块")))
             await actions.send(group_id=event.group_id,message=Manager.Message(Segments.Video("https://www.mcxclr.top/f/rboCo/Welcome.mp4")))
@@ -494,7 +656,7 @@ Welcome! {bot_name} was restarted successfully. Now you can send {reminder}帮
     - 随时抛出各种脑洞问题  
     - 分享有趣的生活片段  
 有什么想问的在问题前面加上{reminder}就可以啦！@我还可以查看更多帮助哦୧꒰•̀ᴗ•́꒱୨'''  
-                await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Image(f"http://q2.qlogo.cn/headimg_dl?dst_uin={user}&spec=640"), Segments.Text(welcome)))
+                await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Image(await image_cache.segment_file(avatar_url(user))), Segments.Text(welcome)))
                 if event.group_id == 310444809:
                     await actions.send(group_id=event.group_id,message=Manager.Message(Segments.Text("6块")))
                     await actions.send(group_id=event.group_id,message=Manager.Message(Segments.Video(f"https://www.mcxclr.top/f/rboCo/Welcome.mp4")))
@@ -518,21 +680,23 @@ Welcome! {bot_name} was restarted successfully. Now you can send {reminder}帮
         global CONFIG_FILE, PRESET_DIR, NORMAL_PRESET
         global model, cmc, emoji_plus_one_off
 
-        s, event_user = await get_user_info(event.user_id, Manager, actions)
+        with tracer.span("profile"):
+            s, event_user = await get_user_info(event.user_id, Manager, actions)
         if s:
             event_user = event_user['nickname']
         else:
             event_user = str(event.user_id)
                     
         # 初始化预设
-        sys_prompt = presets_tool.gen_presets(event.user_id, bot_name, event_user)
-        presets = presets_tool.read_presets()
+        with tracer.span("preset"):
+            sys_prompt = presets_tool.gen_presets(event.user_id, bot_name, event_user)
+            presets = presets_tool.read_presets()
         
         if len(event.message) <= 0:
             return  # 只在函数中有效
         
-        user_message = str(event.message)
-        order = ""
+        user_message = parsed.text
+        order = parsed.order
 
         if "ping" == user_message:
             print(str(event.user_id))
@@ -547,18 +711,17 @@ Welcome! {bot_name} was restarted successfully. Now you can send {reminder}帮
                 print("不接受夸赞")        
 
         global emoji_send_count
-        if has_emoji(user_message) and not emoji_plus_one_off:
+        if parsed.single_emoji and not emoji_plus_one_off:
             if emoji_send_count is None or datetime.datetime.now() - emoji_send_count > datetime.timedelta(seconds=15):
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(user_message)))
                 emoji_send_count = datetime.datetime.now()
             else:
                 print(f"emoji +1 延迟 {abs(datetime.datetime.now() - emoji_send_count)} s")
         
-        if user_message.startswith(reminder):
-            order_i = user_message.find(reminder)
-            if order_i != -1:
-                order = user_message[order_i + len(reminder):].strip()
-                print(f"({event_user}) ORDER: {repr(order)}")
+        if parsed.is_command:
+            log.info("(%s) ORDER: %r", event_user, order)
+
+        tracer.start(f"command:{(order or user_message)[:16]}", "command", text=user_message[:200])
 
         if f"{reminder}重启" == user_message:
             if str(event.user_id) in ADMINS:
@@ -581,10 +744,14 @@ Welcome! {bot_name} was restarted successfully. Now you can send {reminder}帮
             if str(event.user_id) in ADMINS:
                 global plugins
                 plugins = load_plugins()
+                reloaded = "\n".join(f"    {name}: {cost * 1000:.1f} ms" for name, cost in plugin_reload_report) or "    无（所有插件均未变化）"
 
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(f'''{bot_name} {bot_name_en} - {ONE_SLOGAN}
 ————————————————————
-外部后端已重载已完成。发送 {reminder}插件视角 以查看更多信息。''')))
+外部后端已重载已完成。
+重新导入的插件:
+{reloaded}
+发送 {reminder}插件视角 以查看更多信息。''')))
                 
             else:
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(CONFUSED_WORD.format(bot_name=bot_name))))
@@ -756,10 +923,7 @@ Welcome! {bot_name} was restarted successfully. Now you can send {reminder}帮
         elif "删除管理 " in order:
             r = ""
             r_admin = ""
-            Toset = ""
-            for i in event.message:
-                if isinstance(i, Segments.At):
-                    Toset = str(i.qq)
+            Toset = parsed.at[-1] if parsed.at else ""
                     
             if str(event.user_id) in SUPERS:
                 Toset = order[order.find("删除管理 ") + len("删除管理 "):].strip() if Toset == "" else Toset
@@ -798,10 +962,7 @@ Welcome! {bot_name} was restarted successfully. Now you can send {reminder}帮
         elif "管理 " in order:
             r = ""
             r_admin = ""
-            Toset = ""
-            for i in event.message:
-                if isinstance(i, Segments.At):
-                    Toset = str(i.qq)
+            Toset = parsed.at[-1] if parsed.at else ""
                     
             if str(event.user_id) in SUPERS:
                 if "管理 M " in order:
@@ -935,10 +1096,11 @@ If you are a Super_User or ROOT_User, you can manage these users. Use {reminder}
             await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Reply(event.message_id), Segments.Text(r)))
 
         elif "插件视角" in order:
+            pending = pending_plugins()
             status = f'''{bot_name} {bot_name_en} - 插件视角
 ————————————————————
 ✅ 已加载插件 ({len(loaded_plugins)}):
-{chr(10).join(f"{i+1}. {str(plugin).rsplit('_', 1)[0]}" for i, plugin in enumerate(loaded_plugins)) if loaded_plugins else "无"}
+{chr(10).join(f"{i+1}. {str(plugin).rsplit('_', 1)[0]}{'（按需导入，尚未触发）' if plugin in pending else ''}" for i, plugin in enumerate(loaded_plugins)) if loaded_plugins else "无"}
 
 ❌ 已禁用插件 ({len(disabled_plugins)}):
 {chr(10).join(
@@ -949,6 +1111,14 @@ If you are a Super_User or ROOT_User, you can manage these users. Use {reminder}
 {chr(10).join(f"{i+1}. {str(plugin)}" 
     for i, plugin in enumerate(failed_plugins)) 
 if failed_plugins else "无"}'''
+            blocking = {name: calls for name, calls in plugin_warnings.items() if is_severe(calls)}
+            if blocking:
+                status += f"\n\n🐢 协程中的阻塞调用 ({len(blocking)}):"
+                for i, (name, calls) in enumerate(blocking.items()):
+                    module = next((p for p in plugins if p.__name__ == name), None)
+                    thread = "（在线程中执行）" if module is not None and runs_in_thread(module) else ""
+                    status += f"\n{i+1}. {name.rsplit('_', 1)[0]}{thread}"
+                    status += "".join(f"\n   {describe(call)}" for call in calls if call.kind != "file")
 
             await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(status)))
 
@@ -999,8 +1169,7 @@ if failed_plugins else "无"}'''
                 
             await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(content)))
 
-        elif (isinstance(event.message[0], Segments.At) and 
-              int(event.message[0].qq) == event.self_id): 
+        elif parsed.at_self: 
 
             if (all(isinstance(item, (Segments.At, Segments.Text)) for item in event.message) and 
                 [str(s) for s in event.message if isinstance(s, Segments.Text) and not str(s).strip()]):
@@ -1180,6 +1349,22 @@ if failed_plugins else "无"}'''
             else:
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(CONFUSED_WORD.format(bot_name=bot_name))))
 
+        elif "链路追踪" in order:
+            if str(event.user_id) in ADMINS:
+                if "开启" in order:
+                    tracer.enabled = True
+                    r = "已开启链路追踪，之后的每个事件都会被记录"
+                elif "关闭" in order:
+                    tracer.enabled = False
+                    r = "已关闭链路追踪"
+                elif "导出" in order:
+                    r = f"已导出 {len(tracer.spans)} 条记录到 {os.path.abspath(tracer.export())}，可以在 https://ui.perfetto.dev 中打开"
+                else:
+                    r = f"链路追踪：{'开启' if tracer.enabled else '关闭'}，已记录 {len(tracer.spans)} 条\n用法：{reminder}链路追踪 开启 / 关闭 / 导出"
+                await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(r)))
+            else:
+                await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(CONFUSED_WORD.format(bot_name=bot_name))))
+
         elif f"{reminder}状态" in user_message:
             if str(event.user_id) in ADMINS:
                 system_info = get_system_info()
@@ -1193,6 +1378,37 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
 内存占用：{str(system_info["memory_usage_percentage"]) + "%"}'''
                 for i, usage in enumerate(system_info["gpu_usage"]):
                     feel = feel + f"\nGPU {i} Usage：{usage * 100:.2f}%"
+                if (latest := system_stats.latest()) is not None:
+                    feel += f"\n事件循环延迟：{latest.lag_ms:.1f} ms\n事件吞吐：{latest.events_per_s:.2f} 条/秒\n活动线程：{latest.threads}"
+                    feel += f"\n队列：图像工作池 {latest.image_pending}，线程中的插件 {latest.offloaded}，后台任务 {latest.background_tasks}"
+                feel += f"\n{loop_watchdog.report()}"
+                offloaded = plugin_offloader.metrics()
+                if offloaded["completed"] or offloaded["running"]:
+                    feel += f"\n线程中执行的插件：{offloaded['completed']} 次，超时 {offloaded['timeouts']} 次，进行中 {offloaded['running']}"
+                dedup = event_dedup.metrics()
+                feel += f"\n重复事件：已丢弃 {dedup['hits']} / 检查 {dedup['checked']}"
+                pool = image_pool.metrics()
+                feel += f"\n图像工作池：完成 {pool['completed']} / 失败 {pool['failed']} / 拒绝 {pool['rejected']}，排队 {pool['pending']}，平均 {pool['avg_ms']:.0f} ms"
+                cache = image_cache.metrics()
+                feel += f"\n图片缓存：命中 {cache['hits']} / 重新验证 {cache['revalidated']} / 下载 {cache['downloads']}，磁盘 {cache['disk_bytes'] / 1048576:.1f} MB"
+                cached = message_cache.metrics()
+                feel += f"\n消息缓存：命中 {cached['hits']} / 请求 {cached['misses']}，{cached['size']} 条"
+                arena = temp_arena.metrics()
+                feel += f"\n临时文件：{arena['files']} 个（使用中 {arena['pinned']}），{arena['bytes'] / 1048576:.1f} MB，已淘汰 {arena['evicted']}"
+                for minutes in (1, 5, 15):
+                    if (stats := system_stats.summary(minutes)) is None:
+                        break
+                    feel += f'''
+————————————————————
+最近 {minutes} 分钟（最低 / 平均 / 最高）
+CPU：{stats["cpu"][0]:.1f} / {stats["cpu"][1]:.1f} / {stats["cpu"][2]:.1f} %
+内存：{stats["memory"][0]:.1f} / {stats["memory"][1]:.1f} / {stats["memory"][2]:.1f} %
+延迟：{stats["lag_ms"][0]:.1f} / {stats["lag_ms"][1]:.1f} / {stats["lag_ms"][2]:.1f} ms
+吞吐：{stats["events_per_s"][0]:.2f} / {stats["events_per_s"][1]:.2f} / {stats["events_per_s"][2]:.2f} 条/秒
+线程：{stats["threads"][0]} / {stats["threads"][1]:.1f} / {stats["threads"][2]}
+图像排队：{stats["image_pending"][0]} / {stats["image_pending"][1]:.1f} / {stats["image_pending"][2]}
+线程插件：{stats["offloaded"][0]} / {stats["offloaded"][1]:.1f} / {stats["offloaded"][2]}
+后台任务：{stats["background_tasks"][0]} / {stats["background_tasks"][1]:.1f} / {stats["background_tasks"][2]}'''
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(feel)))
             else:
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(CONFUSED_WORD.format(bot_name=bot_name))))
@@ -1342,11 +1558,10 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
           
         elif "送飞机票" in order:
           if str(event.user_id) in ADMINS:
-                for i in event.message:
-                    if isinstance(i, Segments.At):
-                        await actions.set_group_kick(group_id=event.group_id,user_id=i.qq)
-                        r_admin = f'''用户 {await get_user_nickname(event.user_id, Manager, actions)} 在 {event.time_str} 使 {await get_user_nickname(i.qq, Manager, actions)} 退出了群聊：{event.group_id}'''
-                        await actions.send(user_id=ROOT_User[0], message=Manager.Message(Segments.Text(r_admin))) #管理员操作通知ROOT用户
+                for qq in parsed.at:
+                    await actions.set_group_kick(group_id=event.group_id,user_id=qq)
+                    r_admin = f'''用户 {await get_user_nickname(event.user_id, Manager, actions)} 在 {event.time_str} 使 {await get_user_nickname(qq, Manager, actions)} 退出了群聊：{event.group_id}'''
+                    await actions.send(user_id=ROOT_User[0], message=Manager.Message(Segments.Text(r_admin))) #管理员操作通知ROOT用户
           else:
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(CONFUSED_WORD.format(bot_name=bot_name))))  
         
@@ -1361,9 +1576,9 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Text(CONFUSED_WORD.format(bot_name=bot_name))))
         elif "撤回" == user_message:
             if str(event.user_id) in ADMINS:
-              if isinstance(event.message[0], Segments.Reply):
+              if parsed.reply is not None:
                 try:
-                  await actions.del_message(event.message[0].id)
+                  await actions.del_message(parsed.reply.id)
                 except:
                     pass
             else:
@@ -1508,8 +1723,8 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
             async def process_reply_message():
                 # 优先处理引用消息
                 nonlocal msg
-                if isinstance(event.message[0], Segments.Reply):
-                    content = await actions.get_msg(event.message[0].id)
+                if parsed.reply is not None:
+                    content = await message_cache.get(actions, parsed.reply.id)
                     message = gen_message({"message": content.data["message"]})
                     for i in message:
                         if isinstance(i, Segments.Text):
@@ -1518,8 +1733,8 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
             async def build_message_content():
                 new = []
                 # 处理引用消息中的内容
-                if isinstance(event.message[0], Segments.Reply):
-                    content = await actions.get_msg(event.message[0].id)
+                if parsed.reply is not None:
+                    content = await message_cache.get(actions, parsed.reply.id)
                     message = gen_message({"message": content.data["message"]})
                     for i in message:
                         handle_content_item(i, new)
@@ -1540,12 +1755,23 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
 
             async def handle_message_stream(response_stream, is_openai=True):
                 nonlocal result, sended, enable_forward_msg_num
-                for partial, r_type in response_stream:
+                response_stream = iter(response_stream)
+                backend_span = tracer.start(f"backend:{EnableNetwork}", "backend")
+                while True:
+                    # 后端是同步生成器，放到线程中迭代，等待期间事件循环仍可发送消息和合成语音
+                    item = await asyncio.to_thread(next, response_stream, None)
+                    if item is None:
+                        break
+                    if not sended and not result:
+                        tracer.instant("first_segment")
+                    partial, r_type = item
                     if is_openai:
                         if r_type != 'message':
                             user_lists = partial
                             continue
 
+                    if tts is not None:
+                        tts.feed(str(partial))
                     message = Segments.Text(str(partial))
                     if enable_forward_msg_num:
                         messages_for_node.append(message)
@@ -1573,6 +1799,8 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
 
                     sended = True
                     result += str(partial) + '\n'
+                if backend_span is not None:
+                    backend_span.end()
 
             async def finalize_messages():
                 if enable_forward_msg_num:
@@ -1594,9 +1822,18 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
                             message=Manager.Message(*messages_for_node)
                         )
 
+            tts = None
+            if gptsovitsoff == False:
+                """EdgeTTS 语音回复，与文本生成同时进行"""
+                TTSettings = config.others.get("TTS") or {}
+                if not TTSettings:
+                    print("EdgeTTS 配置文件不完整，或未配置，使用默认音色。")
+                tts = TTSPipeline(dict(TTSettings))
+
             try:
                 match EnableNetwork:
                     case "Pixmap":
+                        load_gemini()
                         new = await build_message_content()
                         model = genai.GenerativeModel(
                             model_name="gemini-2.0-flash-thinking-exp-01-21",
@@ -1638,25 +1875,13 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
                         message=Manager.Message(Segments.Reply(event.message_id), Segments.Text(result))
                     )
                     
-                if gptsovitsoff == False:
-                    """EdgeTTS 语音回复"""
-                    TTSettings: dict = {}
-                    if config.others["TTS"]:
-                        if isinstance(config.others["TTS"], dict):             
-                            TTSettings = config.others["TTS"]
-                        else:             
-                            TTSettings = dict(config.others["TTS"])
-                    
-                    communicate_completed: bool = False
-                    if TTSettings != {}:
-                        communicate_completed = await amain(result, TTSettings["voiceColor"], TTSettings["rate"], TTSettings["volume"], TTSettings["pitch"])
-                    else:
-                        print("EdgeTTS 配置文件不完整，或未配置，使用默认音色。")
-                        communicate_completed = await amain(result, "zh-CN-XiaoyiNeural", "+0%", "+0%", "+0Hz")
-
-                    if communicate_completed and os.path.isfile(communicate_completed):
-                        await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Record(os.path.abspath(communicate_completed))))
-                        os.remove(communicate_completed)
+                if tts is not None:
+                    if not tts.fed:
+                        tts.feed(result)
+                    with tracer.span("tts"):
+                        audio = await tts.finish()
+                    if audio:
+                        await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Record(TTSPipeline.to_segment_file(audio))))
 
             except UnboundLocalError:
                 raise
@@ -1664,6 +1889,8 @@ CPU占用：{str(system_info["cpu_usage"]) + "%"}
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Reply(event.message_id),Segments.Text(f"哎呀，你问的问题太复杂了，{bot_name}想不出来了 ┭┮﹏┭┮")))
             except Exception as e:
                 print(traceback.format_exc())
+                if tts is not None:
+                    tts.cancel()
                 await actions.send(group_id=event.group_id, message=Manager.Message(Segments.Reply(event.message_id),Segments.Text(f"{type(e)}\n{url}\n{bot_name}发生错误，不能回复你的消息了，请稍候再试吧 ε(┬┬﹏┬┬)3")))
       
 def help_message() -> str:
@@ -1679,4 +1906,6 @@ def help_message() -> str:
        {reminder}角色扮演 —> {bot_name}切换不同的角色互动噢！~
 快来聊天吧(*≧︶≦)'''
 
+startup.mark("其余初始化")
+startup.finish()
 Listener.run()
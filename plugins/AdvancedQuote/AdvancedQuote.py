@@ -1,10 +1,10 @@
-import os
 from Hyper import Segments
 from Hyper.Events import *
 from Tools.site_catch import Catcher
+from Tools.temp_arena import to_segment_file
 
 # 生成图像的主要函数
-async def get_image(quote, ava_url, name, uin):
+async def get_image(quote, ava_url, name, uin) -> bytes:
     catcher = await Catcher.init()
     with open("./assets/quote.html", "r", encoding="utf-8") as f:
         html = f.read()
@@ -13,22 +13,21 @@ async def get_image(quote, ava_url, name, uin):
     html = html.replace("{quote}", quote)
     html = html.replace("{name}", name)
 
-    with open(f"./temps/quote_{uin}.html", "w", encoding="utf-8") as f:
-        f.write(html)
-    # res = await html2img(f"file://{os.path.abspath(f'./temps/quote_{uin}.html')}")
-    res = await catcher.catch(f"file://{os.path.abspath(f'./temps/quote_{uin}.html')}", (1280, 640))
-    os.remove(f"./temps/quote_{uin}.html")
-    await catcher.quit()
-    return res
+    # 直接渲染 HTML 字符串，截图保留在内存中
+    try:
+        return await catcher.render(html, (1280, 640))
+    finally:
+        await catcher.quit()
 
 # 处理消息的函数
-async def handle(message, actions, images=None) -> Segments.Image:
+async def handle(message, actions, images=None, message_cache=None) -> Segments.Image:
     if isinstance(message[0], Segments.Reply):
         msg_id = message[0].id
     else:
         return
 
-    content = await actions.get_msg(msg_id)
+    # 插件入口已经取过一次，有 message_cache 时这里直接命中缓存
+    content = await message_cache.get(actions, msg_id) if message_cache is not None else await actions.get_msg(msg_id)
     name = content.data["sender"]["nickname"] if not content.data["sender"].get("card") else \
         content.data["sender"]["card"]
     uin = content.data["sender"]["user_id"]
@@ -37,8 +36,8 @@ async def handle(message, actions, images=None) -> Segments.Image:
     text = str(message).replace("[图片]", "")
     if images is not None:
         print("有图")
-        await get_image(text, images, name, uin)  # 传递 uin 参数
+        png = await get_image(text, images, name, uin)  # 传递 uin 参数
     else:
-        await get_image(text, f"http://q2.qlogo.cn/headimg_dl?dst_uin={uin}&spec=640", name, uin)  # 传递 uin 参数
+        png = await get_image(text, f"http://q2.qlogo.cn/headimg_dl?dst_uin={uin}&spec=640", name, uin)  # 传递 uin 参数
 
-    return Segments.Image(f"file://{os.path.abspath('./temps/web_.png')}")
\ No newline at end of file
+    return Segments.Image(to_segment_file(png))
\ No newline at end of file
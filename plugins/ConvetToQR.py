@@ -1,8 +1,6 @@
 import aiohttp
 from Hyper import Configurator
 
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
-
 TRIGGHT_KEYWORD = "转码 "
 HELP_MESSAGE = f"{Configurator.cm.get_cfg().others['reminder']}转码 url/文本 —> 生成二维码图片"
 
@@ -12,9 +10,9 @@ HEADERS = {
 
 API_URL = "https://v2.xxapi.cn/api/qrcode"
 
-async def on_message(event, actions, Manager, Segments):
+async def on_message(event, actions, Manager, Segments, settings):
     msg = str(event.message).strip()
-    reminder = Configurator.cm.get_cfg().others["reminder"]
+    reminder = settings.reminder
     prefix = f"{reminder}{TRIGGHT_KEYWORD}"
     if not msg.startswith(prefix):
         return
@@ -3,9 +3,6 @@ from Hyper import Configurator as _C
 import time
 import os
 
-# 预编译正则表达式
-_DOUYIN_PATTERN = _r.compile(r'(https?://v\.douyin\.com/[^\s]+)')
-
 # 全局HTTP客户端（复用连接）
 _client = _h.AsyncClient(timeout=10.0)
 
@@ -44,16 +41,8 @@ def _save_whitelist():
 # 初始化时加载白名单
 _load_whitelist()
 
-async def _perm(e):
-    u = str(e.user_id)
-    try:
-        return (
-            u in _C.cm.get_cfg().others["ROOT_User"]
-            or u in open("./Super_User.ini", "r").read().splitlines()
-            or u in open("./Manage_User.ini", "r").read().splitlines()
-        )
-    except Exception:
-        return False
+async def _perm(e, permissions):
+    return permissions.is_admin(e.user_id)
 
 async def _fetch_douyin_data(api_url, retries=3):
     """获取抖音数据，带有重试机制"""
@@ -75,14 +64,14 @@ async def _fetch_douyin_data(api_url, retries=3):
     # 所有尝试都失败
     return None
 
-async def on_message(event, actions, Manager, Segments):
+async def on_message(event, actions, Manager, Segments, permissions, settings, links):
     if not hasattr(event, "message"):
         return False
         
-    m = str(event.message).strip()
+    m = links.text
     
     # 缓存配置减少重复获取
-    cfg = _C.cm.get_cfg().others
+    cfg = settings.others
     r = cfg.get('reminder', '')
     
     # 自动获取主人信息（从配置读取）
@@ -116,7 +105,7 @@ async def on_message(event, actions, Manager, Segments):
     
     # 处理白名单命令
     if m == f"{r}本群解析加白":
-        if not await _perm(event):
+        if not await _perm(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -139,7 +128,7 @@ async def on_message(event, actions, Manager, Segments):
         return True
        
     elif m == f"{r}本群解析删白":
-        if not await _perm(event):
+        if not await _perm(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -163,7 +152,7 @@ async def on_message(event, actions, Manager, Segments):
   
     # 处理插件更新命令
     if m == f"{r}更新抖音解析插件":
-        if not await _perm(event):
+        if not await _perm(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -194,9 +183,9 @@ async def on_message(event, actions, Manager, Segments):
         return True
 
     # 检查当前群是否在白名单中 - 发送提示消息
+    douyin_links = links.of("douyin")  # 链接已由 handler 统一识别
     if str(event.group_id) in _whitelist:
-        mat = _DOUYIN_PATTERN.search(m)
-        if mat:
+        if douyin_links:
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text(
@@ -207,11 +196,10 @@ async def on_message(event, actions, Manager, Segments):
         return False
 
     # 正常解析流程
-    mat = _DOUYIN_PATTERN.search(m)
-    if not mat:
+    if not douyin_links:
         return False
         
-    d_url = mat.group(1)
+    d_url = douyin_links[0].value
     api_url = _API.format(d_url)
     
     try:
@@ -349,4 +337,8 @@ async def on_message(event, actions, Manager, Segments):
         
     return True
 
+async def teardown():
+    """重载插件时关闭全局HTTP客户端"""
+    await _client.aclose()
+
 print("[Xiaoyi_QQ]抖音解析插件已加载")
\ No newline at end of file
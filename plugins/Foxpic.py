@@ -1,6 +1,5 @@
 import aiohttp
 from Hyper import Configurator
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
 
 TRIGGHT_KEYWORD = "狐狸图"
 HELP_MESSAGE = f"{Configurator.cm.get_cfg().others['reminder']}狐狸图 —> 随机拉一张狐狸图"
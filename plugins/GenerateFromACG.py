@@ -1,6 +1,5 @@
 import requests
 from Hyper import Configurator
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
 
 reminder = Configurator.cm.get_cfg().others["reminder"]
 bot_name = Configurator.cm.get_cfg().others["bot_name"]
@@ -1,5 +1,4 @@
 from Hyper import Configurator
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
 import aiohttp, os, asyncio
 from Tools.capture_screenshot import capture_screenshot
 
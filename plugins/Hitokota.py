@@ -1,6 +1,5 @@
 import httpx
 from Hyper import Configurator
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
 
 TRIGGHT_KEYWORD = "一言"
 HELP_MESSAGE = f"{Configurator.cm.get_cfg().others["reminder"]}一言 —> 找一句好听的名言👍"
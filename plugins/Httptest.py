@@ -5,7 +5,6 @@ from Hyper import Configurator
 
 # 从配置中获取提醒前缀
 try:
-    Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
     reminder = Configurator.cm.get_cfg().others["reminder"]
 except:
     reminder = "-"  # 默认值，如果无法读取配置
@@ -1,12 +1,7 @@
-import re
 import aiohttp
 import asyncio
 import os
 import requests
-from Hyper import Configurator
-
-# 预编译正则表达式
-_KUAISHOU_PATTERN = re.compile(r'(https?://v\.kuaishou\.com/[^\s]+|https?://www\.kuaishou\.com/[^\s]+)')
 
 TRIGGHT_KEYWORD = "Any"
 
@@ -32,16 +27,8 @@ def _save_whitelist():
 # 初始化时加载白名单
 _load_whitelist()
 
-async def _perm(e):
-    u = str(e.user_id)
-    try:
-        return (
-            u in Configurator.cm.get_cfg().others["ROOT_User"]
-            or u in open("./Super_User.ini", "r").read().splitlines()
-            or u in open("./Manage_User.ini", "r").read().splitlines()
-        )
-    except Exception:
-        return False
+async def _perm(e, permissions):
+    return permissions.is_admin(e.user_id)
 
 def _fetch_kuaishou_data_sync(api_url, retries=3):
     """同步方式获取快手数据，带有重试机制"""
@@ -83,14 +70,14 @@ async def _fetch_kuaishou_data_async(api_url, retries=3):
                 raise e
     return None
 
-async def on_message(event, actions, Manager, Segments, Events):
+async def on_message(event, actions, Manager, Segments, Events, permissions, settings, links):
     if not hasattr(event, "message"):
         return False
         
-    m = str(event.message).strip()
+    m = links.text
     
     # 缓存配置减少重复获取
-    cfg = Configurator.cm.get_cfg().others
+    cfg = settings.others
     r = cfg.get('reminder', '')
     
     # 自动获取主人信息（从配置读取）
@@ -124,7 +111,7 @@ async def on_message(event, actions, Manager, Segments, Events):
     
     # 处理白名单命令
     if m == f"{r}本群解析加白":
-        if not await _perm(event):
+        if not await _perm(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -147,7 +134,7 @@ async def on_message(event, actions, Manager, Segments, Events):
         return True
        
     elif m == f"{r}本群解析删白":
-        if not await _perm(event):
+        if not await _perm(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -171,7 +158,7 @@ async def on_message(event, actions, Manager, Segments, Events):
   
     # 处理插件更新命令
     if m == f"{r}更新快手解析插件":
-        if not await _perm(event):
+        if not await _perm(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -204,9 +191,9 @@ async def on_message(event, actions, Manager, Segments, Events):
         return True
 
     # 检查当前群是否在白名单中 - 发送提示消息
+    kuaishou_links = links.of("kuaishou")  # 链接已由 handler 统一识别
     if str(event.group_id) in _whitelist:
-        mat = _KUAISHOU_PATTERN.search(m)
-        if mat:
+        if kuaishou_links:
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text(
@@ -217,11 +204,10 @@ async def on_message(event, actions, Manager, Segments, Events):
         return False
 
     # 正常解析流程
-    mat = _KUAISHOU_PATTERN.search(m)
-    if not mat:
+    if not kuaishou_links:
         return False
         
-    k_url = mat.group(1)
+    k_url = kuaishou_links[0].value
     api_url = f"http://api.corexwear.com/ks/ks.php?url={k_url}"
     
     try:
@@ -1,4 +1,3 @@
-from Hyper import Configurator 
 import asyncio 
 import json 
 import os 
@@ -6,9 +5,6 @@ import random
 from datetime import datetime 
 from Hyper import Manager, Segments 
   
- # 加载配置 
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file()) 
-  
  # 插件信息 
 HELP_MESSAGE = "发送【超我】或【超市我】可以给你的QQ名片点赞10次" 
 TRIGGHT_KEYWORD = "Any"   
@@ -76,13 +72,13 @@ class SuperManager:
   
 super_manager = SuperManager() 
   
-async def on_message(event, actions, Manager, Segments): 
+async def on_message(event, actions, Manager, Segments, settings, parsed): 
     if not hasattr(event, "message") or not hasattr(event, "user_id"): 
         return False 
       
-    msg = str(event.message).strip() 
-    reminder = Configurator.cm.get_cfg().others["reminder"] 
-    bot_name = Configurator.cm.get_cfg().others["bot_name"] 
+    msg = parsed.stripped 
+    reminder = settings.reminder 
+    bot_name = settings.bot_name 
       
      # 精确匹配"超我"或"超湿我"触发词 
     if msg in ["超我", "超死我", "超市我","赞我"]: 
@@ -2,7 +2,6 @@ import re
 import aiohttp
 from Hyper import Configurator
 
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
 REMINDER = Configurator.cm.get_cfg().others["reminder"]
 
 # 插件配置
@@ -15,8 +14,8 @@ IP = re.compile(r"\b(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.(?:25[0-5]|2[0-4][
 
 EXPECTED_KEYWORDS = ["mc状态", "MC状态", "Mc状态", "我的世界状态", "minecraft状态", "java状态", "jv状态", "mcs"]
 
-async def on_message(event, actions, Manager, Segments):
-    user_msg = str(event.message).strip()
+async def on_message(event, actions, Manager, Segments, parsed):
+    user_msg = parsed.stripped
 
     if not user_msg.startswith(REMINDER):
         return
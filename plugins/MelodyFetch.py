@@ -3,13 +3,140 @@ import aiohttp
 import asyncio
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
 from urllib.parse import quote
 from functools import wraps
+from Tools.temp_arena import get_temp_arena
+from Tools.background import background
 
 TRIGGHT_KEYWORD = "点歌"
 HELP_MESSAGE = f"#点歌 [歌名] —> 搜索网易云音乐歌曲\n#点歌 [ID] —> 根据ID获取歌曲"
 MAX_RETRIES = 3  # 最大重试次数
 RETRY_DELAY = 1  # 重试延迟(秒)
+MAX_MUSIC_BYTES = 10 * 1024 * 1024  # 能发送的音乐文件大小上限
+CHUNK_SIZE = 256 * 1024  # 下载分块大小
+
+class MusicTooLarge(Exception):
+    """音乐文件超过 MAX_MUSIC_BYTES，不重试"""
+
+class SongCache:
+    """
+    按歌曲 ID 缓存音乐文件的磁盘 LRU。
+
+    同一首歌在各个群里被反复点播时只需下载一次；超过 ttl 的文件视为过期重新下载
+    （下载链接和音源可能变化），总大小超过 max_bytes 时淘汰最久未使用的文件。
+
+    get() 在各个事件线程中调用，put() 在后台循环中调用，entries、size 与 pins 只在持有锁时
+    修改。后台循环同时服务其他任务，put() 的文件移动、删除都交给 asyncio.to_thread。以 pin=True 取得的文件在 unpin() 之前不会被淘汰或因过期删除，发送期间不会消失。
+    """
+
+    def __init__(self, path: str = "./temps/music_cache", max_bytes: int = 256 * 1024 * 1024, ttl: float = 24 * 3600):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.entries: OrderedDict[str, int] = OrderedDict()  # 文件名 -> 文件大小，按最近使用排序
+        self.pins: dict[str, int] = {}  # 文件名 -> 正在发送该文件的次数
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+        files = []
+        for name in os.listdir(self.path):
+            stat = os.stat(os.path.join(self.path, name))
+            files.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+            self.size += size
+
+    @staticmethod
+    def key(song_id) -> str:
+        return f"{song_id}.mp3"
+
+    def get(self, song_id, pin: bool = False) -> str | None:
+        """返回缓存文件的路径，不存在或已过期时返回 None；pin 为 True 时须在发送完成后调用 unpin()"""
+        name = self.key(song_id)
+        file = os.path.join(self.path, name)
+        with self._lock:
+            if name not in self.entries:
+                return None
+            try:
+                mtime = os.path.getmtime(file)
+            except OSError:
+                self.size -= self.entries.pop(name, 0)
+                return None
+            expired = time.time() - mtime > self.ttl and not self.pins.get(name)
+            if expired:
+                self.size -= self.entries.pop(name, 0)
+            else:
+                self.entries.move_to_end(name)
+                if pin:
+                    self.pins[name] = self.pins.get(name, 0) + 1
+        if expired:
+            self._delete([name])
+            return None
+        try:
+            # 只更新访问时间，修改时间仍记录下载时间用于判断过期
+            os.utime(file, (time.time(), mtime))
+        except OSError:
+            pass
+        return file
+
+    def unpin(self, file: str) -> None:
+        name = os.path.basename(file)
+        with self._lock:
+            count = self.pins.get(name, 0) - 1
+            if count > 0:
+                self.pins[name] = count
+            else:
+                self.pins.pop(name, None)
+
+    async def put(self, song_id, temp_file: str) -> str:
+        """把下载好的临时文件移入缓存，返回缓存文件的路径"""
+        name = self.key(song_id)
+        file = os.path.join(self.path, name)
+        size = await asyncio.to_thread(self._move, temp_file, file)
+        evicted = []
+        with self._lock:
+            self.size -= self.entries.pop(name, 0)
+            self.entries[name] = size
+            self.size += size
+
+            # 从最久未使用的开始淘汰，跳过刚放入的文件和正在发送的文件
+            for old in list(self.entries):
+                if self.size <= self.max_bytes:
+                    break
+                if old != name and not self.pins.get(old):
+                    self.size -= self.entries.pop(old)
+                    evicted.append(old)
+        if evicted:
+            await asyncio.to_thread(self._delete, evicted)
+        return file
+
+    @staticmethod
+    def _move(temp_file: str, file: str) -> int:
+        os.replace(temp_file, file)
+        return os.path.getsize(file)
+
+    def _delete(self, names: list[str]) -> None:
+        # 在锁外删除文件
+        for name in names:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+_song_cache: SongCache | None = None
+_song_cache_lock = threading.Lock()
+
+def get_song_cache() -> SongCache:
+    global _song_cache
+    if _song_cache is None:
+        with _song_cache_lock:
+            if _song_cache is None:
+                _song_cache = SongCache()
+    return _song_cache
 
 def retry_async_request(max_retries=MAX_RETRIES, delay=RETRY_DELAY):
     """异步请求重试装饰器"""
@@ -20,6 +147,8 @@ def retry_async_request(max_retries=MAX_RETRIES, delay=RETRY_DELAY):
             for attempt in range(max_retries):
                 try:
                     return await func(*args, **kwargs)
+                except MusicTooLarge:
+                    raise  # 文件过大，重试也没有用
                 except Exception as e:
                     last_exception = e
                     if attempt < max_retries - 1:
@@ -169,8 +298,8 @@ async def get_song_by_id(song_id, event, actions, Manager, Segments):
                 message=Manager.Message(Segments.Text(f"找到啦！这是宝宝要听的歌哦～(ノ◕ヮ◕)ノ*:･ﾟ✧\n\n{song_info}"))
             )
             
-            # 检查文件大小，超过70MB不发送音乐文件
-            if size_mb > 70:
+            # 接口给出的大小已经超限时不必再下载
+            if size_mb * 1024 * 1024 > MAX_MUSIC_BYTES:
                 await actions.send(
                     group_id=event.group_id,
                     message=Manager.Message(Segments.Text("⚠️ 啊这个音乐太~太大了呢(´•̥ ̯ •̥`) 超过星辰旅人能承受的极限啦，星辰旅人发不了音频文件呢…但是宝宝可以点开链接听哦！"))
@@ -179,7 +308,7 @@ async def get_song_by_id(song_id, event, actions, Manager, Segments):
                 # 下载并发送音乐文件
                 download_url = song_data.get('url')
                 if download_url:
-                    await download_and_send_music(download_url, event, actions, Manager, Segments)
+                    await download_and_send_music(download_url, song_id, event, actions, Manager, Segments)
                 else:
                     await actions.send(
                         group_id=event.group_id,
@@ -203,71 +332,102 @@ async def get_song_by_id(song_id, event, actions, Manager, Segments):
             message=Manager.Message(Segments.Text("获取信息出了点问题呢(>_<) 星辰旅人马上检查一下，宝宝稍等哦～"))
         )
 
+async def probe_music_size(session, url) -> int | None:
+    """下载前探测文件大小：先发 HEAD，没有 Content-Length 时再请求第一个字节读取 Content-Range"""
+    try:
+        async with session.head(url, timeout=10, allow_redirects=True) as response:
+            if response.status == 200 and response.content_length is not None:
+                return response.content_length
+        async with session.get(url, timeout=10, headers={"Range": "bytes=0-0"}) as response:
+            content_range = response.headers.get("Content-Range", "")
+            if response.status == 206 and "/" in content_range:
+                total = content_range.rsplit("/", 1)[1]
+                if total.isdigit():
+                    return int(total)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass
+    return None  # 探测不到时在下载过程中检查
+
 @retry_async_request(max_retries=2)  # 下载重试次数少一些
 async def download_music_file(url, temp_file):
-    """下载音乐文件（带重试）"""
+    """下载音乐文件（带重试），超过 MAX_MUSIC_BYTES 时立即中止"""
     async with aiohttp.ClientSession() as session:
+        size = await probe_music_size(session, url)
+        if size is not None and size > MAX_MUSIC_BYTES:
+            raise MusicTooLarge(f"文件大小 {size} 字节超过10MB限制")
+
         async with session.get(url, timeout=30) as response:
-            if response.status == 200:
-                file_size = 0
-                with open(temp_file, 'wb') as f:
-                    while True:
-                        chunk = await response.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        file_size += len(chunk)
-                        
-                        # 检查文件大小是否超过70MB
-                        if file_size > 70 * 1024 * 1024:
-                            f.close()
-                            if os.path.exists(temp_file):
-                                os.remove(temp_file)
-                            raise Exception("文件大小超过70MB限制")
-                
-                # 检查最终文件大小
-                if os.path.getsize(temp_file) > 10 * 1024 * 1024:
-                    os.remove(temp_file)
-                    raise Exception("文件大小超过10MB限制")
-                
-                return True
-            else:
+            if response.status != 200:
                 raise Exception(f"下载失败，状态码: {response.status}")
+            # 文件不超过 MAX_MUSIC_BYTES，先在内存中接收完整，再交给线程一次写入
+            data = bytearray()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                data += chunk
+                if len(data) > MAX_MUSIC_BYTES:
+                    raise MusicTooLarge("文件大小超过10MB限制")
+            await asyncio.to_thread(_write_file, temp_file, data)
+            return True
 
-async def download_and_send_music(url, event, actions, Manager, Segments):
-    """下载并发送音乐文件"""
-    try:
-        # 创建临时目录
-        temp_dir = "temp_music"
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-        
-        # 生成临时文件名
-        temp_file = os.path.join(temp_dir, f"music_{event.message_id}.mp3")
-        
-        # 先发送一个等待消息
-        await actions.send(
-            group_id=event.group_id,
-            message=Manager.Message(Segments.Text("正在为宝宝下载歌曲哦～请稍等一下下(◕‿◕)♡"))
-        )
-        
-        # 下载文件（带重试）
+def _write_file(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+_downloading: dict[str, asyncio.Future] = {}  # 歌曲 ID -> 正在进行的下载
+
+async def _fetch_music(url, song_id) -> str:
+    # 临时文件路径由临时目录统一分配，下载失败时离开作用域自动删除
+    with get_temp_arena().scope() as scope:
+        temp_file = scope.path(".mp3", "music_")
         await download_music_file(url, temp_file)
-        
-        # 发送音乐文件
-        await actions.send(
-            group_id=event.group_id,
-            message=Manager.Message(Segments.Text("下载完成啦！马上给宝宝发送哦～♪(^∇^*)"))
-        )
+        return await get_song_cache().put(song_id, temp_file)
+
+async def fetch_music(url, song_id) -> str:
+    """
+    下载歌曲并放入缓存，返回已固定（pin）的缓存文件路径，发送完成后须调用 unpin()；
+    多个群同时点同一首歌时只下载一次
+    """
+    # 每个事件有自己的线程和事件循环，下载统一放到后台循环中才能合并
+    return await background.run(_fetch_music_shared(url, song_id))
+
+async def _fetch_music_shared(url, song_id) -> str:
+    for _ in range(MAX_RETRIES):
+        future = _downloading.get(song_id)
+        if future is None:
+            future = _downloading[song_id] = asyncio.ensure_future(_fetch_music(url, song_id))
+            future.add_done_callback(lambda _: _downloading.pop(song_id, None))
+        await asyncio.shield(future)
+        # 每个等待者各自固定文件
+        music_file = await asyncio.to_thread(get_song_cache().get, song_id, True)
+        if music_file is not None:
+            return music_file
+        # 等待期间文件已被其他下载淘汰（缓存很小时才会发生），重新下载
+    raise Exception("下载的歌曲在发送前被缓存淘汰")
+
+async def download_and_send_music(url, song_id, event, actions, Manager, Segments):
+    """下载（或从缓存读取）并发送音乐文件"""
+    music_file = None
+    try:
+        music_file = get_song_cache().get(song_id, pin=True)
+        if music_file is None:
+            # 先发送一个等待消息
+            await actions.send(
+                group_id=event.group_id,
+                message=Manager.Message(Segments.Text("正在为宝宝下载歌曲哦～请稍等一下下(◕‿◕)♡"))
+            )
+
+            # 下载文件（带重试）
+            music_file = await fetch_music(url, song_id)
+
+            await actions.send(
+                group_id=event.group_id,
+                message=Manager.Message(Segments.Text("下载完成啦！马上给宝宝发送哦～♪(^∇^*)"))
+            )
+
+        # 发送音乐文件（文件保留在缓存中，发送完成前不会被淘汰）
         await actions.send(
             group_id=event.group_id,
-            message=Manager.Message(Segments.Record(temp_file))
+            message=Manager.Message(Segments.Record(music_file))
         )
-        
-        # 删除临时文件（延迟删除确保发送完成）
-        await asyncio.sleep(2)
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
                     
     except asyncio.TimeoutError:
         await actions.send(
@@ -277,7 +437,7 @@ async def download_and_send_music(url, event, actions, Manager, Segments):
     except Exception as e:
         print(f"下载歌曲时出错: {e}")
         error_msg = str(e)
-        if "文件大小超过10MB限制" in error_msg:
+        if isinstance(e, MusicTooLarge):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("⚠️ 啊这个音乐太~太大了呢(´•̥ ̯ •̥`) 超过星辰旅人能承受的极限啦，星辰旅人发不了音频文件呢…但是宝宝可以点开链接听哦！"))
@@ -287,10 +447,6 @@ async def download_and_send_music(url, event, actions, Manager, Segments):
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("下载出了点问题呢(>_<) 星辰旅人马上检查一下，宝宝稍等哦～"))
             )
-        
-        # 清理临时文件
-        if os.path.exists(temp_file):
-            try:
-                os.remove(temp_file)
-            except:
-                pass
+    finally:
+        if music_file is not None:
+            get_song_cache().unpin(music_file)
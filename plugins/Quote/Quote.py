@@ -1,12 +1,14 @@
 from Hyper import Segments
 from Hyper.Events import *
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 import os
 from io import BytesIO
 import httpx
-from PIL import ImageFilter
 from urllib.parse import urlparse, urlunparse
-import emoji
+from Tools.workers import image_pool
+from Tools.quote_render import render_quote
+from Tools.temp_arena import to_segment_file
+from Tools.image_cache import get_image_cache
 
 # 替换 https 为 http 的函数
 def replace_scheme_with_http(url: str) -> str:
@@ -20,106 +22,23 @@ def open_from_url(url: str):
     print(url)
     return Image.open(BytesIO(httpx.get(replace_scheme_with_http(url)).content))
 
-# 判断是否是 Emoji 的函数
-def is_emoji(char):
-    return char in emoji.EMOJI_DATA
-
-# 调整图像大小的函数
-def square_scale(image: Image, height: int):
-    old_width, old_height = image.size
-    x = height / old_height
-    width = int(old_width * x)
-    return image.resize((width, height))
-
-# 包装文字（自动换行）的函数
-def wrap_text(text, chars_per_line=13):
-    lines = [text[i:i + chars_per_line] for i in range(0, len(text), chars_per_line)]
-    return '\n'.join(lines)
-
-# 包装名字（自动换行）的函数
-def wrap_name(name, chars_per_line=7):
-    lines = [name[i:i + chars_per_line] for i in range(0, len(name), chars_per_line)]
-    return '\n'.join(lines)
-
-# 本地渲染 Emoji（彩色）的函数
-def render_emoji(char, font):
-    # 创建一个透明背景的图像，用于绘制 Emoji
-    emoji_img = Image.new("RGBA", (36, 36), (0, 0, 0, 0))  # 创建一个透明图像
-    draw = ImageDraw.Draw(emoji_img)
-    draw.text((0, 0), char, font=font, fill=(255,255, 255))  # 使用黑色绘制，因为我们将直接粘贴到背景上
-    return emoji_img
-
 # 生成图像的主要函数
-async def get_image(quote, ava_url, name, uin):
-    if str(uin) == "1348472639":
-        print("3803")
-        mask_path = "assets/quote/maskrbc.png"
-    else:
-        mask_path = "assets/quote/mask.png"
-    mask = Image.open(mask_path).convert("RGBA")
-    background = Image.new('RGBA', mask.size, (255, 255, 255, 255))
-    head = open_from_url(ava_url).convert("RGBA")
-
-    title_font = ImageFont.truetype(r"assets/t.ttf", size=36)
-    desc_font = ImageFont.truetype(r"assets/n.ttf", size=30)
-    digit_font = ImageFont.truetype(r"assets/sz.ttf", size=36)
-
-    # 加载本地彩色 Emoji 字体
-    emoji_font = ImageFont.truetype("assets/e.ttf", size=30)  # 替换为你的字体文件路径
-
-    background.paste(square_scale(head, 640), (0, 0))
-    background.paste(mask, (0, 0), mask)
-
-    draw = ImageDraw.Draw(background)
-    text = wrap_text(quote)
-
-    mask_circle = Image.new("L", head.size, 0)
-    draw_circle = ImageDraw.Draw(mask_circle)
-    draw_circle.ellipse((0, 0, head.size[0], head.size[1]), fill=255)
-    head.putalpha(mask_circle)
-
-    x_offset = 640
-    y_offset = 165
-    for char in text:
-        font = title_font
-        fill_color = (255, 255, 255)  # 默认白色
-
-        if char.isdigit() or char == '.':
-            font = digit_font
-            fill_color = (255, 0, 0)
-        elif is_emoji(char):  # 使用本地渲染的彩色 emoji
-            emoji_img = render_emoji(char, emoji_font)
-            background.paste(emoji_img, (int(x_offset), int(y_offset)), emoji_img)  # 转换为整数
-            x_offset += emoji_img.width
-            continue
-
-        char_width = font.getlength(char)
-        if x_offset + char_width > mask.size[0]:
-            x_offset = 640
-            y_offset += 40
-
-        draw.text((int(x_offset), int(y_offset)), char, font=font, fill=fill_color) # 转换为整数
-        x_offset += char_width
-        if char == '\n':
-            x_offset = 640
-            y_offset += 40
-
-    # 处理右下角名字的自动换行
-    name_text = wrap_name(name)
-    draw.text((862 if len(name_text) >= 7 else 1000, 465), f"——{name_text}", font=desc_font, fill=(112, 112, 112))
-
-    nbg = Image.new('RGB', mask.size, (0, 0, 0))
-    nbg.paste(background, (0, 0))
-    nbg.save("./temps/quote.png")
+async def get_image(quote, ava_url, name, uin, image_cache) -> bytes:
+    head = await image_cache.get(replace_scheme_with_http(ava_url))  # 常见头像直接命中缓存
+    # 逐字绘制很耗 CPU，放到图像工作池中执行，不阻塞其他群的消息
+    return await image_pool.run(render_quote, quote, head, name, uin)
 
 # 处理消息的函数
-async def handle(message, actions, images=None) -> Segments.Image:
+async def handle(message, actions, images=None, image_cache=None, message_cache=None) -> Segments.Image:
     if isinstance(message[0], Segments.Reply):
         msg_id = message[0].id
     else:
         return
 
-    content = await actions.get_msg(msg_id)
+    if image_cache is None:
+        image_cache = get_image_cache()
+    # 插件入口已经取过一次，有 message_cache 时这里直接命中缓存
+    content = await message_cache.get(actions, msg_id) if message_cache is not None else await actions.get_msg(msg_id)
     name = content.data["sender"]["nickname"] if not content.data["sender"].get("card") else \
         content.data["sender"]["card"]
     uin = content.data["sender"]["user_id"]
@@ -128,8 +47,9 @@ async def handle(message, actions, images=None) -> Segments.Image:
     text = str(message).replace("[图片]", "")
     if images is not None:
         print("有图")
-        await get_image(text, images, name, uin)  # 传递 uin 参数
+        png = await get_image(text, images, name, uin, image_cache)  # 传递 uin 参数
     else:
-        await get_image(text, f"http://q2.qlogo.cn/headimg_dl?dst_uin={uin}&spec=640", name, uin)  # 传递 uin 参数
+        png = await get_image(text, f"http://q2.qlogo.cn/headimg_dl?dst_uin={uin}&spec=640", name, uin, image_cache)  # 传递 uin 参数
 
-    return Segments.Image(f"file://{os.path.abspath('./temps/quote.png')}")
\ No newline at end of file
+    # 图片以 base64 发送，不再写入共享的 ./temps/quote.png（并发时会互相覆盖）
+    return Segments.Image(to_segment_file(png))
\ No newline at end of file
@@ -2,7 +2,6 @@ import subprocess, gc
 from plugins.RunCommand.execute_command import execute_command
 from plugins.RunCommand.DANGEROUS_PATTERNS import DANGEROUS_PATTERNS
 from Hyper import Configurator
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
 
 TRIGGHT_KEYWORD = "runcommand"
 HELP_MESSAGE = f"{Configurator.cm.get_cfg().others["reminder"]}runcommand (命令，必填) —> 通过命令实现更多功能（需要SU）"
@@ -6,11 +6,16 @@ from random import randint
 import dataclasses
 import json
 from Hyper import Configurator
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
+from Tools.plugin_manifest import help_message
 
 TRIGGHT_KEYWORD = "Any"
-HELP_MESSAGE = f'''{Configurator.cm.get_cfg().others["reminder"]}发电 (名字) —> 对某个人表达内心深处的诉求
-       我今天棒不棒 —> 让{Configurator.cm.get_cfg().others["bot_name"]}来评评你今天表现怎么样'''
+PLUGIN_MANIFEST = {
+    "keyword": "Any",
+    "help": "{reminder}发电 (名字) —> 对某个人表达内心深处的诉求\n       我今天棒不棒 —> 让{bot_name}来评评你今天表现怎么样",
+    "triggers": ["今天棒不棒", "发电"],
+    "events": ["GroupMessageEvent"],
+}
+HELP_MESSAGE = help_message(PLUGIN_MANIFEST, Configurator.cm.get_cfg().others["reminder"], Configurator.cm.get_cfg().others["bot_name"])
 
 @dataclasses.dataclass
 class UserInfo:
@@ -39,15 +44,15 @@ with open("./assets/quick.json", "r", encoding="utf-8") as f:
     words = json.load(f)["ele"]
 
 
-async def on_message(event, actions, Manager, Events, Segments, reminder):
+async def on_message(event, actions, Manager, Events, Segments, reminder, parsed):
         if not isinstance(event, Events.GroupMessageEvent):
             return None
         
-        if "今天棒不棒" in str(event.message):
-            if "我" in str(event.message):
+        if "今天棒不棒" in parsed.text:
+            if "我" in parsed.text:
                 name = "\n你"
                 uin = str(event.user_id)
-            elif "@" in str(event.message):
+            elif "@" in parsed.text:
                 name = ""
                 uin = event.message[0].qq
             else:
@@ -69,14 +74,10 @@ async def on_message(event, actions, Manager, Events, Segments, reminder):
             )
             return True
 
-        elif str(event.message).startswith(f"{reminder}发电"):
-            uin = 0
-            for i in event.message:
-                if isinstance(i, Segments.At):
-                    uin = i.qq
-                    break
+        elif parsed.text.startswith(f"{reminder}发电"):
+            uin = parsed.at[0] if parsed.at else 0
             if uin == 0:
-                tag = str(event.message).replace(f"{reminder}发电", "", 1)
+                tag = parsed.text.replace(f"{reminder}发电", "", 1)
             else:
                 tag = f"@{(await actions.get_stranger_info(uin)).data.raw["nickname"]}"
 
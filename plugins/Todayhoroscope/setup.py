@@ -2,11 +2,17 @@ import random
 import json
 import os
 from datetime import datetime
+from Tools.plugin_manifest import help_message
 
 FORTUNE_CACHE = {}
 
 TRIGGHT_KEYWORD = "Any"
-HELP_MESSAGE = "今日运势 —> 查看你今日的运势信息"
+PLUGIN_MANIFEST = {
+    "keyword": "Any",
+    "help": "今日运势 —> 查看你今日的运势信息",
+    "triggers": ["今日运势"],
+}
+HELP_MESSAGE = help_message(PLUGIN_MANIFEST)
 
 # 获取当前插件目录路径
 plugin_directory = os.path.dirname(os.path.abspath(__file__))
@@ -42,8 +48,8 @@ def get_local_fortune(user_qq):
     return fortune_text
 
 
-async def on_message(event, actions, Manager, Segments):
-    full_msg = str(event.message).strip()
+async def on_message(event, actions, Manager, Segments, parsed):
+    full_msg = parsed.stripped
     
     if full_msg != "今日运势":
         return False
@@ -4,8 +4,6 @@ import json
 import os
 from datetime import datetime
 
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
-
 TRIGGHT_KEYWORD = "天气"
 HELP_MESSAGE = f"{Configurator.cm.get_cfg().others['reminder']}天气 城市名 —> 查询指定城市的天气信息，包括今明后三天预报哦~"
 
@@ -60,9 +58,9 @@ def try_parse_int(value):
     except (ValueError, TypeError):
         return None
 
-async def on_message(event, actions, Manager, Segments):
+async def on_message(event, actions, Manager, Segments, settings):
     msg = str(event.message)
-    reminder = Configurator.cm.get_cfg().others["reminder"]
+    reminder = settings.reminder
     prefix = f"{reminder}天气"
     if not msg.startswith(prefix):
         return
@@ -1,16 +1,92 @@
-from Hyper import Configurator
 import re
 import httpx
 import json
 import os
 import time
-
-# 加载配置
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
+import asyncio
+import threading
+from collections import OrderedDict
+from Tools.links import short_links
+from Tools.image_cache import get_image_cache
+from Tools.background import background
 
 # 插件信息
 TRIGGHT_KEYWORD = "Any"
 
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.163 Safari/537.36'
+}
+
+# 复用连接的 HTTP 客户端，只在后台事件循环中使用，重载插件时在 teardown 中关闭
+_client: httpx.AsyncClient | None = None
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(headers=HEADERS, timeout=10)
+    return _client
+
+class VideoInfoCache:
+    """
+    视频信息（view 接口的返回）缓存。
+
+    ttl 秒内直接返回；超过 ttl 但未超过 stale 秒时先返回旧数据，同时在后台刷新；
+    同一个视频的并发请求只调用一次接口。获取到新数据时顺便预取封面，
+    发送消息时封面通常已经在图片缓存中。
+
+    查询、后台刷新和预取都在后台事件循环中进行：事件线程的循环在处理结束后
+    就会被销毁，其中的后台任务也会被取消。
+    """
+
+    def __init__(self, ttl: float = 300, stale: float = 3600, max_entries: int = 512):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()  # "bvid=..." / "aid=..." -> (获取时间, 数据)
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def _fetch(self, req: str) -> dict:
+        response = await _get_client().get(f"https://api.bilibili.com/x/web-interface/view?{req}")
+        data = response.json()
+        if data.get('code') == 0:
+            self.entries[req] = (time.time(), data)
+            self.entries.move_to_end(req)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            # 预取封面，不等待
+            asyncio.ensure_future(get_image_cache().fetch(data['data']['pic'])).add_done_callback(self._consume)
+        return data
+
+    @staticmethod
+    def _consume(future: asyncio.Future) -> None:
+        # 后台任务的异常只记录，不向外抛出
+        if not future.cancelled() and future.exception() is not None:
+            print(f"B站视频解析: 后台任务失败 {future.exception()}")
+
+    def _refresh(self, req: str) -> asyncio.Future:
+        future = self._inflight.get(req)
+        if future is None:
+            future = self._inflight[req] = asyncio.ensure_future(self._fetch(req))
+            future.add_done_callback(lambda f: self._inflight.pop(req, None))
+        return future
+
+    async def get(self, req: str) -> dict:
+        return await background.run(self._get(req))
+
+    async def _get(self, req: str) -> dict:
+        entry = self.entries.get(req)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < self.ttl:
+                self.entries.move_to_end(req)
+                return entry[1]
+            if age < self.stale:
+                self._refresh(req).add_done_callback(self._consume)
+                return entry[1]
+        return await asyncio.shield(self._refresh(req))
+
+video_cache = VideoInfoCache()
+
 class BilibiliDelayManager:
     def __init__(self):
         self.data_dir = "./data/bilibili_delay/"
@@ -18,6 +94,9 @@ class BilibiliDelayManager:
         self.config_file = os.path.join(self.data_dir, "delay_settings.json")
         self.delay_settings = self._load_delay_settings()
         self.last_analysis = {}
+        self.last_cleanup = time.time()
+        # 各个事件线程同时检查、写入 last_analysis；RLock：can_analysis 中会调用 cleanup_expired_records
+        self._lock = threading.RLock()
 
     def _load_delay_settings(self):
         if not os.path.exists(self.config_file):
@@ -37,66 +116,57 @@ class BilibiliDelayManager:
 
     def set_delay(self, seconds: int, group_id: str = None):
         """设置延迟时间"""
-        if group_id:
-            self.delay_settings["groups"][group_id] = seconds
-        else:
-            self.delay_settings["global"] = seconds
-        self._save_delay_settings()
+        with self._lock:
+            if group_id:
+                self.delay_settings["groups"][group_id] = seconds
+            else:
+                self.delay_settings["global"] = seconds
+            self._save_delay_settings()
 
     def can_analysis(self, url: str, group_id: str) -> bool:
         """检查群是否可以解析视频"""
-        current_time = time.time()
-        
-        delay = self.delay_settings["groups"].get(
-            group_id, 
-            self.delay_settings["global"]
-        )
+        with self._lock:  # 检查与记录必须是一步，否则同一个群可能同时解析两次
+            current_time = time.time()
+            if current_time - self.last_cleanup > 600:
+                # 定期清理，避免记录随群数量无限增长
+                self.cleanup_expired_records(max(3600, self.delay_settings["global"], *self.delay_settings["groups"].values()))
+                self.last_cleanup = current_time
+            
+            delay = self.delay_settings["groups"].get(
+                group_id, 
+                self.delay_settings["global"]
+            )
 
-        key = group_id
-        last_time = self.last_analysis.get(key, 0)
-        
-        if current_time - last_time < delay:
-            return False
+            key = group_id
+            last_time = self.last_analysis.get(key, 0)
             
-        self.last_analysis[key] = current_time
-        return True
+            if current_time - last_time < delay:
+                return False
+                
+            self.last_analysis[key] = current_time
+            return True
 
     def cleanup_expired_records(self, max_age: int = 3600):
         """清理过期的解析记录"""
-        current_time = time.time()
-        self.last_analysis = {
-            k: v for k, v in self.last_analysis.items() 
-            if current_time - v < max_age
-        }
+        with self._lock:
+            current_time = time.time()
+            self.last_analysis = {
+                k: v for k, v in self.last_analysis.items() 
+                if current_time - v < max_age
+            }
 
-def check_permission(user_id: str) -> bool:
+def check_permission(user_id: str, permissions) -> bool:
     """检查用户是否有权限设置延迟"""
-    try:
-        if user_id in Configurator.cm.get_cfg().others.get("ROOT_User", []):
-            return True
-            
-        with open("Super_User.ini", "r") as f:
-            super_users = f.read().strip().split("\n")
-            if user_id in super_users:
-                return True
-                
-        with open("Manage_User.ini", "r") as f:
-            manage_users = f.read().strip().split("\n")
-            if user_id in manage_users:
-                return True
-                
-        return False
-    except Exception:
-        return user_id in Configurator.cm.get_cfg().others.get("ROOT_User", [])
+    return permissions.is_admin(user_id)
 
 delay_manager = BilibiliDelayManager()
 
-async def process_delay_command(message: str, event, actions, Manager, Segments):
+async def process_delay_command(message: str, event, actions, Manager, Segments, permissions, settings):
     """处理延迟设置命令"""
-    reminder = Configurator.cm.get_cfg().others["reminder"]
+    reminder = settings.reminder
     user_id = str(event.user_id)
     
-    if not check_permission(user_id):
+    if not check_permission(user_id, permissions):
         return "只有管理员才能设置解析延迟"
     
     if message.startswith(f"{reminder}设置解析全局延迟 "):
@@ -128,18 +198,18 @@ async def process_delay_command(message: str, event, actions, Manager, Segments)
             
     return None
 
-async def on_message(event, actions, Manager, Segments):
+async def on_message(event, actions, Manager, Segments, permissions, settings, links, image_cache):
     if hasattr(event, '__class__') and event.__class__.__name__ == 'HyperListenerStartNotify':
         return False
     
     if not hasattr(event, 'message'):
         return False
         
-    msg = str(event.message).strip()
-    reminder = Configurator.cm.get_cfg().others["reminder"]
+    msg = links.text
+    reminder = settings.reminder
     
     if msg.startswith(f"{reminder}设置解析") or msg == f"{reminder}查看解析延迟":
-        delay_result = await process_delay_command(msg, event, actions, Manager, Segments)
+        delay_result = await process_delay_command(msg, event, actions, Manager, Segments, permissions, settings)
         if delay_result:
             await actions.send(
                 group_id=event.group_id,
@@ -147,56 +217,31 @@ async def on_message(event, actions, Manager, Segments):
             )
             return True
     
-    # 处理 JSON 消息
-    if hasattr(event, 'message') and len(event.message) > 0 and isinstance(event.message[0], Segments.Json):
-        try:
-            json_data = json.loads(event.message[0].data)
-            json_msg = str(json_data)
-            bv_match = re.search(r'www.bilibili.com/video/(BV\w+)', json_msg) or re.search(r'b23.tv/(BV\w+)', json_msg) or re.search(r'b23.tv/(\w+)', json_msg)
-            av_match = re.search(r'www.bilibili.com/video/av(\w+)', json_msg) or re.search(r'b23.tv/av(\w+)', json_msg)
-            if bv_match or av_match:
-                msg = json_msg
-            else:
-                return False
-        except:
-            return False
-
-    bv_match = re.search(r'www.bilibili.com/video/(BV\w+)', msg) or re.search(r'b23.tv/(BV\w+)', msg) or re.search(r'b23.tv/(\w+)', msg)
-    av_match = re.search(r'www.bilibili.com/video/av(\w+)', msg) or re.search(r'b23.tv/av(\w+)', msg)
-    
-    if not (bv_match or av_match):
+    # 文本和 Json 卡片中的链接已由 handler 统一识别
+    videos = links.of("bv", "av", "b23")
+    if not videos:
         return False
+    kind, id = videos[0]
 
     if not delay_manager.can_analysis(msg, str(event.group_id)):
         return True
         
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.163 Safari/537.36'
-        }
-        
-        if bv_match:
-            id = bv_match.group(1)
-            if len(id) < 12:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(f"https://b23.tv/{id}", headers=headers, follow_redirects=True)
-                    final_url = str(response.url)
-                    bv_redirect = re.search(r'video/(BV\w+)', final_url)
-                    if bv_redirect:
-                        id = bv_redirect.group(1)
+        if kind == "b23":
+            # b23 -> BV 的展开结果在各插件间共享并缓存
+            final_url = await short_links.resolve(f"https://b23.tv/{id}")
+            bv_redirect = re.search(r'video/(BV\w+)', final_url)
+            if bv_redirect:
+                id = bv_redirect.group(1)
+            kind = "bv"
+        if kind == "bv":
             req = f"bvid={id}"
         else:
-            id = av_match.group(1)
             req = f"aid={id}"
             id = "av" + id
             
-        # 请求B站API
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://api.bilibili.com/x/web-interface/view?{req}",
-                headers=headers
-            )
-            data = response.json()
+        # 请求B站API（多个群转发同一个视频时直接命中缓存）
+        data = await video_cache.get(req)
             
         if data['code'] == 0:
             video_data = data['data']
@@ -233,7 +278,7 @@ UP主：{author_name}
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(
-                    Segments.Image(cover_url),
+                    Segments.Image(await image_cache.segment_file(cover_url)),
                     Segments.Text(message)
                 )
             )
@@ -257,4 +302,9 @@ UP主：{author_name}
         )
         return True
 
+async def teardown():
+    """重载插件时关闭HTTP客户端"""
+    if _client is not None:
+        await background.run(_client.aclose())
+
 print("[Xiaoyi_QQ]B站视频解析插件已加载")
@@ -1,12 +1,10 @@
-from Hyper import Configurator
 import json
 import os
 import random
 from datetime import datetime
 import httpx
 import asyncio
-
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
+from Tools.temp_arena import to_segment_file
 
 TRIGGHT_KEYWORD = "Any"
 HELP_MESSAGE = f"签到 -> 签到获取积分和好感度"
@@ -39,6 +37,7 @@ class CheckInManager:
             self.browser = None
             self.page = None
             self.playwright = None
+            self.clean_old_images()  # 旧版本遗留的 sign_*.png，新版本不再写入磁盘
         except Exception as e:
             print(f"[签到系统]初始化失败: {e}")
             print(f"[签到系统]当前工作目录: {os.getcwd()}")
@@ -308,7 +307,8 @@ class CheckInManager:
         except Exception as e:
             print(f"[签到系统]关闭浏览器失败: {e}")
 
-    async def generate_image(self, user_id, nickname, rewards, hitokoto_text):
+    async def generate_image(self, user_id, nickname, rewards, hitokoto_text, avatar=None) -> bytes:
+        """渲染签到卡片，返回内存中的 PNG 数据"""
         try:
             import jinja2
             from playwright.async_api import async_playwright
@@ -317,10 +317,6 @@ class CheckInManager:
                 browser = await p.chromium.launch()
                 page = await browser.new_page(viewport={"width": 800, "height": 600})
 
-                os.makedirs(self.config["数据存储路径"], exist_ok=True)
-                img_path = os.path.abspath(os.path.join(self.config["数据存储路径"], f"sign_{user_id}.png"))
-                if os.path.exists(img_path):
-                    os.remove(img_path)
                 template_path = os.path.abspath(os.path.join(self.config["数据存储路径"], self.config["模板文件"]))
                 if not os.path.exists(template_path):
                     self._create_default_template(template_path)
@@ -337,13 +333,13 @@ class CheckInManager:
                     total_points=rewards["total_points"],
                     total_days=rewards["total_days"],
                     hitokoto=hitokoto_text,
-                    avatar_url=f"http://q2.qlogo.cn/headimg_dl?dst_uin={user_id}&spec=640"
+                    avatar_url=avatar or f"http://q2.qlogo.cn/headimg_dl?dst_uin={user_id}&spec=640"
                 )
                 await page.set_content(html_content)
-                await page.screenshot(path=img_path, full_page=True)
+                png = await page.screenshot(full_page=True)
                 await page.close()
                 await browser.close()
-                return img_path
+                return png
         except Exception as e:
             print(f"[签到系统]生成图片失败: {e}")
             raise Exception(f"生成签到图片失败: {str(e)}")
@@ -415,24 +411,18 @@ class CheckInManager:
 
 check_in_manager = CheckInManager()
 
-async def check_permission(event):
-    user_id = str(event.user_id)
-    return (user_id in Configurator.cm.get_cfg().others["ROOT_User"] or 
-            user_id in open("./Super_User.ini", "r").read().splitlines() or 
-            user_id in open("./Manage_User.ini", "r").read().splitlines())
+async def check_permission(event, permissions):
+    return permissions.is_admin(event.user_id)
 
-async def on_message(event, actions, Manager, Segments):
+async def on_message(event, actions, Manager, Segments, permissions, settings, image_cache, parsed):
     if not hasattr(event, 'message'):
         return False
 
-    if random.random() < 0.01:
-        check_in_manager.clean_old_images()
-
-    message_content = str(event.message).strip()
-    reminder = Configurator.cm.get_cfg().others['reminder']
+    message_content = parsed.stripped
+    reminder = settings.reminder
 
     if message_content.startswith(f"{reminder}添加签到指令 "):
-        if not await check_permission(event):
+        if not await check_permission(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -458,7 +448,7 @@ async def on_message(event, actions, Manager, Segments):
         return True
 
     if message_content.startswith(f"{reminder}删除签到指令 "):
-        if not await check_permission(event):
+        if not await check_permission(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -484,7 +474,7 @@ async def on_message(event, actions, Manager, Segments):
         return True
 
     if message_content == f"{reminder}切换签到发送模式":
-        if not await check_permission(event):
+        if not await check_permission(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -498,7 +488,7 @@ async def on_message(event, actions, Manager, Segments):
         return True
 
     if message_content == f"{reminder}更新签到插件":
-        if not await check_permission(event):
+        if not await check_permission(event, permissions):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message(Segments.Text("你没有权限执行此操作"))
@@ -564,30 +554,26 @@ async def on_message(event, actions, Manager, Segments):
         
         if check_in_manager.config["签到模式"] == "image":
             try:
-                img_path = await check_in_manager.generate_image(
+                png = await check_in_manager.generate_image(
                     event.user_id, 
                     user_nickname, 
                     rewards, 
-                    hitokoto_text
+                    hitokoto_text,
+                    # 头像以 data URI 嵌入模板，浏览器不必再次下载
+                    await image_cache.data_uri(f"http://q2.qlogo.cn/headimg_dl?dst_uin={event.user_id}&spec=640")
                 )
                 
-                print(f"[签到系统]准备发送图片: {img_path}")
-                
+                print(f"[签到系统]准备发送图片: {len(png)} 字节")
+
+                # 截图直接以 base64 发送，不再经过磁盘
                 await actions.send(
                     group_id=event.group_id,
                     message=Manager.Message([
                         Segments.At(event.user_id),
-                        Segments.Image(f"file:///{img_path}")
+                        Segments.Image(to_segment_file(png))
                     ])
                 )
-                
-                try:
-                    if os.path.exists(img_path):
-                        os.remove(img_path)
-                        print(f"[签到系统]已清理临时文件: {img_path}")
-                except Exception as e:
-                    print(f"[签到系统]清理文件失败: {str(e)}")
-                    
+
             except Exception as e:
                 print(f"[签到系统]发送图片失败: {str(e)}")
                 check_in_manager.config["签到模式"] = "text"
@@ -605,7 +591,7 @@ async def on_message(event, actions, Manager, Segments):
             await actions.send(
                 group_id=event.group_id,
                 message=Manager.Message([
-                    Segments.Image(f"http://q2.qlogo.cn/headimg_dl?dst_uin={event.user_id}&spec=640"),
+                    Segments.Image(await image_cache.segment_file(f"http://q2.qlogo.cn/headimg_dl?dst_uin={event.user_id}&spec=640")),
                     Segments.At(event.user_id),
                     Segments.Text(message)
                 ])
@@ -672,6 +658,10 @@ async def on_message(event, actions, Manager, Segments):
         )
         return True
 
+async def teardown():
+    """重载插件时关闭常驻浏览器"""
+    await check_in_manager.close_browser()
+
 print("[Xiaoyi_QQ]签到插件已加载")
 print("Version: 1.2.4")
 print("Author: Xiaoyi")
\ No newline at end of file
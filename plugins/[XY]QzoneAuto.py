@@ -6,7 +6,6 @@ import base64
 import threading
 import time
 from datetime import datetime, timedelta
-from Hyper import Configurator
 
 TRIGGHT_KEYWORD = "Any"
 DATA_PATH = "./data/qq_autosign/"
@@ -23,7 +22,6 @@ if not os.path.exists(USER_FILE):
         json.dump({}, f)
 
 # 加载配置
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
 
 def load_users():
     with open(USER_FILE, "r", encoding="utf-8") as f:
@@ -34,8 +32,9 @@ def save_users(data):
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 _auto_sign_scheduler_started = False
+_auto_sign_scheduler_stop = threading.Event()
 
-async def on_message(event, actions, Manager, Segments):
+async def on_message(event, actions, Manager, Segments, settings, parsed):
     global _auto_sign_scheduler_started
     if not _auto_sign_scheduler_started:
         print("[QAuto][定时任务] 首次触发，自动启动定时打卡线程。")
@@ -44,8 +43,8 @@ async def on_message(event, actions, Manager, Segments):
 
     if not hasattr(event, "message"):
         return False
-    message = str(event.message).strip()
-    reminder = Configurator.cm.get_cfg().others["reminder"]
+    message = parsed.stripped
+    reminder = settings.reminder
     user_id = str(event.user_id)
     group_id = getattr(event, "group_id", None)
 
@@ -254,17 +253,21 @@ def start_auto_sign_scheduler(actions, Manager, Segments):
         except RuntimeError:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-        while True:
+        while not _auto_sign_scheduler_stop.is_set():
             try:
                 coro = auto_sign_task(actions, Manager, Segments)
                 if asyncio.iscoroutine(coro):
                     loop.run_until_complete(coro)
             except Exception as e:
                 print(f"[QAuto][定时任务] 执行异常: {e}")
-            time.sleep(60)
+            _auto_sign_scheduler_stop.wait(60)
     t = threading.Thread(target=scheduler, daemon=True)
     t.start()
 
+def teardown():
+    """重载插件时停止定时打卡线程"""
+    _auto_sign_scheduler_stop.set()
+
 print("[Xiaoyi_QQ]QQ自动打卡插件已加载")
 print("Version: 1.0.0")
 print("Author: Xiaoyi")
@@ -2,7 +2,6 @@ import json, aiohttp, uuid
 from datetime import datetime
 
 from Hyper import Configurator
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
 from Hyper import Listener
 
 TRIGGHT_KEYWORD = "开"
@@ -2,7 +2,6 @@ import re
 import asyncio
 from Hyper import Configurator
 
-Configurator.cm = Configurator.ConfigManager(Configurator.Config(file="config.json").load_from_file())
 TRIGGHT_KEYWORD = "伪造消息"
 HELP_MESSAGE = f"{Configurator.cm.get_cfg().others['reminder']}伪造消息 [QQ号说内容|QQ号说内容] - 用于伪造恶搞群友或者好友的消息"
 
@@ -4,10 +4,16 @@ import aiohttp
 import base64
 import io
 import re
-from PIL import Image
+from Tools.tools import verify_image_data
+from Tools.workers import image_pool, WorkerPoolBusy
+from Tools.plugin_manifest import help_message
 
 TRIGGHT_KEYWORD = "rua"
-HELP_MESSAGE = "#rua [QQ号/@用户] [背景颜色(可选)] —> 生成摸摸头GIF，默认背景为透明"
+PLUGIN_MANIFEST = {
+    "keyword": "rua",
+    "help": "#rua [QQ号/@用户] [背景颜色(可选)] —> 生成摸摸头GIF，默认背景为透明",
+}
+HELP_MESSAGE = help_message(PLUGIN_MANIFEST)
 
 async def on_message(event, actions, Manager, Segments, order, reminder, bot_name):
     # 检查是否包含触发关键词
@@ -84,6 +90,19 @@ async def on_message(event, actions, Manager, Segments, order, reminder, bot_nam
                 if response.status == 200:
                     # 获取GIF数据
                     gif_data = await response.read()
+
+                    # 逐帧解码检查 GIF 是否完整，解码放到图像工作池中，不阻塞事件循环
+                    try:
+                        valid = await image_pool.run(verify_image_data, gif_data)
+                    except WorkerPoolBusy:
+                        valid = True  # 工作池繁忙时跳过检查，直接发送
+                    if not valid:
+                        await actions.del_message(wait_msg.data.message_id)
+                        await actions.send(
+                            group_id=event.group_id,
+                            message=Manager.Message(Segments.Text("❌ 接口返回的GIF已损坏，请稍后再试"))
+                        )
+                        return True
                     
                     # 转换为base64
                     gif_base64 = base64.b64encode(gif_data).decode('utf-8')
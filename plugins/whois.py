@@ -4,15 +4,16 @@ import whois
 from Hyper import Manager, Segments
 from datetime import datetime
 import re
-
-# 加载配置 
-Configurator.cm = Configurator.ConfigManager(
-    Configurator.Config(file="config.json").load_from_file()
-)
+from Tools.plugin_manifest import help_message
 
 # 插件信息
 TRIGGHT_KEYWORD = "Any"
-HELP_MESSAGE = f"{Configurator.cm.get_cfg().others["reminder"]}whois example.com可以查询域名注册信息（含中文翻译）"
+PLUGIN_MANIFEST = {
+    "keyword": "Any",
+    "help": "{reminder}whois example.com可以查询域名注册信息（含中文翻译）",
+    "triggers": ["whois", "查询域名"],
+}
+HELP_MESSAGE = help_message(PLUGIN_MANIFEST, Configurator.cm.get_cfg().others["reminder"], Configurator.cm.get_cfg().others["bot_name"])
 
 def extract_contact_info(w) -> dict:
     """提取联系人和邮箱信息"""
@@ -174,12 +175,12 @@ def format_whois_info(domain: str) -> str:
     except Exception as e:
         return f"Whois 查询失败: {str(e)}\n请检查域名格式是否正确，或稍后重试。"
 
-async def on_message(event, actions, Manager, Segments):
+async def on_message(event, actions, Manager, Segments, settings, parsed):
     if not hasattr(event, "message"):
         return False
 
-    msg = str(event.message).strip()
-    reminder = Configurator.cm.get_cfg().others["reminder"]
+    msg = parsed.stripped
+    reminder = settings.reminder
 
     # 支持多种触发方式
     if msg.startswith(f"{reminder}whois") or msg.startswith("whois") or msg.startswith(f"{reminder}查询域名"):